@@ -5,6 +5,7 @@ import time
 import os
 import sys
 from typing import Optional, Dict, Tuple, List
+from analysis_cache import EXACT, LOWER, AnalysisCache
 
 # ---------- CONFIG ----------
 WINDOW_W = 880   # board 640 + sidebar 240
@@ -15,6 +16,7 @@ WINDOW_H = BOARD_SIZE
 FPS = 60
 
 AI_DEPTH = 3   # default AI strength
+ROOT_MOVES = 120   # root moves searched, the rest are never tried
 
 # ---------- COLORS ----------
 LIGHT = (240, 217, 181)
@@ -103,6 +105,8 @@ KNIGHT_TABLE = [
 -50,-40,-30,-30,-30,-30,-40,-50
 ]
 TT = {}
+# Root results persisted across sessions, keyed by Zobrist hash
+ANALYSIS_CACHE = AnalysisCache(os.path.join(os.path.expanduser("~"), ".pygame_chess2_analysis.sqlite"))
 
 def evaluate_board(board: chess.Board) -> int:
     if board.is_checkmate():
@@ -161,15 +165,40 @@ def negamax(board: chess.Board, depth: int, alpha: int, beta: int, color: int) -
     return maxv
 
 def ai_best_move(board: chess.Board, depth=AI_DEPTH) -> Optional[chess.Move]:
+    cached = ANALYSIS_CACHE.get_move(board, depth)
+    if cached:
+        return cached
     best, best_score = None, -9999999
-    for m in order_moves(board, list(board.legal_moves))[:120]:
+    moves = list(board.legal_moves)
+    for m in order_moves(board, moves)[:ROOT_MOVES]:
         board.push(m)
         score = -negamax(board, depth - 1, -10000000, 10000000, -1)
         board.pop()
         if score > best_score:
             best_score, best = score, m
+    if best:
+        # With moves left out the best of them is only a lower bound
+        ANALYSIS_CACHE.store(board, depth, best_score, best, EXACT if len(moves) <= ROOT_MOVES else LOWER)
     return best
 
+# ---------- Move Index ----------
+def build_move_index(board: chess.Board) -> Dict[int, Dict[int, Dict[Optional[int], chess.Move]]]:
+    """Map from_square -> to_square -> promotion -> move for the current position"""
+    index = {}
+    for m in board.legal_moves:
+        index.setdefault(m.from_square, {}).setdefault(m.to_square, {})[m.promotion] = m
+    return index
+
+def moves_from(index, sq: int) -> List[chess.Move]:
+    return [m for variants in index.get(sq, {}).values() for m in variants.values()]
+
+def lookup_move(index, from_sq: int, to_sq: int, promotion: Optional[int] = None) -> Optional[chess.Move]:
+    return index.get(from_sq, {}).get(to_sq, {}).get(promotion)
+
+def is_promotion(index, from_sq: int, to_sq: int) -> bool:
+    variants = index.get(from_sq, {}).get(to_sq)
+    return bool(variants) and None not in variants
+
 # ---------- UI Helpers ----------
 def square_to_screen(square: int, flip=False) -> Tuple[int, int]:
     col = chess.square_file(square)
@@ -302,6 +331,7 @@ flip_board = (player_color == chess.BLACK)
 if ai_color == chess.WHITE:
     m = ai_best_move(board, depth=AI_DEPTH)
     if m: board.push(m); last_mv = m
+move_index = build_move_index(board)
 
 promotion_mode = False
 promotion_move = None
@@ -327,6 +357,7 @@ while running:
                 if ai_color == chess.WHITE:
                     m = ai_best_move(board, depth=AI_DEPTH)
                     if m: board.push(m); last_mv = m
+                move_index = build_move_index(board)
             elif ev.key in (pygame.K_1,pygame.K_2,pygame.K_3,pygame.K_4,pygame.K_5):
                 AI_DEPTH = int(ev.unicode) if ev.unicode.isdigit() else AI_DEPTH
         elif ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1:
@@ -340,10 +371,11 @@ while running:
                         break
                 if chosen_piece is not None and promotion_move is not None:
                     # Make promotion move with chosen piece
-                    move = chess.Move(promotion_move.from_square, promotion_move.to_square, promotion=chosen_piece)
-                    if move in board.legal_moves:
+                    move = lookup_move(move_index, promotion_move.from_square, promotion_move.to_square, chosen_piece)
+                    if move:
                         board.push(move)
                         last_mv = move
+                        move_index = build_move_index(board)
                     promotion_mode = False
                     promotion_move = None
                     promotion_rects = []
@@ -363,24 +395,22 @@ while running:
             if selected_sq is None:
                 if piece and piece.color == player_color:
                     selected_sq = sq
-                    legal_moves = [m for m in board.legal_moves if m.from_square == selected_sq]
+                    legal_moves = moves_from(move_index, selected_sq)
                 else:
                     selected_sq, legal_moves = None, []
             else:
-                attempted = chess.Move(selected_sq, sq)
-                moving_piece = board.piece_at(selected_sq)
-                if moving_piece and moving_piece.piece_type == chess.PAWN:
-                    to_rank = chess.square_rank(sq)
-                    # Check if pawn promotion is possible (moving to last rank)
-                    if (moving_piece.color == chess.WHITE and to_rank == 7) or (moving_piece.color == chess.BLACK and to_rank == 0):
-                        # Enter promotion selection mode
-                        promotion_mode = True
-                        promotion_move = chess.Move(selected_sq, sq)
-                        promotion_rects = draw_promotion_choices(moving_piece.color, flip_board)
-                        continue
-                if attempted in board.legal_moves:
+                # Only offer promotion choices when a promotion is legal here
+                if is_promotion(move_index, selected_sq, sq):
+                    # Enter promotion selection mode
+                    promotion_mode = True
+                    promotion_move = chess.Move(selected_sq, sq)
+                    promotion_rects = draw_promotion_choices(player_color, flip_board)
+                    continue
+                attempted = lookup_move(move_index, selected_sq, sq)
+                if attempted:
                     board.push(attempted)
                     last_mv = attempted
+                    move_index = build_move_index(board)
                     selected_sq, legal_moves = None, []
                     if len(TT) > 100000:
                         TT.clear()
@@ -388,7 +418,7 @@ while running:
                 else:
                     if piece and piece.color == player_color:
                         selected_sq = sq
-                        legal_moves = [m for m in board.legal_moves if m.from_square == selected_sq]
+                        legal_moves = moves_from(move_index, selected_sq)
                     else:
                         selected_sq, legal_moves = None, []
 
@@ -400,6 +430,7 @@ while running:
             if m:
                 board.push(m)
                 last_mv = m
+                move_index = build_move_index(board)
 
     # Draw everything
     draw_board(selected_sq, legal_moves, last_mv, flip_board)
@@ -409,5 +440,6 @@ while running:
         promotion_rects = draw_promotion_choices(board.turn, flip_board)
     pygame.display.flip()
 
+ANALYSIS_CACHE.close()
 pygame.quit()
 sys.exit()
@@ -0,0 +1,82 @@
+import threading
+from typing import List, NamedTuple, Optional, Tuple
+
+import chess
+
+from ai.search import Searcher, SearchInfo, format_score
+
+
+class AnalysisUpdate(NamedTuple):
+    fen: str
+    depth: int
+    score: int  # centipawns from White's point of view
+    lines: List[Tuple[str, str]]  # (formatted score, SAN variation) per PV
+    nodes: int
+    elapsed: float
+
+
+class BackgroundAnalyzer:
+    """Runs the search on the current position in a worker thread.
+
+    Every completed depth is published as an AnalysisUpdate that the UI
+    picks up with latest(). Calling analyze() with a new position stops
+    the running search and restarts it, reusing the searcher's
+    transposition table.
+    """
+
+    def __init__(self, multipv: int = 3, max_depth: int = 32):
+        self.multipv = multipv
+        self.max_depth = max_depth
+        self.searcher = Searcher()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending: Optional[chess.Board] = None
+        self._latest: Optional[AnalysisUpdate] = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def analyze(self, board: chess.Board):
+        """Start analysing a position, cancelling any running search"""
+        with self._lock:
+            self._pending = board.copy()
+            self._latest = None
+            self.searcher.stop()
+        self._wake.set()
+
+    def stop(self):
+        """Stop analysing and clear the last result"""
+        with self._lock:
+            self._pending = None
+            self._latest = None
+            self.searcher.stop()
+
+    def latest(self) -> Optional[AnalysisUpdate]:
+        with self._lock:
+            return self._latest
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            with self._lock:
+                board, self._pending = self._pending, None
+                self._wake.clear()
+                # Under the lock, so a stop for a newer request cannot land before this
+                # and be wiped; one that lands after it stops this search as it should
+                self.searcher.stop_event.clear()
+            if board is None or board.is_game_over():
+                continue
+
+            fen = board.fen()
+            self.searcher.search(board, self.max_depth, self.multipv,
+                                 on_depth=lambda info: self._publish(board, fen, info))
+
+    def _publish(self, board: chess.Board, fen: str, info: SearchInfo):
+        sign = 1 if board.turn == chess.WHITE else -1
+        lines = [(format_score(line.score * sign), board.variation_san(line.moves))
+                 for line in info.lines]
+        update = AnalysisUpdate(fen, info.depth, info.lines[0].score * sign, lines,
+                                info.nodes, info.elapsed)
+        with self._lock:
+            # Drop results for a position that has been replaced meanwhile
+            if self._pending is None and not self.searcher.stop_event.is_set():
+                self._latest = update
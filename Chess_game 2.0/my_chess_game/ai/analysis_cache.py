@@ -0,0 +1,143 @@
+import os
+import queue
+import sqlite3
+import threading
+from typing import Dict, Optional, Tuple
+
+import chess
+import chess.polyglot
+
+# Bound types for cached scores
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".pygame_chess_analysis.sqlite")
+
+CacheEntry = Tuple[int, float, Optional[str], int]  # (depth, score, best move uci, bound)
+
+
+def position_hash(board: chess.Board) -> int:
+    """Zobrist hash of the position (pieces, side to move, castling, en passant)"""
+    return chess.polyglot.zobrist_hash(board)
+
+
+def _to_signed(key: int) -> int:
+    """SQLite integers are signed 64-bit, Zobrist keys are unsigned"""
+    return key - (1 << 64) if key >= (1 << 63) else key
+
+
+def _to_unsigned(key: int) -> int:
+    return key + (1 << 64) if key < 0 else key
+
+
+class AnalysisCache:
+    """Persistent search results shared across game sessions.
+
+    Entries live in an in-memory dict so probes never touch the disk.
+    A single background thread owns the SQLite connection: it loads the
+    stored entries on startup and then writes new results in batches,
+    so the UI and search threads never wait on I/O.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_entries: int = 200000):
+        self.path = path
+        self.max_entries = max_entries
+        self.entries: Dict[int, CacheEntry] = {}
+        self.loaded = threading.Event()
+        self._lock = threading.Lock()
+        self._writes: "queue.Queue[Optional[Tuple[int, CacheEntry]]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def probe(self, board: chess.Board) -> Optional[CacheEntry]:
+        """Return the cached entry for a position, or None"""
+        with self._lock:
+            return self.entries.get(position_hash(board))
+
+    def get_move(self, board: chess.Board, min_depth: int, exact: bool = True) -> Optional[chess.Move]:
+        """Return the cached best move if it was searched at least min_depth deep.
+
+        With exact=False moves from bounded entries are returned too, for move ordering.
+        """
+        entry = self.probe(board)
+        if entry is None or entry[0] < min_depth or (exact and entry[3] != EXACT) or entry[2] is None:
+            return None
+        move = chess.Move.from_uci(entry[2])
+        return move if board.is_legal(move) else None
+
+    def store(self, board: chess.Board, depth: int, score: float,
+              best_move: Optional[chess.Move], bound: int = EXACT):
+        """Record a search result, keeping the deeper of old and new entries"""
+        key = position_hash(board)
+        entry = (depth, score, best_move.uci() if best_move else None, bound)
+        with self._lock:
+            old = self.entries.get(key)
+            if old is not None and old[0] > depth:
+                return
+            self.entries[key] = entry
+        self._writes.put((key, entry))
+
+    def close(self):
+        """Flush pending writes and stop the background thread"""
+        self._writes.put(None)
+        self._worker.join()
+
+    def _run(self):
+        try:
+            conn = sqlite3.connect(self.path)
+        except sqlite3.Error as e:
+            print(f"Warning: analysis cache disabled ({e})")
+            self.loaded.set()
+            return
+
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS analysis ("
+                "key INTEGER PRIMARY KEY, depth INTEGER, score REAL, move TEXT, bound INTEGER)"
+            )
+        self._load(conn)
+        self.loaded.set()
+
+        while True:
+            item = self._writes.get()
+            batch = []
+            while item is not None:
+                batch.append(item)
+                try:
+                    item = self._writes.get_nowait()
+                except queue.Empty:
+                    break
+            if batch:
+                with conn:
+                    conn.executemany(
+                        "INSERT INTO analysis (key, depth, score, move, bound) VALUES (?, ?, ?, ?, ?) "
+                        "ON CONFLICT(key) DO UPDATE SET depth=excluded.depth, score=excluded.score, "
+                        "move=excluded.move, bound=excluded.bound WHERE excluded.depth >= analysis.depth",
+                        [(_to_signed(key), *entry) for key, entry in batch]
+                    )
+            if item is None:
+                break
+        conn.close()
+
+    def _load(self, conn: sqlite3.Connection):
+        """Read stored entries, dropping the shallowest ones over max_entries"""
+        count = conn.execute("SELECT COUNT(*) FROM analysis").fetchone()[0]
+        if count > self.max_entries:
+            with conn:
+                conn.execute(
+                    "DELETE FROM analysis WHERE key NOT IN "
+                    "(SELECT key FROM analysis ORDER BY depth DESC LIMIT ?)", (self.max_entries,)
+                )
+
+        stored = {
+            _to_unsigned(key): (depth, score, move, bound)
+            for key, depth, score, move, bound in conn.execute(
+                "SELECT key, depth, score, move, bound FROM analysis")
+        }
+        with self._lock:
+            # Results stored during loading are newer, keep them when deeper
+            for key, entry in self.entries.items():
+                if key not in stored or stored[key][0] <= entry[0]:
+                    stored[key] = entry
+            self.entries = stored
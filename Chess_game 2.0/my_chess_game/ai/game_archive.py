@@ -0,0 +1,288 @@
+import os
+import struct
+import time
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, TextIO, Tuple
+
+import chess
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_ARCHIVE_PATH = os.path.join(os.path.expanduser("~"), ".pygame_chess_games.pca")
+
+MAGIC = b"PCGA\x01"
+
+# Game record: total size, unix time, result, plies, tag bytes. It is followed by
+# the tags, a length-prefixed starting FEN (empty for the standard start) and one
+# byte per move, the move's index among the sorted legal moves.
+RECORD = struct.Struct("<IIBHH")
+
+# Index entry per game in the .idx file: record offset, unix time, result, plies
+INDEX = struct.Struct("<QIBxH")
+
+RESULTS = ["1-0", "1/2-1/2", "0-1", "*"]
+
+
+class IndexEntry(NamedTuple):
+    offset: int
+    timestamp: int
+    result: str
+    plies: int
+
+
+class ArchivedGame(NamedTuple):
+    headers: Dict[str, str]
+    fen: Optional[str]  # None for the standard starting position
+    moves: List[chess.Move]
+    result: str
+    timestamp: int
+
+    def board(self) -> chess.Board:
+        """Starting position of the game"""
+        return chess.Board(self.fen) if self.fen else chess.Board()
+
+
+@contextmanager
+def _locked(path: str):
+    """Hold the archive's lock file, so processes sharing the archive write one at a time"""
+    with open(path + ".lock", "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)  # OSError after about 10 seconds
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _move_key(move: chess.Move) -> int:
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def _sorted_moves(board: chess.Board) -> List[chess.Move]:
+    """Legal moves in an order that does not depend on the python-chess version"""
+    return sorted(board.legal_moves, key=_move_key)
+
+
+def encode_moves(board: chess.Board, moves: List[chess.Move]) -> bytes:
+    """One byte per move; no position has more than 218 legal moves"""
+    board = board.copy(stack=False)
+    data = bytearray()
+    for move in moves:
+        data.append(_sorted_moves(board).index(move))
+        board.push(move)
+    return bytes(data)
+
+
+def decode_moves(board: chess.Board, data: bytes) -> List[chess.Move]:
+    board = board.copy(stack=False)
+    moves = []
+    for index in data:
+        legal = _sorted_moves(board)
+        if index >= len(legal):
+            raise ValueError("corrupt game record: move index out of range")
+        moves.append(legal[index])
+        board.push(legal[index])
+    return moves
+
+
+class GameArchive:
+    """Append-only file of finished games with a fixed-width index beside it.
+
+    Appends write each game with a single write, so a crash can at worst
+    leave a partial last record, which the next open cuts off. The index
+    holds the offset of every game for random access. Results and game
+    lengths can also be scanned from it without touching the games.
+
+    Several programs save to the same archive, so creating it, appending
+    and recovery hold an exclusive lock on path + ".lock": a game and its
+    index entry go in together, and recovery never cuts off a record that
+    another process is still writing.
+
+    With read_only the files are never written: the archive holds the
+    games complete when it was opened, and a record still being appended
+    by another process is left alone.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH, read_only: bool = False):
+        self.path = path
+        self.index_path = path + ".idx"
+        self.read_only = read_only
+        self._limit: Optional[int] = None  # Games visible to a read-only archive
+        if read_only:
+            with open(path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"{path} is not a game archive")
+            self._limit = self._complete_entries()[0]
+            return
+        with _locked(path):
+            if not os.path.exists(path) or os.path.getsize(path) < len(MAGIC):
+                with open(path, "wb") as f:
+                    f.write(MAGIC)
+                open(self.index_path, "wb").close()
+            elif not os.path.exists(self.index_path):
+                open(self.index_path, "wb").close()  # Rebuilt from the games below
+            with open(path, "rb") as f:
+                if f.read(len(MAGIC)) != MAGIC:
+                    raise ValueError(f"{path} is not a game archive")
+            self._recover()
+
+    def __len__(self) -> int:
+        count = os.path.getsize(self.index_path) // INDEX.size if os.path.exists(self.index_path) else 0
+        return count if self._limit is None else min(count, self._limit)
+
+    def append(self, board: chess.Board, headers: Optional[Dict[str, str]] = None,
+               result: Optional[str] = None) -> int:
+        """Store the game played on board, return its number in the archive"""
+        if self.read_only:
+            raise ValueError(f"{self.path} was opened read-only")
+        moves = board.move_stack
+        start = board.root()
+        fen = b"" if start.fen() == chess.STARTING_FEN else start.fen().encode("ascii")
+        tags = "\n".join(f"{name}\t{value}" for name, value in (headers or {}).items()).encode("utf-8")
+        if result is None:
+            result = board.result(claim_draw=True)
+        timestamp = int(time.time())
+
+        body = tags + bytes([len(fen)]) + fen + encode_moves(start, moves)
+        record = RECORD.pack(RECORD.size + len(body), timestamp, RESULTS.index(result), len(moves), len(tags)) + body
+
+        with _locked(self.path):
+            # Other processes may have appended since this one last did
+            with open(self.path, "ab") as f:
+                offset = f.seek(0, os.SEEK_END)
+                f.write(record)
+            with open(self.index_path, "ab") as f:
+                f.write(INDEX.pack(offset, timestamp, RESULTS.index(result), len(moves)))
+            return len(self) - 1
+
+    def entries(self) -> Iterator[IndexEntry]:
+        """Index entries in archive order, without reading the games"""
+        remaining = len(self)
+        if not remaining:
+            return
+        with open(self.index_path, "rb") as f:
+            while remaining:
+                chunk = f.read(INDEX.size * min(remaining, 4096))
+                if not chunk:
+                    break
+                remaining -= len(chunk) // INDEX.size
+                for offset, timestamp, result, plies in INDEX.iter_unpack(chunk):
+                    yield IndexEntry(offset, timestamp, RESULTS[result], plies)
+
+    def read(self, number: int) -> ArchivedGame:
+        """Random access to one game by its number"""
+        with open(self.path, "rb") as f:
+            f.seek(self._offset(number))
+            return self._read_record(f)
+
+    def games(self, start: int = 0, stop: Optional[int] = None) -> Iterator[ArchivedGame]:
+        """Stream games start..stop in archive order with one seek"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        if start >= stop:
+            return
+        with open(self.path, "rb", buffering=1 << 20) as f:
+            f.seek(self._offset(start))
+            for _ in range(stop - start):
+                yield self._read_record(f)
+
+    def __iter__(self) -> Iterator[ArchivedGame]:
+        return self.games()
+
+    def export_pgn(self, out: TextIO, start: int = 0, stop: Optional[int] = None) -> int:
+        """Write games start..stop as PGN, return how many were written"""
+        count = 0
+        for game in self.games(start, stop):
+            out.write(to_pgn(game))
+            count += 1
+        return count
+
+    def _offset(self, number: int) -> int:
+        with open(self.index_path, "rb") as f:
+            f.seek(max(number, 0) * INDEX.size)
+            data = f.read(INDEX.size)
+        if number < 0 or len(data) < INDEX.size:
+            raise IndexError(f"game {number} is not in the archive")
+        return INDEX.unpack(data)[0]
+
+    @staticmethod
+    def _read_record(f: BinaryIO) -> ArchivedGame:
+        header = f.read(RECORD.size)
+        size, timestamp, result, plies, tags_size = RECORD.unpack(header)
+        body = f.read(size - RECORD.size)
+        tags = body[:tags_size].decode("utf-8")
+        fen_size = body[tags_size]
+        fen = body[tags_size + 1:tags_size + 1 + fen_size].decode("ascii") or None
+        move_data = body[tags_size + 1 + fen_size:]
+        headers = dict(line.split("\t", 1) for line in tags.split("\n") if line)
+        game = ArchivedGame(headers, fen, [], RESULTS[result], timestamp)
+        return game._replace(moves=decode_moves(game.board(), move_data))
+
+    def _complete_entries(self) -> Tuple[int, int]:
+        """(index entries whose game is fully on disk, offset just past the last of those games)"""
+        data_size = os.path.getsize(self.path)
+        entries = len(self)
+        if not entries:
+            return 0, len(MAGIC)
+        with open(self.index_path, "rb") as index, open(self.path, "rb") as f:
+            while entries:
+                index.seek((entries - 1) * INDEX.size)
+                last_offset = INDEX.unpack(index.read(INDEX.size))[0]
+                f.seek(last_offset)
+                header = f.read(RECORD.size)
+                if len(header) == RECORD.size and last_offset + RECORD.unpack(header)[0] <= data_size:
+                    return entries, last_offset + RECORD.unpack(header)[0]
+                entries -= 1
+        return 0, len(MAGIC)
+
+    def _recover(self):
+        """Bring the index in line with the games file after an interrupted append, called with the lock held"""
+        data_size = os.path.getsize(self.path)
+        entries, offset = self._complete_entries()
+        with open(self.index_path, "r+b") as index:
+            # Drop index entries whose game never made it to disk
+            index.truncate(entries * INDEX.size)
+
+            # Index complete games that are missing from it, cut off a partial last one
+            with open(self.path, "r+b") as f:
+                index.seek(0, os.SEEK_END)
+                while offset < data_size:
+                    f.seek(offset)
+                    header = f.read(RECORD.size)
+                    if len(header) < RECORD.size or offset + RECORD.unpack(header)[0] > data_size:
+                        f.truncate(offset)
+                        break
+                    size, timestamp, result, plies, _ = RECORD.unpack(header)
+                    index.write(INDEX.pack(offset, timestamp, result, plies))
+                    offset += size
+
+
+def to_pgn(game: ArchivedGame) -> str:
+    """PGN text for an archived game, built directly without chess.pgn objects"""
+    board = game.board()
+    headers = {
+        "Event": "Pygame Chess",
+        "Site": "?",
+        "Date": time.strftime("%Y.%m.%d", time.localtime(game.timestamp)),
+        "Round": "-",
+        "White": "?",
+        "Black": "?",
+    }
+    headers.update(game.headers)
+    headers["Result"] = game.result
+    if game.fen:
+        headers["SetUp"] = "1"
+        headers["FEN"] = game.fen
+    lines = [f'[{name} "{value}"]' for name, value in headers.items()]
+    movetext = board.variation_san(game.moves) if game.moves else ""
+    return "\n".join(lines) + "\n\n" + (movetext + " " if movetext else "") + game.result + "\n\n"
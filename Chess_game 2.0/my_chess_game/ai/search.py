@@ -0,0 +1,347 @@
+import time
+import threading
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+import chess
+
+from ai.analysis_cache import EXACT, LOWER, UPPER
+from ai.bitboard import Position, FLAG_EN_PASSANT, PAWN
+
+PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 320,
+    chess.BISHOP: 330,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 0
+}
+
+# Piece-square tables as seen from White, rank 8 first
+PAWN_TABLE = [
+    0,  0,  0,  0,  0,  0,  0,  0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5,  5, 10, 25, 25, 10,  5,  5,
+    0,  0,  0, 20, 20,  0,  0,  0,
+    5, -5,-10,  0,  0,-10, -5,  5,
+    5, 10, 10,-20,-20, 10, 10,  5,
+    0,  0,  0,  0,  0,  0,  0,  0
+]
+
+KNIGHT_TABLE = [
+    -50,-40,-30,-30,-30,-30,-40,-50,
+    -40,-20,  0,  0,  0,  0,-20,-40,
+    -30,  0, 10, 15, 15, 10,  0,-30,
+    -30,  5, 15, 20, 20, 15,  5,-30,
+    -30,  0, 15, 20, 20, 15,  0,-30,
+    -30,  5, 10, 15, 15, 10,  5,-30,
+    -40,-20,  0,  5,  5,  0,-20,-40,
+    -50,-40,-30,-30,-30,-30,-40,-50
+]
+
+PIECE_SQUARE_TABLES = {
+    chess.PAWN: PAWN_TABLE,
+    chess.KNIGHT: KNIGHT_TABLE
+}
+
+MATE_SCORE = 100000
+MATE_THRESHOLD = MATE_SCORE - 1000
+INFINITY = 1000000
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when it is stopped or runs out of budget"""
+
+
+class PVLine(NamedTuple):
+    score: int  # centipawns from the side to move's point of view
+    moves: List[chess.Move]
+
+
+class SearchInfo(NamedTuple):
+    depth: int
+    lines: List[PVLine]
+    nodes: int
+    elapsed: float
+
+
+def evaluate(board: chess.Board) -> int:
+    """Material and piece-square evaluation from the side to move's view"""
+    score = 0
+    for piece_type, value in PIECE_VALUES.items():
+        table = PIECE_SQUARE_TABLES.get(piece_type)
+        for square in chess.scan_forward(board.pieces_mask(piece_type, chess.WHITE)):
+            score += value + (table[chess.square_mirror(square)] if table else 0)
+        for square in chess.scan_forward(board.pieces_mask(piece_type, chess.BLACK)):
+            score -= value + (table[square] if table else 0)
+    return score if board.turn == chess.WHITE else -score
+
+
+# Piece values plus square bonus, indexed [color][piece type][square]
+_SQUARE_VALUES = [[[0] * 64 for _ in range(7)] for _ in range(2)]
+for _piece_type, _value in PIECE_VALUES.items():
+    _table = PIECE_SQUARE_TABLES.get(_piece_type)
+    for _square in range(64):
+        _SQUARE_VALUES[1][_piece_type][_square] = _value + (_table[chess.square_mirror(_square)] if _table else 0)
+        _SQUARE_VALUES[0][_piece_type][_square] = _value + (_table[_square] if _table else 0)
+
+_CODE_VALUES = [0] * 16  # PIECE_VALUES by mailbox code
+for _piece_type, _value in PIECE_VALUES.items():
+    _CODE_VALUES[_piece_type] = _CODE_VALUES[8 | _piece_type] = _value
+
+
+def evaluate_position(position: Position) -> int:
+    """evaluate() for the bitboard Position used inside the search"""
+    score = 0
+    for color, sign in ((1, 1), (0, -1)):
+        values = _SQUARE_VALUES[color]
+        pieces = position.bb[color]
+        for piece_type in range(1, 7):
+            bb = pieces[piece_type]
+            table = values[piece_type]
+            while bb:
+                low = bb & -bb
+                bb ^= low
+                score += sign * table[low.bit_length() - 1]
+    return score if position.turn else -score
+
+
+def format_score(score: int) -> str:
+    """Format a centipawn score as +1.25 or #3 / #-3 for mates"""
+    if score >= MATE_THRESHOLD:
+        return f"#{(MATE_SCORE - score + 1) // 2}"
+    if score <= -MATE_THRESHOLD:
+        return f"#-{(MATE_SCORE + score + 1) // 2}"
+    return f"{score / 100:+.2f}"
+
+
+class Searcher:
+    """Iterative deepening alpha-beta search with a transposition table.
+
+    The table is kept between searches, so analysing a position that
+    follows the previous one starts warm. Searches can be bounded by
+    depth, nodes or time and stopped from another thread.
+    """
+
+    def __init__(self, tt_size: int = 1 << 20):
+        self.tt: Dict[int, Tuple[int, int, int, Optional[int]]] = {}  # moves in Position encoding
+        self.tt_size = tt_size
+        self.nodes = 0
+        self.node_limit: Optional[int] = None
+        self.deadline: Optional[float] = None
+        self.stop_event = threading.Event()
+        self._abortable = False
+
+    def stop(self):
+        """Ask a running search to return its last completed depth"""
+        self.stop_event.set()
+
+    def search(self, board: chess.Board, max_depth: int = 64, multipv: int = 1,
+               node_limit: Optional[int] = None, time_limit: Optional[float] = None,
+               on_depth: Optional[Callable[[SearchInfo], None]] = None) -> Optional[SearchInfo]:
+        """Search the position and return the deepest completed result.
+
+        on_depth is called with the top multipv lines after every depth.
+        Depth 1 always completes so a move is available on any budget.
+        """
+        position = Position(board)
+        root_moves = position.legal_moves()
+        if not root_moves:
+            return None
+
+        start = time.time()
+        self.nodes = 0
+        self.node_limit = node_limit
+        self.deadline = start + time_limit if time_limit else None
+        info = None
+
+        for depth in range(1, max_depth + 1):
+            self._abortable = depth > 1
+            try:
+                lines = []
+                excluded: Set[int] = set()
+                for _ in range(min(multipv, len(root_moves))):
+                    score, move = self._search_root(position, root_moves, depth, excluded)
+                    excluded.add(move)
+                    lines.append(PVLine(score, self._principal_variation(position, move, depth)))
+            except SearchAborted:
+                break
+
+            lines.sort(key=lambda line: line.score, reverse=True)
+            info = SearchInfo(depth, lines, self.nodes, time.time() - start)
+            if on_depth:
+                on_depth(info)
+            if abs(lines[0].score) >= MATE_THRESHOLD:
+                break
+
+        return info
+
+    def quiet_score(self, board: chess.Board) -> int:
+        """Static evaluation after resolving captures, from the side to move's view"""
+        self._abortable = False
+        return self._quiesce(Position(board), -INFINITY, INFINITY, 0)
+
+    def _check_limits(self):
+        if not self._abortable:
+            return
+        if (self.stop_event.is_set()
+                or (self.node_limit and self.nodes >= self.node_limit)
+                or (self.deadline and time.time() > self.deadline)):
+            raise SearchAborted()
+
+    def _search_root(self, position: Position, root_moves: List[int], depth: int,
+                     excluded: Set[int]) -> Tuple[int, int]:
+        key = position.key
+        entry = self.tt.get(key)
+        moves = [m for m in self._ordered_moves(position, root_moves, entry[3] if entry else None)
+                 if m not in excluded]
+
+        alpha, beta = -INFINITY, INFINITY
+        best_move = moves[0]
+        for move in moves:
+            position.push(move)
+            score = -self._negamax(position, depth - 1, -beta, -alpha, 1)
+            position.pop()
+            if score > alpha:
+                alpha, best_move = score, move
+
+        # Excluding moves changes the result, only store the unrestricted search
+        if not excluded:
+            self._store(key, depth, alpha, EXACT, best_move)
+        return alpha, best_move
+
+    def _negamax(self, position: Position, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self._check_limits()
+
+        if position.halfmove >= 100 or position.is_repetition():
+            return 0
+        in_check = position.in_check()
+        if depth <= 0:
+            if not in_check:
+                return self._quiesce(position, alpha, beta, ply)
+            depth = 1  # Look one ply further when in check so mates are not missed
+
+        key = position.key
+        entry = self.tt.get(key)
+        tt_move = None
+        if entry:
+            entry_depth, entry_score, bound, tt_move = entry
+            if entry_depth >= depth:
+                score = self._score_from_tt(entry_score, ply)
+                if (bound == EXACT
+                        or (bound == LOWER and score >= beta)
+                        or (bound == UPPER and score <= alpha)):
+                    return score
+
+        alpha_orig = alpha
+        best_score, best_move = -INFINITY, None
+        # Pseudo-legal moves, illegal ones are rejected when made
+        for move in self._ordered_moves(position, position.pseudo_moves(), tt_move):
+            if not position.make(move):
+                continue
+            score = -self._negamax(position, depth - 1, -beta, -alpha, ply + 1)
+            position.pop()
+            if score > best_score:
+                best_score, best_move = score, move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+
+        if best_move is None:
+            return -MATE_SCORE + ply if in_check else 0
+        if best_score <= alpha_orig:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self._store(key, depth, self._score_to_tt(best_score, ply), bound, best_move)
+        return best_score
+
+    def _quiesce(self, position: Position, alpha: int, beta: int, ply: int) -> int:
+        """Resolve captures so the static evaluation is not taken mid-exchange"""
+        self.nodes += 1
+        if self.nodes & 1023 == 0:
+            self._check_limits()
+
+        stand_pat = evaluate_position(position)
+        if stand_pat >= beta:
+            return stand_pat
+        alpha = max(alpha, stand_pat)
+
+        captures = sorted(position.pseudo_moves(captures_only=True),
+                          key=lambda m: self._capture_value(position, m), reverse=True)
+        for move in captures:
+            if not position.make(move):
+                continue
+            score = -self._quiesce(position, -beta, -alpha, ply + 1)
+            position.pop()
+            if score >= beta:
+                return score
+            alpha = max(alpha, score)
+        return alpha
+
+    @staticmethod
+    def _capture_value(position: Position, move: int) -> int:
+        """Most valuable victim, least valuable attacker"""
+        mailbox = position.mailbox
+        victim = _CODE_VALUES[mailbox[(move >> 6) & 63]] if move >> 15 != FLAG_EN_PASSANT else PIECE_VALUES[PAWN]
+        return victim * 10 - _CODE_VALUES[mailbox[move & 63]] // 10
+
+    def _ordered_moves(self, position: Position, moves: List[int], tt_move: Optional[int]) -> List[int]:
+        scored = []
+        for move in moves:
+            if move == tt_move:
+                score = 1000000
+            elif position.is_capture(move):
+                score = 10000 + self._capture_value(position, move)
+            elif move & 0x7000:
+                score = 9000 + PIECE_VALUES[(move >> 12) & 7]
+            else:
+                score = 0
+            scored.append((score, move))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [move for _, move in scored]
+
+    def _principal_variation(self, position: Position, first_move: int, depth: int) -> List[chess.Move]:
+        """Follow transposition table moves from the root"""
+        pv = [first_move]
+        position.push(first_move)
+        seen = {position.key}
+        while len(pv) < depth:
+            entry = self.tt.get(position.key)
+            if not entry or entry[3] is None or entry[3] not in position.legal_moves():
+                break
+            position.push(entry[3])
+            pv.append(entry[3])
+            if position.key in seen:
+                break
+            seen.add(position.key)
+        for _ in pv:
+            position.pop()
+        return [Position.to_move(move) for move in pv]
+
+    def _store(self, key: int, depth: int, score: int, bound: int, move: Optional[int]):
+        if len(self.tt) >= self.tt_size and key not in self.tt:
+            self.tt.clear()
+        self.tt[key] = (depth, score, bound, move)
+
+    @staticmethod
+    def _score_to_tt(score: int, ply: int) -> int:
+        """Store mate scores relative to the node instead of the root"""
+        if score >= MATE_THRESHOLD:
+            return score + ply
+        if score <= -MATE_THRESHOLD:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _score_from_tt(score: int, ply: int) -> int:
+        if score >= MATE_THRESHOLD:
+            return score - ply
+        if score <= -MATE_THRESHOLD:
+            return score + ply
+        return score
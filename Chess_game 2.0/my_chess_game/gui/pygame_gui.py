@@ -5,6 +5,13 @@ import numpy as np
 import chess
 from typing import List, Tuple, Optional, Dict
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from ai.analysis import BackgroundAnalyzer
+from ai.opening_index import OpeningIndex, MoveStats
+from ai.game_archive import GameArchive
+
+OPENING_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "opening_index")
+
 # Initialize pygame
 pygame.init()
 pygame.mixer.init()
@@ -35,6 +42,8 @@ PANEL_BG = (45, 45, 45)
 TEXT_PRIMARY = (255, 255, 255)
 TEXT_SECONDARY = (200, 200, 200)
 ACCENT_COLOR = (100, 149, 237)
+EVAL_WHITE = (235, 235, 235)
+EVAL_BLACK = (20, 20, 20)
 
 # Set up window
 WIN = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
@@ -187,6 +196,15 @@ class ChessGameLogic:
         self.piece_stats = self._init_piece_stats()
         self.captured_pieces = {chess.WHITE: [], chess.BLACK: []}
         self.game_start_time = pygame.time.get_ticks()
+        self.move_index = {}
+        self._rebuild_move_index()
+    
+    def _rebuild_move_index(self):
+        """Index legal moves as from_square -> to_square -> promotion -> move"""
+        index = {}
+        for move in self.board.legal_moves:
+            index.setdefault(move.from_square, {}).setdefault(move.to_square, {})[move.promotion] = move
+        self.move_index = index
     
     def _init_piece_stats(self) -> Dict:
         """Initialize piece movement statistics"""
@@ -217,25 +235,18 @@ class ChessGameLogic:
     
     def get_legal_moves_from_square(self, square: chess.Square) -> List[chess.Square]:
         """Get legal moves from a specific square"""
-        legal_moves = []
-        for move in self.board.legal_moves:
-            if move.from_square == square:
-                legal_moves.append(move.to_square)
-        return legal_moves
+        return list(self.move_index.get(square, {}))
+    
+    def is_promotion_move(self, from_square: chess.Square, to_square: chess.Square) -> bool:
+        """Check if moving between two squares is a legal promotion"""
+        variants = self.move_index.get(from_square, {}).get(to_square)
+        return bool(variants) and None not in variants
     
     def make_move(self, from_square: chess.Square, to_square: chess.Square, promotion_piece: Optional[int] = None) -> Optional[chess.Move]:
         """Make a move if it's legal"""
         # Find the exact move (handling promotions)
-        move = None
-        for legal_move in self.board.legal_moves:
-            if legal_move.from_square == from_square and legal_move.to_square == to_square:
-                if legal_move.promotion is not None:
-                    if promotion_piece is not None and legal_move.promotion == promotion_piece:
-                        move = legal_move
-                        break
-                else:
-                    move = legal_move
-                    break
+        variants = self.move_index.get(from_square, {}).get(to_square, {})
+        move = variants.get(None) or variants.get(promotion_piece)
         
         if move is None:
             return None
@@ -254,6 +265,7 @@ class ChessGameLogic:
         # Make the move
         self.board.push(move)
         self.move_history.append(move)
+        self._rebuild_move_index()
         
         return move
     
@@ -270,18 +282,14 @@ class ChessGameLogic:
                 self.selected_square = square
                 return True, None
         else:
-            # Check if the move is a pawn promotion
-            piece = self.board.piece_at(self.selected_square)
+            # Only prompt for a piece when the move is a legal promotion
             promotion_piece = None
-            if piece and piece.piece_type == chess.PAWN:
-                # Check if the move is to the promotion rank
-                to_rank = chess.square_rank(square)
-                if (self.board.turn == chess.WHITE and to_rank == 7) or (self.board.turn == chess.BLACK and to_rank == 0):
-                    # Convert board coordinates to pixel coordinates for dialog positioning
-                    to_row, to_col = self.square_to_pos(square)
-                    x = to_col * SQUARE_SIZE
-                    y = to_row * SQUARE_SIZE
-                    promotion_piece = ui.choose_promotion_piece(WIN, self.board.turn, x, y)
+            if self.is_promotion_move(self.selected_square, square):
+                # Convert board coordinates to pixel coordinates for dialog positioning
+                to_row, to_col = self.square_to_pos(square)
+                x = to_col * SQUARE_SIZE
+                y = to_row * SQUARE_SIZE
+                promotion_piece = ui.choose_promotion_piece(WIN, self.board.turn, x, y)
             
             # Try to make a move
             move = self.make_move(self.selected_square, square, promotion_piece)
@@ -324,6 +332,7 @@ class ChessGameLogic:
         self.piece_stats = self._init_piece_stats()
         self.captured_pieces = {chess.WHITE: [], chess.BLACK: []}
         self.game_start_time = pygame.time.get_ticks()
+        self._rebuild_move_index()
 
 class GameUI:
     """User interface management"""
@@ -336,6 +345,9 @@ class GameUI:
         self.font_large = pygame.font.Font(None, 32)
         self.font_medium = pygame.font.Font(None, 24)
         self.font_small = pygame.font.Font(None, 18)
+        self.analyzer: Optional[BackgroundAnalyzer] = None
+        self.opening_index = OpeningIndex(OPENING_INDEX_DIR)
+        self._book_cache: Tuple[Optional[str], List[MoveStats]] = (None, [])
     
     def draw_board(self, surface: pygame.Surface):
         """Draw the chess board"""
@@ -475,25 +487,33 @@ class GameUI:
         surface.blit(time_surface, (BOARD_WIDTH + 20, y_offset))
         y_offset += 30
         
-        # Board evaluation (simple material count)
-        material_balance = self._calculate_material_balance()
-        if material_balance > 0:
-            eval_text = f"White +{material_balance}"
-        elif material_balance < 0:
-            eval_text = f"Black +{abs(material_balance)}"
-        else:
-            eval_text = "Equal material"
-        
-        eval_surface = self.font_small.render(eval_text, True, TEXT_SECONDARY)
-        surface.blit(eval_surface, (BOARD_WIDTH + 20, y_offset))
-        y_offset += 30
+        if self.opening_index:
+            y_offset = self.draw_book_moves(surface, y_offset)
         
-        # Recent moves
-        moves_title = self.font_medium.render("Recent Moves:", True, TEXT_PRIMARY)
-        surface.blit(moves_title, (BOARD_WIDTH + 20, y_offset))
-        y_offset += 30
-        
-        recent_moves = self.game_logic.move_history[-8:]  # Show last 8 moves
+        if self.analyzer:
+            # Engine analysis replaces the material count and move list
+            y_offset = self.draw_analysis(surface, y_offset)
+            recent_moves = []
+        else:
+            # Board evaluation (simple material count)
+            material_balance = self._calculate_material_balance()
+            if material_balance > 0:
+                eval_text = f"White +{material_balance}"
+            elif material_balance < 0:
+                eval_text = f"Black +{abs(material_balance)}"
+            else:
+                eval_text = "Equal material"
+            
+            eval_surface = self.font_small.render(eval_text, True, TEXT_SECONDARY)
+            surface.blit(eval_surface, (BOARD_WIDTH + 20, y_offset))
+            y_offset += 30
+            
+            # Recent moves
+            moves_title = self.font_medium.render("Recent Moves:", True, TEXT_PRIMARY)
+            surface.blit(moves_title, (BOARD_WIDTH + 20, y_offset))
+            y_offset += 30
+            
+            recent_moves = self.game_logic.move_history[-8:]  # Show last 8 moves
         for i, move in enumerate(recent_moves):
             move_num = len(self.game_logic.move_history) - len(recent_moves) + i + 1
             try:
@@ -530,7 +550,7 @@ class GameUI:
                 y_offset += 18
         
         # Controls
-        y_offset = WINDOW_HEIGHT - 140
+        y_offset = WINDOW_HEIGHT - 155
         controls_title = self.font_small.render("Controls:", True, ACCENT_COLOR)
         surface.blit(controls_title, (BOARD_WIDTH + 20, y_offset))
         y_offset += 20
@@ -541,6 +561,7 @@ class GameUI:
             "H: Show History",
             "F: Flip Board",
             "S: Toggle Sound",
+            "A: Toggle Analysis",
             "ESC: Quit"
         ]
         
@@ -549,6 +570,70 @@ class GameUI:
             surface.blit(control_surface, (BOARD_WIDTH + 30, y_offset))
             y_offset += 15
 
+    def draw_analysis(self, surface: pygame.Surface, y_offset: int) -> int:
+        """Draw the evaluation bar and principal variations, return new y offset"""
+        update = self.analyzer.latest()
+        bar_width = INFO_PANEL_WIDTH - 40
+        bar_rect = pygame.Rect(BOARD_WIDTH + 20, y_offset, bar_width, 14)
+        
+        if update is None or update.fen != self.game_logic.board.fen():
+            pygame.draw.rect(surface, EVAL_BLACK, bar_rect)
+            pygame.draw.rect(surface, EVAL_WHITE, (bar_rect.x, bar_rect.y, bar_width // 2, bar_rect.height))
+            pygame.draw.rect(surface, TEXT_SECONDARY, bar_rect, 1)
+            y_offset += 22
+            thinking = self.font_small.render("Analysing...", True, TEXT_SECONDARY)
+            surface.blit(thinking, (BOARD_WIDTH + 20, y_offset))
+            return y_offset + 30
+        
+        # White's share of the bar follows the expected score for the evaluation
+        white_share = 1 / (1 + 10 ** (-update.score / 400))
+        pygame.draw.rect(surface, EVAL_BLACK, bar_rect)
+        pygame.draw.rect(surface, EVAL_WHITE, (bar_rect.x, bar_rect.y, int(bar_width * white_share), bar_rect.height))
+        pygame.draw.rect(surface, TEXT_SECONDARY, bar_rect, 1)
+        y_offset += 22
+        
+        header = f"Depth {update.depth}  {update.lines[0][0]}  {update.nodes // 1000}k nodes"
+        header_surface = self.font_small.render(self._fit_text(header, bar_width), True, ACCENT_COLOR)
+        surface.blit(header_surface, (BOARD_WIDTH + 20, y_offset))
+        y_offset += 20
+        
+        for score_text, variation in update.lines:
+            line = self._fit_text(f"{score_text} {variation}", bar_width - 10)
+            line_surface = self.font_small.render(line, True, TEXT_SECONDARY)
+            surface.blit(line_surface, (BOARD_WIDTH + 30, y_offset))
+            y_offset += 18
+        return y_offset + 12
+    
+    def draw_book_moves(self, surface: pygame.Surface, y_offset: int) -> int:
+        """Show games and win rates per move from the opening index"""
+        board = self.game_logic.board
+        fen = board.fen()
+        if self._book_cache[0] != fen:
+            self._book_cache = (fen, self.opening_index.lookup(board)[:3])
+        stats = self._book_cache[1]
+        if not stats:
+            return y_offset
+        
+        book_title = self.font_small.render("Book: games  W / D / B", True, ACCENT_COLOR)
+        surface.blit(book_title, (BOARD_WIDTH + 20, y_offset))
+        y_offset += 18
+        for entry in stats:
+            line = (f"{board.san(entry.move)}  {entry.games}  "
+                    f"{100 * entry.white // entry.games}/{100 * entry.draws // entry.games}/"
+                    f"{100 * entry.black // entry.games}%")
+            line_surface = self.font_small.render(self._fit_text(line, INFO_PANEL_WIDTH - 50), True, TEXT_SECONDARY)
+            surface.blit(line_surface, (BOARD_WIDTH + 30, y_offset))
+            y_offset += 16
+        return y_offset + 10
+    
+    def _fit_text(self, text: str, max_width: int) -> str:
+        """Truncate text so it fits in max_width pixels"""
+        if self.font_small.size(text)[0] <= max_width:
+            return text
+        while text and self.font_small.size(text + "...")[0] > max_width:
+            text = text[:-1]
+        return text + "..."
+    
     def choose_promotion_piece(self, surface: pygame.Surface, color: bool, x: int, y: int) -> int:
         promotion_options = [
             (chess.QUEEN, "Queen"),
@@ -644,6 +729,9 @@ class ChessGame:
         self.clock = pygame.time.Clock()
         self.running = True
         self.board_flipped = False
+        self.analyzer: Optional[BackgroundAnalyzer] = None  # Kept across toggles for its warm search table
+        self.archive: Optional[GameArchive] = None  # Opened when the first game is saved
+        self.game_saved = False
         
         # Print setup information
         self._print_setup_info()
@@ -687,6 +775,10 @@ class ChessGame:
                             
                             if move:
                                 self._play_move_sound(move)
+                                if self.ui.analyzer:
+                                    self.ui.analyzer.analyze(self.game_logic.board)
+                                if self.game_logic.board.is_game_over():
+                                    self.save_game()
             
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_r:
@@ -698,6 +790,8 @@ class ChessGame:
                     print(f"Board {'flipped' if self.board_flipped else 'normal'}")
                 elif event.key == pygame.K_s:
                     self.toggle_sound()
+                elif event.key == pygame.K_a:
+                    self.toggle_analysis()
                 elif event.key == pygame.K_ESCAPE:
                     self.running = False
     
@@ -718,9 +812,41 @@ class ChessGame:
     
     def reset_game(self):
         """Reset the game to initial state"""
+        self.save_game()  # Keep unfinished games too
         self.game_logic.reset()
+        self.game_saved = False
+        if self.ui.analyzer:
+            self.ui.analyzer.analyze(self.game_logic.board)
         print("Game reset!")
     
+    def toggle_analysis(self):
+        """Start or stop background engine analysis of the current position"""
+        if self.ui.analyzer:
+            self.ui.analyzer.stop()
+            self.ui.analyzer = None
+            print("Analysis disabled")
+        else:
+            if self.analyzer is None:
+                self.analyzer = BackgroundAnalyzer()
+            self.ui.analyzer = self.analyzer
+            self.analyzer.analyze(self.game_logic.board)
+            print("Analysis enabled")
+    
+    def save_game(self):
+        """Append the current game to the game archive, once per game"""
+        board = self.game_logic.board
+        if self.game_saved or not board.move_stack:
+            return
+        try:
+            if self.archive is None:
+                self.archive = GameArchive()
+            number = self.archive.append(board, {"Event": "Pygame Chess (hot-seat)",
+                                                 "White": "Human", "Black": "Human"})
+            self.game_saved = True
+            print(f"Game saved to {self.archive.path} as game #{number + 1}")
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not save game: {e}")
+    
     def toggle_sound(self):
         """Toggle sound on/off"""
         self.sound_engine.enabled = not self.sound_engine.enabled
@@ -752,6 +878,9 @@ class ChessGame:
             print("Draw by fivefold repetition.")
         elif board.is_variant_draw():
             print("Draw (variant rule).")
+        
+        if self.archive is not None:
+            print(f"Games in archive: {len(self.archive)} ({self.archive.path})")
 
     def run(self):
         """Main game loop"""
@@ -763,6 +892,7 @@ class ChessGame:
         print("  - H: Show complete game analysis")
         print("  - F: Flip board view")
         print("  - S: Toggle sound")
+        print("  - A: Toggle engine analysis")
         print("  - ESC: Quit game")
         print("-" * 50)
         
@@ -790,6 +920,7 @@ class ChessGame:
             pygame.display.flip()
             self.clock.tick(60)
         
+        self.save_game()
         pygame.quit()
         sys.exit()
 
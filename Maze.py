@@ -1,9 +1,11 @@
 import pygame
-import random
 import heapq
 from collections import deque
 import time
 import math
+from maze_generators import GENERATORS
+from maze_grid import HAS_NUMPY, np
+from maze_solvers import SOLVERS
 
 # Initialize Pygame
 pygame.init()
@@ -12,6 +14,8 @@ pygame.init()
 WINDOW_WIDTH = 1000
 WINDOW_HEIGHT = 800
 MAZE_SIZE = 800
+MAX_STEPS_PER_FRAME = 50  # animation catching up after a slow frame
+INSTANT_FRAME_TIME = 0.012  # seconds of searching per frame in instant mode
 CONTROL_PANEL_WIDTH = 200
 
 # Colors
@@ -41,7 +45,7 @@ class MazeSolver:
         self.cell_size = MAZE_SIZE // self.maze_size
         self.maze = []
         self.solution_path = []
-        self.explored_nodes = []
+        self.search = None  # the running solver generator
         
         # Manual navigation
         self.player_pos = (1, 1)  # Start position
@@ -56,9 +60,13 @@ class MazeSolver:
         self.big_font = pygame.font.Font(None, 48)
         
         # Algorithm selection
-        self.algorithms = ["A*", "Dijkstra", "BFS", "DFS"]
+        self.algorithms = ["A*", "Dijkstra", "BFS", "DFS"] + list(SOLVERS)
         self.current_algorithm = 0
         
+        # Generator selection (N cycles through them)
+        self.generators = list(GENERATORS)
+        self.current_generator = 0
+        
         # Statistics
         self.stats = {
             'path_length': 0,
@@ -70,52 +78,14 @@ class MazeSolver:
         # Animation
         self.animating = False
         self.animation_speed = 10  # milliseconds per step
+        self.instant = False  # I toggles: search as fast as the frame rate allows
         
         # Generate initial maze
         self.generate_maze()
     
     def generate_maze(self):
-        """Generate maze using recursive backtracking algorithm"""
-        # Initialize maze with walls (1 = wall, 0 = path)
-        self.maze = [[1 for _ in range(self.maze_size)] for _ in range(self.maze_size)]
-        
-        # Recursive backtracking
-        stack = []
-        start = (1, 1)
-        self.maze[start[0]][start[1]] = 0
-        stack.append(start)
-        
-        directions = [(0, 2), (2, 0), (0, -2), (-2, 0)]
-        
-        while stack:
-            current = stack[-1]
-            neighbors = []
-            
-            # Find unvisited neighbors
-            for dx, dy in directions:
-                nx, ny = current[0] + dx, current[1] + dy
-                if (0 < nx < self.maze_size - 1 and 
-                    0 < ny < self.maze_size - 1 and 
-                    self.maze[nx][ny] == 1):
-                    neighbors.append((nx, ny))
-            
-            if neighbors:
-                # Choose random neighbor
-                next_cell = random.choice(neighbors)
-                
-                # Remove wall between current and next
-                wall_x = current[0] + (next_cell[0] - current[0]) // 2
-                wall_y = current[1] + (next_cell[1] - current[1]) // 2
-                self.maze[wall_x][wall_y] = 0
-                self.maze[next_cell[0]][next_cell[1]] = 0
-                
-                stack.append(next_cell)
-            else:
-                stack.pop()
-        
-        # Ensure start and end are accessible
-        self.maze[1][1] = 0  # Start
-        self.maze[self.maze_size - 2][self.maze_size - 2] = 0  # End
+        """Generate maze with the selected generator (1 = wall, 0 = path)"""
+        self.maze = GENERATORS[self.generators[self.current_generator]](self.maze_size)
         
         # Reset player and game state
         self.player_pos = (1, 1)
@@ -125,8 +95,54 @@ class MazeSolver:
         
         # Clear previous solution
         self.solution_path = []
-        self.explored_nodes = []
+        self.search = None
+        self.animating = False
         self.stats = {'path_length': 0, 'nodes_explored': 0, 'solve_time': 0.0, 'player_steps': 1}
+        
+        self.render_maze_surface()
+        self.reset_overlay()
+    
+    def render_maze_surface(self):
+        """Render walls, paths and grid lines once per maze"""
+        self.maze_surface = pygame.Surface((MAZE_SIZE, MAZE_SIZE))
+        self.maze_surface.fill(WHITE)
+        side = self.maze_size * self.cell_size
+        if HAS_NUMPY:
+            # One pixel per cell, scaled up; surfarray indexes [x][y]
+            colors = np.where(np.asarray(self.maze).T[:, :, None] == 1, BLACK, WHITE).astype(np.uint8)
+            cells = pygame.surfarray.make_surface(colors)
+            self.maze_surface.blit(pygame.transform.scale(cells, (side, side)), (0, 0))
+        else:
+            for i in range(self.maze_size):
+                for j in range(self.maze_size):
+                    if self.maze[i][j] == 1:
+                        pygame.draw.rect(self.maze_surface, BLACK,
+                                         (j * self.cell_size, i * self.cell_size, self.cell_size, self.cell_size))
+        
+        # Grid lines (subtle)
+        for i in range(self.maze_size + 1):
+            pygame.draw.line(self.maze_surface, LIGHT_GRAY, (0, i * self.cell_size), (MAZE_SIZE, i * self.cell_size))
+            pygame.draw.line(self.maze_surface, LIGHT_GRAY, (i * self.cell_size, 0), (i * self.cell_size, MAZE_SIZE))
+    
+    def reset_overlay(self):
+        """Repaint the overlay layer from scratch; in manual mode it holds the trail"""
+        self.overlay = self.maze_surface.copy()
+        if self.manual_mode:
+            for pos in self.player_path[:-1]:
+                self.paint_cell(pos, PINK)
+    
+    def paint_cell(self, pos, color):
+        """Paint one cell onto the overlay layer, keeping its grid lines"""
+        x = pos[1] * self.cell_size
+        y = pos[0] * self.cell_size
+        pygame.draw.rect(self.overlay, color, (x, y, self.cell_size, self.cell_size))
+        pygame.draw.line(self.overlay, LIGHT_GRAY, (x, y), (x + self.cell_size, y))
+        pygame.draw.line(self.overlay, LIGHT_GRAY, (x, y), (x, y + self.cell_size))
+    
+    def restore_cell(self, pos):
+        """Return one cell of the overlay layer to the bare maze"""
+        rect = pygame.Rect(pos[1] * self.cell_size, pos[0] * self.cell_size, self.cell_size, self.cell_size)
+        self.overlay.blit(self.maze_surface, rect, rect)
     
     def move_player(self, direction):
         """Move player in manual mode"""
@@ -146,12 +162,15 @@ class MazeSolver:
             
             # Add to path if not backtracking
             if (new_x, new_y) not in self.player_path:
+                self.paint_cell(self.player_path[-1], PINK)
                 self.player_path.append((new_x, new_y))
                 self.stats['player_steps'] = len(self.player_path)
             else:
                 # Remove path from current position to end when backtracking
                 try:
                     backtrack_index = self.player_path.index((new_x, new_y))
+                    for pos in self.player_path[backtrack_index + 1:]:
+                        self.restore_cell(pos)
                     self.player_path = self.player_path[:backtrack_index + 1]
                     self.stats['player_steps'] = len(self.player_path)
                 except ValueError:
@@ -180,17 +199,17 @@ class MazeSolver:
         """Manhattan distance heuristic for A*"""
         return abs(a[0] - b[0]) + abs(a[1] - b[1])
     
+    # The solvers are generators: they yield each cell as they explore it and
+    # return the path, so the animation can draw a search while it runs
     def solve_astar(self, start, end):
         """A* pathfinding algorithm"""
         open_set = [(0, start)]
         came_from = {}
         g_score = {start: 0}
         f_score = {start: self.heuristic(start, end)}
-        explored = []
-        
         while open_set:
             current = heapq.heappop(open_set)[1]
-            explored.append(current)
+            yield current
             
             if current == end:
                 path = []
@@ -198,7 +217,7 @@ class MazeSolver:
                     path.append(current)
                     current = came_from[current]
                 path.append(start)
-                return path[::-1], explored
+                return path[::-1]
             
             for neighbor in self.get_neighbors(current):
                 tentative_g = g_score[current] + 1
@@ -209,22 +228,22 @@ class MazeSolver:
                     f_score[neighbor] = tentative_g + self.heuristic(neighbor, end)
                     heapq.heappush(open_set, (f_score[neighbor], neighbor))
         
-        return [], explored
+        return []
     
     def solve_dijkstra(self, start, end):
         """Dijkstra's algorithm"""
         distances = {start: 0}
         previous = {}
         unvisited = [(0, start)]
-        explored = []
-        
+        visited = set()
         while unvisited:
             current_dist, current = heapq.heappop(unvisited)
             
-            if current in explored:
+            if current in visited:
                 continue
                 
-            explored.append(current)
+            visited.add(current)
+            yield current
             
             if current == end:
                 path = []
@@ -232,7 +251,7 @@ class MazeSolver:
                     path.append(current)
                     current = previous[current]
                 path.append(start)
-                return path[::-1], explored
+                return path[::-1]
             
             for neighbor in self.get_neighbors(current):
                 distance = current_dist + 1
@@ -242,18 +261,16 @@ class MazeSolver:
                     previous[neighbor] = current
                     heapq.heappush(unvisited, (distance, neighbor))
         
-        return [], explored
+        return []
     
     def solve_bfs(self, start, end):
         """Breadth-First Search"""
         queue = deque([start])
         visited = {start}
         came_from = {}
-        explored = []
-        
         while queue:
             current = queue.popleft()
-            explored.append(current)
+            yield current
             
             if current == end:
                 path = []
@@ -261,7 +278,7 @@ class MazeSolver:
                     path.append(current)
                     current = came_from[current]
                 path.append(start)
-                return path[::-1], explored
+                return path[::-1]
             
             for neighbor in self.get_neighbors(current):
                 if neighbor not in visited:
@@ -269,15 +286,13 @@ class MazeSolver:
                     came_from[neighbor] = current
                     queue.append(neighbor)
         
-        return [], explored
+        return []
     
     def solve_dfs(self, start, end):
         """Depth-First Search"""
         stack = [start]
         visited = set()
         came_from = {}
-        explored = []
-        
         while stack:
             current = stack.pop()
             
@@ -285,7 +300,7 @@ class MazeSolver:
                 continue
                 
             visited.add(current)
-            explored.append(current)
+            yield current
             
             if current == end:
                 path = []
@@ -293,14 +308,14 @@ class MazeSolver:
                     path.append(current)
                     current = came_from[current]
                 path.append(start)
-                return path[::-1], explored
+                return path[::-1]
             
             for neighbor in self.get_neighbors(current):
                 if neighbor not in visited:
                     came_from[neighbor] = current
                     stack.append(neighbor)
         
-        return [], explored
+        return []
     
     def solve_maze_auto(self):
         """Automatically solve maze using selected algorithm"""
@@ -314,26 +329,20 @@ class MazeSolver:
         end = (self.maze_size - 2, self.maze_size - 2)
         algorithm = self.algorithms[self.current_algorithm]
         
-        start_time = time.time()
-        
+        # The search runs as the animation pulls cells from it
         if algorithm == "A*":
-            path, explored = self.solve_astar(start, end)
+            self.search = self.solve_astar(start, end)
         elif algorithm == "Dijkstra":
-            path, explored = self.solve_dijkstra(start, end)
+            self.search = self.solve_dijkstra(start, end)
         elif algorithm == "BFS":
-            path, explored = self.solve_bfs(start, end)
+            self.search = self.solve_bfs(start, end)
         elif algorithm == "DFS":
-            path, explored = self.solve_dfs(start, end)
+            self.search = self.solve_dfs(start, end)
+        elif algorithm in SOLVERS:
+            self.search = SOLVERS[algorithm](self.maze, start, end)
         
-        end_time = time.time()
-        
-        self.solution_path = path
-        self.explored_nodes = explored
-        self.stats.update({
-            'path_length': len(path),
-            'nodes_explored': len(explored),
-            'solve_time': (end_time - start_time) * 1000  # Convert to milliseconds
-        })
+        self.solution_path = []
+        self.stats.update({'path_length': 0, 'nodes_explored': 0, 'solve_time': 0.0})
         
         # Start animation
         self.animate_solution()
@@ -343,6 +352,7 @@ class MazeSolver:
         self.animating = True
         self.animation_step = 0
         self.show_exploration = True
+        self.reset_overlay()
     
     def toggle_mode(self):
         """Toggle between manual and auto mode"""
@@ -354,65 +364,14 @@ class MazeSolver:
                 self.player_path = [(1, 1)]
                 self.game_won = False
                 self.solution_path = []
-                self.explored_nodes = []
                 self.stats['player_steps'] = 1
+            self.reset_overlay()
     
     def draw_maze(self):
-        """Draw the maze"""
-        # Clear maze area
-        pygame.draw.rect(self.screen, WHITE, (0, 0, MAZE_SIZE, MAZE_SIZE))
-        
-        # Draw maze cells
-        for i in range(self.maze_size):
-            for j in range(self.maze_size):
-                x = j * self.cell_size
-                y = i * self.cell_size
-                
-                if self.maze[i][j] == 1:  # Wall
-                    pygame.draw.rect(self.screen, BLACK, (x, y, self.cell_size, self.cell_size))
-                else:  # Path
-                    pygame.draw.rect(self.screen, WHITE, (x, y, self.cell_size, self.cell_size))
+        """Draw the maze: the cached maze and overlay layer, then the player and markers"""
+        self.screen.blit(self.overlay, (0, 0))
         
-        # In auto mode, draw explored nodes and solution
-        if not self.manual_mode:
-            # Draw explored nodes (during animation)
-            if self.animating and self.show_exploration:
-                max_explored = min(self.animation_step, len(self.explored_nodes))
-                for i in range(max_explored):
-                    pos = self.explored_nodes[i]
-                    x = pos[1] * self.cell_size
-                    y = pos[0] * self.cell_size
-                    pygame.draw.rect(self.screen, CYAN, (x, y, self.cell_size, self.cell_size))
-            elif not self.animating:
-                # Draw all explored nodes when not animating
-                for pos in self.explored_nodes:
-                    x = pos[1] * self.cell_size
-                    y = pos[0] * self.cell_size
-                    pygame.draw.rect(self.screen, CYAN, (x, y, self.cell_size, self.cell_size))
-            
-            # Draw solution path
-            if self.animating and not self.show_exploration:
-                max_path = min(self.animation_step - len(self.explored_nodes), len(self.solution_path))
-                for i in range(max_path):
-                    pos = self.solution_path[i]
-                    x = pos[1] * self.cell_size
-                    y = pos[0] * self.cell_size
-                    pygame.draw.rect(self.screen, YELLOW, (x, y, self.cell_size, self.cell_size))
-            elif not self.animating:
-                # Draw complete solution path
-                for pos in self.solution_path:
-                    x = pos[1] * self.cell_size
-                    y = pos[0] * self.cell_size
-                    pygame.draw.rect(self.screen, YELLOW, (x, y, self.cell_size, self.cell_size))
-        
-        # In manual mode, draw player path
         if self.manual_mode:
-            # Draw player's path (except current position)
-            for pos in self.player_path[:-1]:
-                x = pos[1] * self.cell_size
-                y = pos[0] * self.cell_size
-                pygame.draw.rect(self.screen, PINK, (x, y, self.cell_size, self.cell_size))
-            
             # Draw player (current position)
             player_x = self.player_pos[1] * self.cell_size
             player_y = self.player_pos[0] * self.cell_size
@@ -440,11 +399,6 @@ class MazeSolver:
             pygame.draw.rect(self.screen, WHITE, text_rect.inflate(20, 10))
             pygame.draw.rect(self.screen, GREEN, text_rect.inflate(20, 10), 3)
             self.screen.blit(win_text, text_rect)
-        
-        # Draw grid lines (subtle)
-        for i in range(self.maze_size + 1):
-            pygame.draw.line(self.screen, LIGHT_GRAY, (0, i * self.cell_size), (MAZE_SIZE, i * self.cell_size))
-            pygame.draw.line(self.screen, LIGHT_GRAY, (i * self.cell_size, 0), (i * self.cell_size, MAZE_SIZE))
     
     def draw_controls(self):
         """Draw control panel"""
@@ -550,13 +504,16 @@ class MazeSolver:
             stats_info = [
                 f"Steps Taken: {self.stats['player_steps']}",
                 f"Current Pos: {self.player_pos}",
-                f"Won: {'Yes' if self.game_won else 'No'}"
+                f"Won: {'Yes' if self.game_won else 'No'}",
+                f"Generator: {self.generators[self.current_generator]}"
             ]
         else:
             stats_info = [
                 f"Path Length: {self.stats['path_length']}",
                 f"Nodes Explored: {self.stats['nodes_explored']}",
-                f"Time: {self.stats['solve_time']:.2f}ms"
+                f"Time: {self.stats['solve_time']:.2f}ms",
+                f"Speed: {'Instant' if self.instant else 'Animated'} (I)",
+                f"Generator: {self.generators[self.current_generator]}"
             ]
         
         for stat in stats_info:
@@ -641,24 +598,43 @@ class MazeSolver:
                             self.player_path = [(1, 1)]
                             self.game_won = False
                             self.stats['player_steps'] = 1
+                            self.reset_overlay()
                     elif i == 3 and not self.manual_mode:  # Clear Solution
                         self.solution_path = []
-                        self.explored_nodes = []
+                        self.search = None
                         self.stats.update({'path_length': 0, 'nodes_explored': 0, 'solve_time': 0.0})
                         self.animating = False
+                        self.reset_overlay()
     
-    def update_animation(self):
-        """Update animation state"""
-        if self.animating:
-            self.animation_step += 1
-            
-            if self.show_exploration:
-                if self.animation_step >= len(self.explored_nodes):
-                    self.show_exploration = False
-                    self.animation_step = 0
-            else:
-                if self.animation_step >= len(self.solution_path):
-                    self.animating = False
+    def update_animation(self, steps, deadline=None):
+        """Advance the animation by up to `steps` cells, or until time.time() passes `deadline`"""
+        if not self.animating:
+            return
+        
+        if self.show_exploration:
+            # Pull the next cells from the running search; only its time counts as solve time
+            cells = []
+            start_time = time.time()
+            try:
+                while len(cells) < steps and (deadline is None or time.time() < deadline):
+                    cells.append(next(self.search))
+            except StopIteration as finished:
+                self.solution_path = finished.value
+                self.stats['path_length'] = len(self.solution_path)
+                self.search = None
+                self.show_exploration = False
+                self.animation_step = 0
+            self.stats['solve_time'] += (time.time() - start_time) * 1000  # Convert to milliseconds
+            self.stats['nodes_explored'] += len(cells)
+            for pos in cells:
+                self.paint_cell(pos, CYAN)
+        else:
+            end = min(self.animation_step + steps, len(self.solution_path))
+            for pos in self.solution_path[self.animation_step:end]:
+                self.paint_cell(pos, YELLOW)
+            self.animation_step = end
+            if self.animation_step >= len(self.solution_path):
+                self.animating = False
     
     def run(self):
         """Main game loop"""
@@ -692,6 +668,9 @@ class MazeSolver:
                         self.solve_maze_auto()
                     elif event.key == pygame.K_g:
                         self.generate_maze()
+                    elif event.key == pygame.K_n:
+                        self.current_generator = (self.current_generator + 1) % len(self.generators)
+                        self.generate_maze()
                     elif event.key == pygame.K_m:
                         self.toggle_mode()
                     elif event.key == pygame.K_r and self.manual_mode:
@@ -699,15 +678,22 @@ class MazeSolver:
                         self.player_path = [(1, 1)]
                         self.game_won = False
                         self.stats['player_steps'] = 1
+                        self.reset_overlay()
+                    elif event.key == pygame.K_i:
+                        self.instant = not self.instant
                     elif event.key == pygame.K_c and not self.manual_mode:
                         self.solution_path = []
-                        self.explored_nodes = []
+                        self.search = None
                         self.stats.update({'path_length': 0, 'nodes_explored': 0, 'solve_time': 0.0})
                         self.animating = False
+                        self.reset_overlay()
             
-            # Update animation
-            if animation_timer >= self.animation_speed:
-                self.update_animation()
+            # Update animation: a bounded number of steps per frame, or a frame's worth of time
+            if self.instant:
+                self.update_animation(math.inf, time.time() + INSTANT_FRAME_TIME)
+                animation_timer = 0
+            elif animation_timer >= self.animation_speed:
+                self.update_animation(min(animation_timer // self.animation_speed, MAX_STEPS_PER_FRAME))
                 animation_timer = 0
             
             # Draw everything
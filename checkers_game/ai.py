@@ -1,16 +1,26 @@
-import pygame
-import copy
+from bitboard import BLACK, RED
 
-# Minimax AI with alpha-beta pruning
-def minimax(position, depth, max_player, game, alpha=float('-inf'), beta=float('inf')):
-    if depth == 0 or position.winner() is not None:
-        return evaluate(position), position
+nodes = 0  # Positions searched since the last reset, read by the benchmark
+
+# Minimax AI with alpha-beta pruning, searching the bitboard position in place
+def minimax(position, depth, max_player, alpha=float('-inf'), beta=float('inf')):
+    global nodes
+    nodes += 1
+    if depth == 0:
+        return evaluate(position), None
+
+    moves = position.moves()
+    if not moves or not position.red or not position.black:
+        # The side to move has lost
+        return (float('-inf') if max_player else float('inf')), None
 
     if max_player:  # AI's turn (Black)
         max_eval = float('-inf')
-        best_move = None
-        for move in get_all_moves(position, (0, 0, 0), game):  # Black pieces
-            evaluation = minimax(move, depth - 1, False, game, alpha, beta)[0]
+        best_move = moves[0]
+        for move in moves:
+            position.make(move)
+            evaluation = minimax(position, depth - 1, False, alpha, beta)[0]
+            position.unmake(move)
             if evaluation > max_eval:
                 max_eval = evaluation
                 best_move = move
@@ -20,9 +30,11 @@ def minimax(position, depth, max_player, game, alpha=float('-inf'), beta=float('
         return max_eval, best_move
     else:  # Human's turn (Red)
         min_eval = float('inf')
-        best_move = None
-        for move in get_all_moves(position, (255, 0, 0), game):  # Red pieces
-            evaluation = minimax(move, depth - 1, True, game, alpha, beta)[0]
+        best_move = moves[0]
+        for move in moves:
+            position.make(move)
+            evaluation = minimax(position, depth - 1, True, alpha, beta)[0]
+            position.unmake(move)
             if evaluation < min_eval:
                 min_eval = evaluation
                 best_move = move
@@ -32,30 +44,8 @@ def minimax(position, depth, max_player, game, alpha=float('-inf'), beta=float('
         return min_eval, best_move
 
 
-def evaluate(board):
+def evaluate(position):
     """Simple evaluation: pieces + king advantage"""
-    return board.black_left - board.red_left + (board.black_kings * 0.5 - board.red_kings * 0.5)
-
-
-def simulate_move(piece, move, board, game, skipped):
-    board.move(piece, move[0], move[1])
-    if skipped:
-        board.remove(skipped)
-    return board
-
-
-def get_all_moves(board, color, game):
-    moves = []
-
-    for row in range(8):
-        for col in range(8):
-            piece = board.get_piece(row, col)
-            if piece != 0 and piece.color == color:
-                valid_moves = game.get_valid_moves(piece)
-                for move, skipped in valid_moves.items():
-                    temp_board = copy.deepcopy(board)
-                    temp_piece = temp_board.get_piece(row, col)
-                    new_board = simulate_move(temp_piece, move, temp_board, game, skipped)
-                    moves.append(new_board)
-
-    return moves
+    black_left, black_kings = position.count(BLACK)
+    red_left, red_kings = position.count(RED)
+    return black_left - red_left + (black_kings * 0.5 - red_kings * 0.5)
@@ -0,0 +1,75 @@
+import multiprocessing
+import queue
+from typing import Optional
+
+from bitboard import Position
+from endgame_db import DEFAULT_DB_PATH, open_db
+from search import Searcher, SearchResult
+
+
+def _worker_main(requests, results, tt_size: int, endgame_db_path: Optional[str]):
+    endgame_db = open_db(endgame_db_path) if endgame_db_path else None
+    searcher = Searcher(tt_size, endgame_db)  # Lives as long as the process, so its table stays warm
+    while True:
+        request = requests.get()
+        if request is None:
+            break
+        request_id, state, think_time, max_depth = request
+        result = searcher.search(Position.from_state(state), max_depth, time_limit=think_time)
+        results.put((request_id, result))
+
+
+class AIWorker:
+    """Runs the checkers search in a separate process.
+
+    request() sends the position as a few ints and returns at once; the
+    game loop calls poll() every frame and applies the move when it
+    arrives, so rendering and events never wait for the search. Results
+    of requests that were superseded, for example by a reset, are
+    dropped. The worker probes the endgame database at endgame_db_path
+    if one has been built there.
+    """
+
+    def __init__(self, think_time: float = 1.0, max_depth: int = 64, tt_size: int = 1 << 18,
+                 endgame_db_path: Optional[str] = DEFAULT_DB_PATH):
+        self.think_time = think_time
+        self.max_depth = max_depth
+        self._requests = multiprocessing.Queue()
+        self._results = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=_worker_main, daemon=True,
+                                                args=(self._requests, self._results, tt_size, endgame_db_path))
+        self._process.start()
+        self._next_id = 0
+        self._pending: Optional[int] = None
+
+    @property
+    def busy(self) -> bool:
+        return self._pending is not None
+
+    def request(self, position: Position):
+        """Start searching a position, replacing any request still pending"""
+        self._next_id += 1
+        self._pending = self._next_id
+        self._requests.put((self._next_id, position.state(), self.think_time, self.max_depth))
+
+    def cancel(self):
+        """Forget the pending request; its result will be ignored"""
+        self._pending = None
+
+    def poll(self) -> Optional[SearchResult]:
+        """The result of the pending request if it is ready, without blocking"""
+        while self._pending is not None:
+            try:
+                request_id, result = self._results.get_nowait()
+            except queue.Empty:
+                return None
+            if request_id == self._pending:
+                self._pending = None
+                return result
+        return None
+
+    def close(self):
+        self._requests.put(None)
+        self._process.join(timeout=self.think_time + 1)
+        if self._process.is_alive():
+            self._process.terminate()
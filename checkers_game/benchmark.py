@@ -0,0 +1,197 @@
+"""Compare the bitboard checkers search with the deepcopy-based one it replaced.
+
+Usage:
+    python checkers_game/benchmark.py
+    python checkers_game/benchmark.py --depth 4 --positions 20
+
+Both minimax searches run the same fixed-depth alpha-beta minimax from the same
+positions, taken from seeded random games, and count every node they
+visit. The old search is reproduced below without pygame: a grid of
+Piece objects copied with copy.deepcopy for every move, moves found by
+walking the diagonals square by square. Its men move in the same
+direction as the bitboard engine's so both see the same game.
+"""
+import argparse
+import copy
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import ai
+from bitboard import BLACK, RED, Position, row_col
+from search import Searcher
+
+LEGACY_RED, LEGACY_BLACK = (255, 0, 0), (0, 0, 0)
+
+
+class LegacyPiece:
+    def __init__(self, row, col, color, king):
+        self.row, self.col, self.color, self.king = row, col, color, king
+
+
+class LegacyBoard:
+    def __init__(self, position):
+        self.board = [[0] * 8 for _ in range(8)]
+        self.red_left = self.black_left = self.red_kings = self.black_kings = 0
+        for square in range(32):
+            piece = position.piece_at(square)
+            if piece:
+                row, col = row_col(square)
+                color = LEGACY_RED if piece[0] == RED else LEGACY_BLACK
+                self.board[row][col] = LegacyPiece(row, col, color, piece[1])
+                if color == LEGACY_RED:
+                    self.red_left += 1
+                    self.red_kings += piece[1]
+                else:
+                    self.black_left += 1
+                    self.black_kings += piece[1]
+
+    def move(self, piece, row, col):
+        self.board[piece.row][piece.col], self.board[row][col] = self.board[row][col], self.board[piece.row][piece.col]
+        piece.row, piece.col = row, col
+        if row == 7 or row == 0:
+            piece.king = True
+
+    def remove(self, pieces):
+        for piece in pieces:
+            self.board[piece.row][piece.col] = 0
+            if piece.color == LEGACY_RED:
+                self.red_left -= 1
+            else:
+                self.black_left -= 1
+
+    def winner(self):
+        if self.red_left <= 0:
+            return "Black"
+        elif self.black_left <= 0:
+            return "Red"
+        return None
+
+    def get_valid_moves(self, piece):
+        moves = {}
+        left, right, row = piece.col - 1, piece.col + 1, piece.row
+        if piece.color == LEGACY_RED or piece.king:
+            moves.update(self._traverse(row + 1, min(row + 3, 8), 1, piece.color, left, -1))
+            moves.update(self._traverse(row + 1, min(row + 3, 8), 1, piece.color, right, 1))
+        if piece.color == LEGACY_BLACK or piece.king:
+            moves.update(self._traverse(row - 1, max(row - 3, -1), -1, piece.color, left, -1))
+            moves.update(self._traverse(row - 1, max(row - 3, -1), -1, piece.color, right, 1))
+        return moves
+
+    def _traverse(self, start, stop, step, color, col, direction, skipped=[]):
+        # _traverse_left and _traverse_right folded into one walk along a diagonal
+        moves = {}
+        last = []
+        for r in range(start, stop, step):
+            if col < 0 or col >= 8:
+                break
+            current = self.board[r][col]
+            if current == 0:
+                if skipped and not last:
+                    break
+                elif skipped:
+                    moves[(r, col)] = last + skipped
+                else:
+                    moves[(r, col)] = last
+                if last:
+                    moves.update(self._traverse(r + step, stop, step, color, col - 1, -1, skipped=last))
+                    moves.update(self._traverse(r + step, stop, step, color, col + 1, 1, skipped=last))
+                break
+            elif current.color == color:
+                break
+            else:
+                last = [current]
+            col += direction
+        return moves
+
+
+def legacy_moves(board, color):
+    moves = []
+    for row in range(8):
+        for col in range(8):
+            piece = board.board[row][col]
+            if piece != 0 and piece.color == color:
+                for (to_row, to_col), skipped in board.get_valid_moves(piece).items():
+                    temp_board = copy.deepcopy(board)
+                    temp_board.move(temp_board.board[row][col], to_row, to_col)
+                    if skipped:
+                        temp_board.remove([temp_board.board[p.row][p.col] for p in skipped])
+                    moves.append(temp_board)
+    return moves
+
+
+def legacy_minimax(board, depth, max_player, counter, alpha=float('-inf'), beta=float('inf')):
+    counter[0] += 1
+    if depth == 0 or board.winner() is not None:
+        return board.black_left - board.red_left + (board.black_kings * 0.5 - board.red_kings * 0.5)
+    best = float('-inf') if max_player else float('inf')
+    for child in legacy_moves(board, LEGACY_BLACK if max_player else LEGACY_RED):
+        evaluation = legacy_minimax(child, depth - 1, not max_player, counter, alpha, beta)
+        if max_player:
+            best = max(best, evaluation)
+            alpha = max(alpha, evaluation)
+        else:
+            best = min(best, evaluation)
+            beta = min(beta, evaluation)
+        if beta <= alpha:
+            break
+    return best
+
+
+def sample_positions(count, seed):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        position = Position()
+        for _ in range(rng.randint(4, 30)):
+            moves = position.moves()
+            if not moves:
+                break
+            position.make(rng.choice(moves))
+        if position.turn == BLACK and position.winner() is None:
+            positions.append(Position(position.red, position.black, position.kings, position.turn))
+    return positions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checkers search speed, bitboard against deepcopy")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--positions", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    positions = sample_positions(args.positions, args.seed)
+
+    counter = [0]
+    start = time.perf_counter()
+    for position in positions:
+        legacy_minimax(LegacyBoard(position), args.depth, True, counter)
+    legacy_time = time.perf_counter() - start
+    legacy_nodes = counter[0]
+
+    ai.nodes = 0
+    start = time.perf_counter()
+    for position in positions:
+        ai.minimax(position, args.depth, True)
+    bitboard_time = time.perf_counter() - start
+    bitboard_nodes = ai.nodes
+
+    searcher = Searcher()
+    searcher_nodes = 0
+    start = time.perf_counter()
+    for position in positions:
+        searcher_nodes += searcher.search(position, args.depth).nodes
+    searcher_time = time.perf_counter() - start
+
+    print(f"{len(positions)} positions, depth {args.depth}")
+    print(f"deepcopy: {legacy_nodes:>8} nodes in {legacy_time:6.2f}s  {legacy_nodes / legacy_time:>9.0f} nodes/s")
+    print(f"bitboard: {bitboard_nodes:>8} nodes in {bitboard_time:6.2f}s  {bitboard_nodes / bitboard_time:>9.0f} nodes/s")
+    print(f"searcher: {searcher_nodes:>8} nodes in {searcher_time:6.2f}s  {searcher_nodes / searcher_time:>9.0f} nodes/s"
+          "  (iterative deepening with table and move ordering)")
+    print(f"speedup:  {(bitboard_nodes / bitboard_time) / (legacy_nodes / legacy_time):.1f}x nodes/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import random
+from typing import List, Optional, Tuple
+
+# Bitboard checkers position.
+#
+# The 32 dark squares are numbered 0-31 row by row from the top of the
+# screen, four per row, so square = row * 4 + col // 2. Three 32-bit
+# masks hold the red pieces, the black pieces and which of them are
+# kings. Red starts on rows 0-2 and moves down the board, Black starts
+# on rows 5-7 and moves up, and Red moves first.
+#
+# Rules follow Game in checkers.py: captures are optional, and a jump
+# sequence may stop on any square it lands on. A man that reaches the
+# far row is crowned and its move ends there.
+#
+# A move is an int: from square | to square << 5 | captured mask << 10.
+#
+# Positions carry an incremental Zobrist key and the keys of the positions
+# before them, so a search can detect repetitions, which only king moves
+# without captures can produce.
+
+RED, BLACK = 0, 1
+
+ROWS, COLS = 8, 8
+FULL = 0xFFFFFFFF
+
+# Rows a man of each side is crowned on
+PROMOTION_ROWS = (0xF0000000, 0x0000000F)
+
+# Piece kinds for the move tables; a man's kind is its side
+RED_MAN, BLACK_MAN, KING = RED, BLACK, 2
+_DIRECTIONS = ([(1, -1), (1, 1)], [(-1, -1), (-1, 1)], [(1, -1), (1, 1), (-1, -1), (-1, 1)])
+
+
+def square_of(row: int, col: int) -> Optional[int]:
+    """Square number of a board cell, None for the light squares"""
+    if 0 <= row < ROWS and 0 <= col < COLS and (row + col) % 2 == 1:
+        return row * 4 + col // 2
+    return None
+
+
+def row_col(square: int) -> Tuple[int, int]:
+    row = square // 4
+    return row, 2 * (square % 4) + (1 if row % 2 == 0 else 0)
+
+
+def _build_tables():
+    steps = [[[] for _ in range(32)] for _ in range(3)]
+    jumps = [[[] for _ in range(32)] for _ in range(3)]
+    for kind, directions in enumerate(_DIRECTIONS):
+        for square in range(32):
+            row, col = row_col(square)
+            for dr, dc in directions:
+                step = square_of(row + dr, col + dc)
+                land = square_of(row + 2 * dr, col + 2 * dc)
+                if step is not None:
+                    steps[kind][square].append(step)
+                if land is not None:
+                    jumps[kind][square].append((1 << step, land, 1 << land))
+    return steps, jumps
+
+
+# STEPS[kind][square]: squares a simple move can go to.
+# JUMPS[kind][square]: (bit of the jumped square, landing square, landing bit).
+# NEIGHBOURS[kind][square]: mask of the step squares, which are also the squares jumped over.
+STEPS, JUMPS = _build_tables()
+NEIGHBOURS = [[sum(1 << to for to in targets) for targets in kind] for kind in STEPS]
+
+# Zobrist keys per [side + 2 if king][square], fixed so keys are stable between runs
+_rng = random.Random(0x636B7273)
+ZOBRIST = [[_rng.getrandbits(64) for _ in range(32)] for _ in range(4)]
+ZOBRIST_BLACK_TO_MOVE = _rng.getrandbits(64)
+
+
+def iter_bits(mask: int):
+    while mask:
+        bit = mask & -mask
+        yield bit.bit_length() - 1
+        mask ^= bit
+
+
+def move_from(move: int) -> int:
+    return move & 31
+
+
+def move_to(move: int) -> int:
+    return (move >> 5) & 31
+
+
+def move_captures(move: int) -> int:
+    return move >> 10
+
+
+class Position:
+    """Three masks and the side to move, changed in place by make/unmake"""
+
+    __slots__ = ("red", "black", "kings", "turn", "key", "reversible", "history", "keys")
+
+    def __init__(self, red: int = 0x00000FFF, black: int = 0xFFF00000, kings: int = 0, turn: int = RED):
+        self.red = red
+        self.black = black
+        self.kings = kings
+        self.turn = turn
+        self.key = self._compute_key()
+        self.reversible = 0  # plies since the last man move or capture
+        # Per move made: the kings mask with the reversible count above bit 32, and the key before it
+        self.history: List[int] = []
+        self.keys: List[int] = []
+
+    def copy(self) -> "Position":
+        """Same position and history, independent of this one"""
+        position = Position(self.red, self.black, self.kings, self.turn)
+        position.reversible = self.reversible
+        position.history = list(self.history)
+        position.keys = list(self.keys)
+        return position
+
+    def state(self) -> Tuple:
+        """Compact picklable form: the masks, side to move and the keys repetitions need"""
+        recent = self.keys[len(self.keys) - self.reversible:] if self.reversible else []
+        return self.red, self.black, self.kings, self.turn, tuple(recent)
+
+    @classmethod
+    def from_state(cls, state: Tuple) -> "Position":
+        red, black, kings, turn, recent = state
+        position = cls(red, black, kings, turn)
+        position.reversible = len(recent)
+        position.keys = list(recent)
+        return position
+
+    def _compute_key(self) -> int:
+        key = ZOBRIST_BLACK_TO_MOVE if self.turn == BLACK else 0
+        for side, pieces in ((RED, self.red), (BLACK, self.black)):
+            for square in iter_bits(pieces):
+                key ^= ZOBRIST[side + 2 * (self.kings >> square & 1)][square]
+        return key
+
+    def is_repetition(self) -> bool:
+        """The position occurred before, since the last man move or capture"""
+        return self.key in self.keys[len(self.keys) - self.reversible:]
+
+    def piece_at(self, square: int) -> Optional[Tuple[int, bool]]:
+        """(side, is king) of the piece on a square, or None"""
+        bit = 1 << square
+        if self.red & bit:
+            return RED, bool(self.kings & bit)
+        if self.black & bit:
+            return BLACK, bool(self.kings & bit)
+        return None
+
+    def count(self, side: int) -> Tuple[int, int]:
+        """(pieces, kings) of one side"""
+        pieces = self.red if side == RED else self.black
+        return pieces.bit_count(), (pieces & self.kings).bit_count()
+
+    def moves(self) -> List[int]:
+        """Every legal move for the side to move, simple moves and jumps"""
+        return self._generate(self.red if self.turn == RED else self.black)
+
+    def moves_from(self, square: int) -> List[int]:
+        """Legal moves of the piece on a square, empty unless it belongs to the side to move"""
+        return self._generate((self.red if self.turn == RED else self.black) & 1 << square)
+
+    def _generate(self, pieces: int) -> List[int]:
+        """Moves of the given pieces of the side to move"""
+        opp = self.black if self.turn == RED else self.red
+        empty = ~(self.red | self.black) & FULL
+        kings = self.kings
+        man = self.turn
+        moves = []
+        # Jump sequences still to extend: (origin, kind, landing square, landing bit, captured mask)
+        stack = []
+        for square in iter_bits(pieces):
+            kind = KING if kings >> square & 1 else man
+            near = NEIGHBOURS[kind][square]
+            if near & empty:
+                for to in STEPS[kind][square]:
+                    if empty >> to & 1:
+                        moves.append(square | to << 5)
+            if near & opp:
+                for over, land, land_bit in JUMPS[kind][square]:
+                    if opp & over and empty & land_bit:
+                        stack.append((square, kind, land, land_bit, over))
+        while stack:
+            origin, kind, square, bit, captured = stack.pop()
+            moves.append(origin | square << 5 | captured << 10)
+            if kind != KING and bit & PROMOTION_ROWS[kind]:
+                continue  # Crowning ends the move
+            # The moving piece has left its square, so a jump may pass over it
+            free = empty | 1 << origin
+            for over, land, land_bit in JUMPS[kind][square]:
+                if opp & over and not captured & over and free & land_bit:
+                    stack.append((origin, kind, land, land_bit, captured | over))
+        return moves
+
+    def make(self, move: int):
+        from_square = move & 31
+        to_square = (move >> 5) & 31
+        from_bit = 1 << from_square
+        to_bit = 1 << to_square
+        captured = move >> 10
+        kings = self.kings
+        side = self.turn
+        self.history.append(kings | self.reversible << 32)
+        self.keys.append(self.key)
+        key = self.key ^ ZOBRIST_BLACK_TO_MOVE
+        if side == RED:
+            self.red ^= from_bit ^ to_bit
+            self.black ^= captured
+        else:
+            self.black ^= from_bit ^ to_bit
+            self.red ^= captured
+        if captured:
+            for square in iter_bits(captured):
+                key ^= ZOBRIST[(side ^ 1) + 2 * (kings >> square & 1)][square]
+            kings &= ~captured
+        if kings & from_bit:
+            kings ^= from_bit ^ to_bit
+            key ^= ZOBRIST[side + 2][from_square] ^ ZOBRIST[side + 2][to_square]
+            self.reversible = 0 if captured else self.reversible + 1
+        else:
+            if to_bit & PROMOTION_ROWS[side]:
+                kings |= to_bit
+                key ^= ZOBRIST[side][from_square] ^ ZOBRIST[side + 2][to_square]
+            else:
+                key ^= ZOBRIST[side][from_square] ^ ZOBRIST[side][to_square]
+            self.reversible = 0
+        self.kings = kings
+        self.key = key
+        self.turn = side ^ 1
+
+    def unmake(self, move: int):
+        self.turn ^= 1
+        saved = self.history.pop()
+        self.kings = saved & FULL
+        self.reversible = saved >> 32
+        self.key = self.keys.pop()
+        # A king can jump in a circle back to its own square, so from and to may be equal
+        moved = (1 << (move & 31)) ^ (1 << ((move >> 5) & 31))
+        if self.turn == RED:
+            self.red ^= moved
+            self.black ^= move >> 10
+        else:
+            self.black ^= moved
+            self.red ^= move >> 10
+
+    def winner(self) -> Optional[int]:
+        """The side that has won: the opponent has no pieces or no moves left"""
+        if not self.red:
+            return BLACK
+        if not self.black:
+            return RED
+        if not self.moves():
+            return self.turn ^ 1
+        return None
@@ -0,0 +1,353 @@
+"""Solve checkers endgames by retrograde analysis and write the database.
+
+Usage:
+    python checkers_game/build_endgame_db.py
+    python checkers_game/build_endgame_db.py --pieces 5 -o endgame5.cdb
+
+Every position with up to --pieces pieces gets its result for the side
+to move and the number of plies to the end with perfect play. Slices of
+one material balance are solved in order, after the slices their
+captures and crownings lead to. Within a slice, positions with no moves
+are lost. Losses are then propagated backwards through predecessor
+arrays, one ply per round, until nothing changes. Positions left
+undecided are draws. Entries are bit-packed at the width the longest
+distance needs. Four pieces take about a minute; five need several GB of
+memory and a much longer run.
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+from math import comb
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bitboard import BLACK, JUMPS, KING, PROMOTION_ROWS, RED, STEPS, Position
+from endgame_db import (BLACK_MEN_FIRST, DEFAULT_DB_PATH, DRAW, LOSS, MEN_SQUARES, WIN, Signature,
+                        SliceIndex, position_groups, slice_signatures, write_db)
+
+COMB = np.array([[comb(n, k) for k in range(8)] for n in range(33)], dtype=np.int64)
+POPCOUNT16 = np.array([bin(i).count("1") for i in range(1 << 16)], dtype=np.int64)
+UNSOLVED = 0xFFFF
+
+
+def _direction_table(table) -> np.ndarray:
+    """STEPS or JUMPS as a [kind, square, direction] array, -1 where there is no move"""
+    result = np.full((3, 32, 4, 2), -1, dtype=np.int64)
+    for kind in range(3):
+        for square in range(32):
+            for direction, entry in enumerate(table[kind][square]):
+                if isinstance(entry, tuple):
+                    over, land, _ = entry
+                    result[kind, square, direction] = (over.bit_length() - 1, land)
+                else:
+                    result[kind, square, direction] = (-1, entry)
+    return result
+
+
+STEP_TABLE = _direction_table(STEPS)[..., 1]
+JUMP_OVER = _direction_table(JUMPS)[..., 0]
+JUMP_LAND = _direction_table(JUMPS)[..., 1]
+PROMOTION = np.array(PROMOTION_ROWS, dtype=np.int64)
+
+
+def popcount(masks: np.ndarray) -> np.ndarray:
+    return POPCOUNT16[masks & 0xFFFF] + POPCOUNT16[masks >> 16]
+
+
+def squares_of(masks: np.ndarray, count: int) -> np.ndarray:
+    """Sorted squares of the set bits, count per mask"""
+    squares = np.empty((len(masks), count), dtype=np.int64)
+    masks = masks.copy()
+    for i in range(count):
+        low = masks & -masks
+        squares[:, i] = np.log2(low).astype(np.int64)
+        masks ^= low
+    return squares
+
+
+def colex(squares: np.ndarray) -> np.ndarray:
+    rank = np.zeros(len(squares), dtype=np.int64)
+    for i in range(squares.shape[1]):
+        rank += COMB[squares[:, i], i + 1]
+    return rank
+
+
+def _below(squares: np.ndarray, others: np.ndarray, low: int = 0) -> np.ndarray:
+    """For every square, how many of the others lie in [low, square)"""
+    if not others.shape[1]:
+        return np.zeros_like(squares)
+    return ((others[:, None, :] >= low) & (others[:, None, :] < squares[:, :, None])).sum(axis=2)
+
+
+class VectorIndex:
+    """SliceIndex.index for arrays of positions"""
+
+    def __init__(self, signature: Signature):
+        self.slice = SliceIndex(signature)
+        self.men_offsets = np.array(self.slice.men_offsets, dtype=np.int64)
+
+    def index(self, red_men, black_men, red_kings, black_kings) -> np.ndarray:
+        black_men_rank = colex(black_men - BLACK_MEN_FIRST - _below(black_men, red_men, BLACK_MEN_FIRST))
+        men = np.concatenate([red_men, black_men], axis=1)
+        red_kings_rank = colex(red_kings - _below(red_kings, men))
+        occupied = np.concatenate([men, red_kings], axis=1)
+        black_kings_rank = colex(black_kings - _below(black_kings, occupied))
+        return ((self.men_offsets[colex(red_men)] + black_men_rank) * self.slice.king_placements
+                + red_kings_rank * self.slice.red_king_stride + black_kings_rank)
+
+    def index_masks(self, red: np.ndarray, black: np.ndarray, kings: np.ndarray) -> np.ndarray:
+        red_men, red_kings, black_men, black_kings = self.slice.signature
+        return self.index(squares_of(red & ~kings, red_men), squares_of(black & ~kings, black_men),
+                          squares_of(red & kings, red_kings), squares_of(black & kings, black_kings))
+
+
+def enumerate_slice(index: VectorIndex) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Masks of every position of the slice, ordered by index"""
+    red_men, red_kings, black_men, black_kings = index.slice.signature
+    groups = [(range(MEN_SQUARES), red_men), (range(BLACK_MEN_FIRST, 32), black_men),
+              (range(32), red_kings), (range(32), black_kings)]
+    squares = np.zeros((1, 0), dtype=np.int64)
+    group_masks = []
+    occupied = np.zeros(1, dtype=np.int64)
+    for domain, count in groups:
+        combos = list(itertools.combinations(domain, count))
+        combos = np.array(combos, dtype=np.int64).reshape(len(combos), count)
+        combo_masks = (np.int64(1) << combos).sum(axis=1) if count else np.zeros(1, dtype=np.int64)
+        rows = np.repeat(np.arange(len(squares)), len(combos))
+        picks = np.tile(np.arange(len(combos)), len(squares))
+        free = (occupied[rows] & combo_masks[picks]) == 0
+        rows, picks = rows[free], picks[free]
+        squares = np.concatenate([squares[rows], combos[picks]], axis=1)
+        occupied = occupied[rows] | combo_masks[picks]
+        group_masks = [masks[rows] for masks in group_masks] + [combo_masks[picks]]
+
+    splits = np.cumsum([red_men, black_men, red_kings])
+    numbers = index.index(*np.split(squares, splits, axis=1))
+    if len(numbers) != index.slice.size or np.bincount(numbers, minlength=index.slice.size).max() != 1:
+        raise AssertionError(f"index of slice {index.slice.signature} is not perfect")
+    order = np.argsort(numbers)
+    red = (group_masks[0] | group_masks[2])[order]
+    black = (group_masks[1] | group_masks[3])[order]
+    kings = (group_masks[2] | group_masks[3])[order]
+    return red, black, kings
+
+
+def successors(own: np.ndarray, opp: np.ndarray, kings: np.ndarray, side: int):
+    """(source, own, opp, kings) after every move, with the same rules as Position.moves"""
+    sources, new_own, new_opp, new_kings = [], [], [], []
+    empty = ~(own | opp) & 0xFFFFFFFF
+    promotion = PROMOTION[side]
+
+    def emit(src, origin, land, captured, is_king):
+        origin_bit = np.int64(1) << origin
+        land_bit = np.int64(1) << land
+        moved_kings = kings[src] & ~captured
+        moved_kings = np.where(is_king, moved_kings ^ origin_bit ^ land_bit,
+                               np.where(land_bit & promotion, moved_kings | land_bit, moved_kings))
+        sources.append(src)
+        new_own.append(own[src] ^ origin_bit ^ land_bit)
+        new_opp.append(opp[src] & ~captured)
+        new_kings.append(moved_kings)
+
+    # One entry per piece of the side to move
+    count = int(popcount(own[:1])[0]) if len(own) else 0
+    piece_squares = squares_of(own, count)
+    src = np.repeat(np.arange(len(own)), count)
+    origin = piece_squares.ravel()
+    is_king = (kings[src] >> origin) & 1 == 1
+    kind = np.where(is_king, KING, side)
+
+    for direction in range(4):
+        to = STEP_TABLE[kind, origin, direction]
+        ok = (to >= 0) & ((empty[src] >> np.maximum(to, 0)) & 1 == 1)
+        emit(src[ok], origin[ok], to[ok], np.zeros(ok.sum(), dtype=np.int64), is_king[ok])
+
+    # Jump sequences, one capture further per round; the origin counts as empty
+    at = origin
+    captured = np.zeros(len(src), dtype=np.int64)
+    jump_empty = empty[src] | (np.int64(1) << origin)
+    while len(src):
+        next_parts = []
+        for direction in range(4):
+            over = JUMP_OVER[kind, at, direction]
+            land = JUMP_LAND[kind, at, direction]
+            safe_over = np.maximum(over, 0)
+            over_bit = np.int64(1) << safe_over
+            ok = ((over >= 0) & (opp[src] & over_bit != 0) & (captured & over_bit == 0)
+                  & ((jump_empty >> np.maximum(land, 0)) & 1 == 1))
+            if not ok.any():
+                continue
+            taken = captured[ok] | over_bit[ok]
+            emit(src[ok], origin[ok], land[ok], taken, is_king[ok])
+            # A man that is crowned ends its move
+            go_on = is_king[ok] | ((np.int64(1) << land[ok]) & promotion == 0)
+            next_parts.append((src[ok][go_on], origin[ok][go_on], land[ok][go_on], taken[go_on],
+                               is_king[ok][go_on], kind[ok][go_on], jump_empty[ok][go_on]))
+        if not next_parts:
+            break
+        src, origin, at, captured, is_king, kind, jump_empty = (np.concatenate(p) for p in zip(*next_parts))
+
+    if not sources:
+        empty_array = np.zeros(0, dtype=np.int64)
+        return empty_array, empty_array, empty_array, empty_array
+    return tuple(np.concatenate(parts) for parts in (sources, new_own, new_opp, new_kings))
+
+
+def _signature_of(red, black, kings) -> np.ndarray:
+    """Material balance of each position packed into one int for grouping"""
+    return (popcount(red & ~kings) << 24 | popcount(red & kings) << 16
+            | popcount(black & ~kings) << 8 | popcount(black & kings))
+
+
+def _ranges(starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+    """Concatenation of arange(start, end) for every pair"""
+    lengths = ends - starts
+    total = int(lengths.sum())
+    if not total:
+        return np.zeros(0, dtype=np.int64)
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    return offsets + np.arange(total)
+
+
+def solve_slice(signature: Signature, red: np.ndarray, black: np.ndarray, kings: np.ndarray,
+                solved: Dict[Signature, np.ndarray], indexes: Dict[Signature, VectorIndex]) -> np.ndarray:
+    """Entries (result | plies << 2) for both sides to move of one slice, Red to move first"""
+    size = indexes[signature].slice.size
+
+    internal_src, internal_tgt = [], []
+    # Best a move into another slice achieves: plies to win, and for losing moves
+    # whether all of them lose and the longest such loss
+    ext_win = np.full(2 * size, UNSOLVED, dtype=np.int64)
+    ext_all_lose = np.ones(2 * size, dtype=bool)
+    ext_loss_plies = np.zeros(2 * size, dtype=np.int64)
+    move_count = np.zeros(2 * size, dtype=np.int64)
+
+    for side in (RED, BLACK):
+        own, opp = (red, black) if side == RED else (black, red)
+        src, new_own, new_opp, new_kings = successors(own, opp, kings, side)
+        src = src + side * size
+        move_count += np.bincount(src, minlength=2 * size)
+        new_red, new_black = (new_own, new_opp) if side == RED else (new_opp, new_own)
+
+        # Capturing the last opposing piece wins at once
+        wiped = new_opp == 0
+        np.minimum.at(ext_win, src[wiped], 1)
+        src, new_red, new_black, new_kings = src[~wiped], new_red[~wiped], new_black[~wiped], new_kings[~wiped]
+
+        keys = _signature_of(new_red, new_black, new_kings)
+        for key in np.unique(keys):
+            target = (int(key >> 24), int(key >> 16 & 255), int(key >> 8 & 255), int(key & 255))
+            part = keys == key
+            numbers = indexes[target].index_masks(new_red[part], new_black[part], new_kings[part])
+            numbers += (side ^ 1) * indexes[target].slice.size
+            if target == signature:
+                internal_src.append(src[part])
+                internal_tgt.append(numbers)
+                continue
+            entries = solved[target][numbers]
+            result, plies = entries & 3, entries >> 2
+            part_src = src[part]
+            loses = result == LOSS
+            np.minimum.at(ext_win, part_src[loses], plies[loses] + 1)
+            ext_all_lose[part_src[result != WIN]] = False
+            np.maximum.at(ext_loss_plies, part_src[result == WIN], plies[result == WIN] + 1)
+
+    internal_src = np.concatenate(internal_src) if internal_src else np.zeros(0, dtype=np.int64)
+    internal_tgt = np.concatenate(internal_tgt) if internal_tgt else np.zeros(0, dtype=np.int64)
+    order = np.argsort(internal_tgt, kind="stable")
+    predecessors = internal_src[order]
+    starts = np.searchsorted(internal_tgt[order], np.arange(2 * size + 1))
+    # Moves within the slice not yet known to lose, per position
+    undecided_moves = np.bincount(internal_src, minlength=2 * size)
+
+    result = np.full(2 * size, DRAW, dtype=np.int64)
+    plies = np.zeros(2 * size, dtype=np.int64)
+    open_ = np.ones(2 * size, dtype=bool)
+    loss_at = np.where(undecided_moves == 0, ext_loss_plies, UNSOLVED)
+
+    # Positions without a move are lost
+    new_losses = np.flatnonzero(move_count == 0)
+    result[new_losses] = LOSS
+    open_[new_losses] = False
+    new_wins = np.zeros(0, dtype=np.int64)
+    last_external = int(max(ext_win[ext_win < UNSOLVED].max(initial=0), ext_loss_plies.max(initial=0)))
+
+    k = 0
+    while len(new_losses) or len(new_wins) or k <= last_external:
+        k += 1
+        # A move to a position lost in k - 1 plies wins in k
+        candidates = predecessors[_ranges(starts[new_losses], starts[new_losses + 1])]
+        wins = np.union1d(candidates[open_[candidates]], np.flatnonzero(open_ & (ext_win == k)))
+        result[wins], plies[wins], open_[wins] = WIN, k, False
+
+        # Every move leads to a win for the opponent, the longest in k - 1 plies
+        losses = np.flatnonzero(open_ & (loss_at == k) & ext_all_lose & (move_count > 0))
+        result[losses], plies[losses], open_[losses] = LOSS, k, False
+
+        # Positions whose last undecided move was just found to lose
+        candidates = predecessors[_ranges(starts[wins], starts[wins + 1])]
+        np.subtract.at(undecided_moves, candidates, 1)
+        finished = np.unique(candidates[undecided_moves[candidates] == 0])
+        loss_at[finished] = np.maximum(ext_loss_plies[finished], k + 1)
+
+        new_losses, new_wins = losses, wins
+
+    return result | plies << 2
+
+
+def pack(entries: np.ndarray) -> Tuple[int, bytes]:
+    """Entries as a little-endian bit stream at the narrowest width that holds them"""
+    width = max(2, int(entries.max(initial=0)).bit_length())
+    if width > 16:
+        raise ValueError("distances too long to pack")
+    bits = ((entries[:, None] >> np.arange(width)) & 1).astype(np.uint8)
+    return width, np.packbits(bits.ravel(), bitorder="little").tobytes()
+
+
+def verify(index: VectorIndex, red: np.ndarray, black: np.ndarray, kings: np.ndarray, samples: int = 200):
+    """Cross-check the vector index against the one EndgameDB probes with"""
+    rng = np.random.default_rng(0)
+    for number in rng.integers(0, index.slice.size, min(samples, index.slice.size)):
+        position = Position(int(red[number]), int(black[number]), int(kings[number]))
+        if index.slice.index(*position_groups(position)) != number:
+            raise AssertionError(f"index mismatch in slice {index.slice.signature} at {number}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the checkers endgame database")
+    parser.add_argument("--pieces", type=int, default=4, help="largest number of pieces on the board")
+    parser.add_argument("-o", "--output", default=DEFAULT_DB_PATH)
+    args = parser.parse_args()
+
+    start = time.time()
+    indexes: Dict[Signature, VectorIndex] = {}
+    solved: Dict[Signature, np.ndarray] = {}
+    packed: List[Tuple[Signature, int, int, bytes]] = []
+    totals = {WIN: 0, LOSS: 0, DRAW: 0}
+    for signature in slice_signatures(args.pieces):
+        slice_start = time.time()
+        indexes[signature] = VectorIndex(signature)
+        red, black, kings = enumerate_slice(indexes[signature])
+        verify(indexes[signature], red, black, kings)
+        entries = solve_slice(signature, red, black, kings, solved, indexes)
+        solved[signature] = entries
+        width, data = pack(entries)
+        packed.append((signature, indexes[signature].slice.size, width, data))
+        counts = np.bincount(entries & 3, minlength=3)
+        for result in totals:
+            totals[result] += int(counts[result])
+        print(f"{signature}: {len(entries):>9} positions  win {counts[WIN]:>9}  loss {counts[LOSS]:>9}  "
+              f"draw {counts[DRAW]:>9}  longest {int(entries.max()) >> 2:>3} plies  {time.time() - slice_start:5.1f}s")
+
+    write_db(args.output, args.pieces, packed)
+    positions = sum(totals.values())
+    print(f"{positions} positions, {totals[WIN]} wins, {totals[LOSS]} losses, {totals[DRAW]} draws "
+          f"in {time.time() - start:.1f}s, {os.path.getsize(args.output):,} bytes written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,10 @@
+import os
+
 import pygame
 
+from bitboard import Position, move_captures, move_to, row_col, square_of
+from bitboard import BLACK as BLACK_SIDE, RED as RED_SIDE
+
 # --- Constants ---
 ROWS, COLS = 8, 8
 SQUARE_SIZE = 100
@@ -10,17 +15,57 @@ BLACK = (0, 0, 0)
 WHITE = (255, 255, 255)
 GRAY = (128, 128, 128)
 
-CROWN = pygame.image.load("checkers_game/assets/crown.png")  # Path to crown image
+CROWN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets", "crown.png")
+_crown = None
+
+
+def get_crown():
+    """The crown image, loaded the first time a king is drawn so the module imports without a display"""
+    global _crown
+    if _crown is None:
+        _crown = pygame.image.load(CROWN_PATH)
+    return _crown
+
+_background = None
+_sprites = {}
+
+
+def board_background():
+    """The empty checkerboard, rendered once"""
+    global _background
+    if _background is None:
+        _background = pygame.Surface((COLS * SQUARE_SIZE, ROWS * SQUARE_SIZE))
+        _background.fill(BLACK)
+        for row in range(ROWS):
+            for col in range(row % 2, COLS, 2):
+                pygame.draw.rect(_background, WHITE, (row*SQUARE_SIZE, col*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+    return _background
+
+
+def piece_sprite(color, king):
+    """A square-sized image of a piece, one per colour and crown, rendered on first use"""
+    sprite = _sprites.get((color, king))
+    if sprite is None:
+        sprite = pygame.Surface((SQUARE_SIZE, SQUARE_SIZE), pygame.SRCALPHA)
+        center = (SQUARE_SIZE // 2, SQUARE_SIZE // 2)
+        radius = SQUARE_SIZE // 2 - Piece.PADDING
+        pygame.draw.circle(sprite, GRAY, center, radius + Piece.OUTLINE)
+        pygame.draw.circle(sprite, color, center, radius)
+        if king:
+            crown = get_crown()
+            sprite.blit(crown, (center[0] - crown.get_width()//2, center[1] - crown.get_height()//2))
+        _sprites[(color, king)] = sprite
+    return sprite
 
 class Piece:
     PADDING = 15
     OUTLINE = 2
 
-    def __init__(self, row, col, color):
+    def __init__(self, row, col, color, king=False):
         self.row = row
         self.col = col
         self.color = color
-        self.king = False
+        self.king = king
         self.x = 0
         self.y = 0
         self.calc_pos()
@@ -29,78 +74,99 @@ class Piece:
         self.x = SQUARE_SIZE * self.col + SQUARE_SIZE // 2
         self.y = SQUARE_SIZE * self.row + SQUARE_SIZE // 2
 
-    def make_king(self):
-        self.king = True
-
     def draw(self, win):
-        radius = SQUARE_SIZE // 2 - self.PADDING
-        pygame.draw.circle(win, GRAY, (self.x, self.y), radius + self.OUTLINE)
-        pygame.draw.circle(win, self.color, (self.x, self.y), radius)
-        if self.king:
-            win.blit(CROWN, (self.x - CROWN.get_width()//2, self.y - CROWN.get_height()//2))
-
-    def move(self, row, col):
-        self.row = row
-        self.col = col
-        self.calc_pos()
+        win.blit(piece_sprite(self.color, self.king), (self.x - SQUARE_SIZE//2, self.y - SQUARE_SIZE//2))
 
 class Board:
-    def __init__(self):
+    """Renders a bitboard Position; the pieces are rebuilt from it after every move.
+
+    draw() only repaints the squares whose piece changed since it last
+    drew on the same surface, and returns their rects for
+    pygame.display.update, so frames without a move repaint nothing.
+    """
+
+    def __init__(self, position=None):
+        self.position = position or Position()
         self.board = []
-        self.red_left = self.black_left = 12
-        self.red_kings = self.black_kings = 0
-        self.create_board()
+        self._drawn = {}  # (row, col) -> (color, king) of the piece last drawn there
+        self._drawn_on = None
+        self._changed = True
+        self._sync()
+
+    @property
+    def red_left(self):
+        return self.position.count(RED_SIDE)[0]
+
+    @property
+    def black_left(self):
+        return self.position.count(BLACK_SIDE)[0]
+
+    @property
+    def red_kings(self):
+        return self.position.count(RED_SIDE)[1]
+
+    @property
+    def black_kings(self):
+        return self.position.count(BLACK_SIDE)[1]
+
+    def _sync(self):
+        self.board = [[0] * COLS for _ in range(ROWS)]
+        for square in range(32):
+            piece = self.position.piece_at(square)
+            if piece:
+                row, col = row_col(square)
+                side, king = piece
+                self.board[row][col] = Piece(row, col, RED if side == RED_SIDE else BLACK, king)
+        self._changed = True
 
     def draw_squares(self, win):
-        win.fill(BLACK)
-        for row in range(ROWS):
-            for col in range(row % 2, COLS, 2):
-                pygame.draw.rect(win, WHITE, (row*SQUARE_SIZE, col*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+        win.blit(board_background(), (0, 0))
 
-    def create_board(self):
-        for row in range(ROWS):
-            self.board.append([])
-            for col in range(COLS):
-                if col % 2 == ((row + 1) % 2):
-                    if row < 3:
-                        self.board[row].append(Piece(row, col, RED))
-                    elif row > 4:
-                        self.board[row].append(Piece(row, col, BLACK))
-                    else:
-                        self.board[row].append(0)
-                else:
-                    self.board[row].append(0)
+    def invalidate(self):
+        """Repaint the whole board on the next draw, after something else drew over it"""
+        self._drawn_on = None
 
     def draw(self, win):
-        self.draw_squares(win)
-        for row in range(ROWS):
-            for col in range(COLS):
-                piece = self.board[row][col]
-                if piece != 0:
-                    piece.draw(win)
-
-    def move(self, piece, row, col):
-        self.board[piece.row][piece.col], self.board[row][col] = self.board[row][col], self.board[piece.row][piece.col]
-        piece.move(row, col)
-        if row == ROWS - 1 or row == 0:
-            piece.make_king()
+        """Repaint what changed since the last draw, returns the rects that need updating"""
+        if self._drawn_on is not win:
+            self.draw_squares(win)
+            self._drawn = {}
+            self._drawn_on = win
+            self._changed = True
+            dirty = [win.get_rect()]
+        else:
+            dirty = []
+        if not self._changed:
+            return dirty
+        self._changed = False
+
+        cells = {(piece.row, piece.col): (piece.color, piece.king)
+                 for row in self.board for piece in row if piece != 0}
+        background = board_background()
+        for row, col in cells.keys() | self._drawn.keys():
+            cell = cells.get((row, col))
+            if cell == self._drawn.get((row, col)):
+                continue
+            rect = pygame.Rect(col*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+            win.blit(background, rect, rect)
+            if cell:
+                win.blit(piece_sprite(*cell), rect)
+            dirty.append(rect)
+        self._drawn = cells
+        return dirty
+
+    def make_move(self, move):
+        self.position.make(move)
+        self._sync()
 
     def get_piece(self, row, col):
         return self.board[row][col]
 
-    def remove(self, pieces):
-        for piece in pieces:
-            self.board[piece.row][piece.col] = 0
-            if piece != 0:
-                if piece.color == RED:
-                    self.red_left -= 1
-                else:
-                    self.black_left -= 1
-
     def winner(self):
-        if self.red_left <= 0:
+        winner = self.position.winner()
+        if winner == BLACK_SIDE:
             return "Black"
-        elif self.black_left <= 0:
+        elif winner == RED_SIDE:
             return "Red"
         return None
 
@@ -110,15 +176,19 @@ class Game:
         self.win = win
 
     def update(self):
-        self.board.draw(self.win)
-        pygame.display.update()
+        dirty = self.board.draw(self.win)
+        if dirty:
+            pygame.display.update(dirty)
 
     def _init(self):
         self.selected = None
         self.board = Board()
-        self.turn = RED
         self.valid_moves = {}
 
+    @property
+    def turn(self):
+        return RED if self.board.position.turn == RED_SIDE else BLACK
+
     def reset(self):
         self._init()
 
@@ -139,85 +209,25 @@ class Game:
     def _move(self, row, col):
         piece = self.board.get_piece(row, col)
         if self.selected and piece == 0 and (row, col) in self.valid_moves:
-            self.board.move(self.selected, row, col)
-            skipped = self.valid_moves[(row, col)]
-            if skipped:
-                self.board.remove(skipped)
-            self.change_turn()
+            self.apply_move(self.valid_moves[(row, col)])
         else:
             return False
         return True
 
-    def change_turn(self):
+    def apply_move(self, move):
+        """Play an engine move for the side to move, returns False if it is not legal in this position"""
+        if move not in self.board.position.moves():
+            return False
+        self.board.make_move(move)
+        self.selected = None
         self.valid_moves = {}
-        if self.turn == RED:
-            self.turn = BLACK
-        else:
-            self.turn = RED
+        return True
 
     def get_valid_moves(self, piece):
+        """Landing square -> move for the piece, preferring the jump that takes the most"""
         moves = {}
-        left = piece.col - 1
-        right = piece.col + 1
-        row = piece.row
-
-        if piece.color == RED or piece.king:
-            moves.update(self._traverse_left(row - 1, max(row-3, -1), -1, piece.color, left))
-            moves.update(self._traverse_right(row - 1, max(row-3, -1), -1, piece.color, right))
-        if piece.color == BLACK or piece.king:
-            moves.update(self._traverse_left(row + 1, min(row+3, ROWS), 1, piece.color, left))
-            moves.update(self._traverse_right(row + 1, min(row+3, ROWS), 1, piece.color, right))
-
-        return moves
-
-    def _traverse_left(self, start, stop, step, color, left, skipped=[]):
-        moves = {}
-        last = []
-        for r in range(start, stop, step):
-            if left < 0:
-                break
-
-            current = self.board.get_piece(r, left)
-            if current == 0:
-                if skipped and not last:
-                    break
-                elif skipped:
-                    moves[(r, left)] = last + skipped
-                else:
-                    moves[(r, left)] = last
-                if last:
-                    moves.update(self._traverse_left(r+step, stop, step, color, left-1, skipped=last))
-                    moves.update(self._traverse_right(r+step, stop, step, color, left+1, skipped=last))
-                break
-            elif current.color == color:
-                break
-            else:
-                last = [current]
-            left -= 1
-        return moves
-
-    def _traverse_right(self, start, stop, step, color, right, skipped=[]):
-        moves = {}
-        last = []
-        for r in range(start, stop, step):
-            if right >= COLS:
-                break
-
-            current = self.board.get_piece(r, right)
-            if current == 0:
-                if skipped and not last:
-                    break
-                elif skipped:
-                    moves[(r, right)] = last + skipped
-                else:
-                    moves[(r, right)] = last
-                if last:
-                    moves.update(self._traverse_left(r+step, stop, step, color, right-1, skipped=last))
-                    moves.update(self._traverse_right(r+step, stop, step, color, right+1, skipped=last))
-                break
-            elif current.color == color:
-                break
-            else:
-                last = [current]
-            right += 1
+        for move in self.board.position.moves_from(square_of(piece.row, piece.col)):
+            target = row_col(move_to(move))
+            if target not in moves or move_captures(move).bit_count() > move_captures(moves[target]).bit_count():
+                moves[target] = move
         return moves
@@ -0,0 +1,163 @@
+import itertools
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from math import comb
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from bitboard import Position, iter_bits
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "endgame.cdb")
+
+MAGIC = b"CKEDB\x01"
+HEADER = struct.Struct("<BH")  # max pieces, number of slices
+# Per slice: red men, red kings, black men, black kings, positions per side to move,
+# bits per entry, byte offset of the entries after the slice table
+SLICE = struct.Struct("<4BQBQ")
+
+# Results from the side to move's point of view. An entry is result | plies to the end << 2.
+DRAW, WIN, LOSS = 0, 1, 2
+
+# Men never stand on their crowning row: red men use squares 0-27, black men 4-31
+MEN_SQUARES = 28
+BLACK_MEN_FIRST = 4
+
+Signature = Tuple[int, int, int, int]  # (red men, red kings, black men, black kings)
+
+
+def slice_signatures(max_pieces: int) -> List[Signature]:
+    """Every material balance with both sides on the board, in the order they are solved.
+
+    Captures lead to fewer pieces and crowning to fewer men, so sorting by
+    piece count and then men puts every slice after the slices its moves
+    can leave it for.
+    """
+    signatures = []
+    for red_men, red_kings, black_men, black_kings in itertools.product(range(max_pieces + 1), repeat=4):
+        if (red_men + red_kings and black_men + black_kings
+                and red_men + red_kings + black_men + black_kings <= max_pieces):
+            signatures.append((red_men, red_kings, black_men, black_kings))
+    return sorted(signatures, key=lambda s: (sum(s), s[0] + s[2], s))
+
+
+def colex_rank(squares: Iterable[int]) -> int:
+    """Rank of a sorted combination in colexicographic order"""
+    return sum(comb(square, i + 1) for i, square in enumerate(squares))
+
+
+class SliceIndex:
+    """Perfect index of the positions of one material balance and side to move.
+
+    Groups are placed in the order red men, black men, red kings, black
+    kings. Each group is ranked as a combination of the squares still free
+    for it, so no two positions share an index and no index is unused.
+    How many squares remain for black men depends on how many red men
+    stand on rows 1-6, so the black men's block starts at a precomputed
+    offset for every red men combination.
+    """
+
+    def __init__(self, signature: Signature):
+        self.signature = signature
+        red_men, red_kings, black_men, black_kings = signature
+        self.black_king_squares = 32 - red_men - black_men - red_kings
+        self.red_king_stride = comb(self.black_king_squares, black_kings)
+        self.king_placements = comb(32 - red_men - black_men, red_kings) * self.red_king_stride
+
+        combinations = sorted(itertools.combinations(range(MEN_SQUARES), red_men), key=colex_rank)
+        self.men_offsets = []
+        total = 0
+        for squares in combinations:
+            self.men_offsets.append(total)
+            shared = sum(1 for square in squares if square >= BLACK_MEN_FIRST)
+            total += comb(MEN_SQUARES - shared, black_men)
+        self.size = total * self.king_placements
+
+    def index(self, red_men: List[int], black_men: List[int], red_kings: List[int], black_kings: List[int]) -> int:
+        """Index of a position from the sorted squares of each group"""
+        black_men_rank = colex_rank(
+            square - BLACK_MEN_FIRST - sum(1 for man in red_men if BLACK_MEN_FIRST <= man < square)
+            for square in black_men)
+        men = sorted(red_men + black_men)
+        red_kings_rank = colex_rank(square - bisect_left(men, square) for square in red_kings)
+        occupied = sorted(men + red_kings)
+        black_kings_rank = colex_rank(square - bisect_left(occupied, square) for square in black_kings)
+        return ((self.men_offsets[colex_rank(red_men)] + black_men_rank) * self.king_placements
+                + red_kings_rank * self.red_king_stride + black_kings_rank)
+
+
+def position_groups(position: Position) -> Tuple[List[int], List[int], List[int], List[int]]:
+    kings = position.kings
+    return (list(iter_bits(position.red & ~kings)), list(iter_bits(position.black & ~kings)),
+            list(iter_bits(position.red & kings)), list(iter_bits(position.black & kings)))
+
+
+def write_db(path: str, max_pieces: int, slices: List[Tuple[Signature, int, int, bytes]]):
+    """Write solved slices, given as (signature, size, bits per entry, packed entries)"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC + HEADER.pack(max_pieces, len(slices)))
+        offset = 0
+        for signature, size, width, data in slices:
+            f.write(SLICE.pack(*signature, size, width, offset))
+            offset += len(data)
+        for _, _, _, data in slices:
+            f.write(data)
+    os.replace(tmp_path, path)
+
+
+class EndgameDB:
+    """Memory-mapped endgame database written by build_endgame_db.py.
+
+    probe() returns the result and the number of plies to the end with
+    perfect play for any position with up to max_pieces pieces. Entries
+    are read straight from the mapped file, so opening it costs only the
+    slice table.
+    """
+
+    def __init__(self, path: str = DEFAULT_DB_PATH):
+        self.path = path
+        self._file: BinaryIO = open(path, "rb")
+        self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a checkers endgame database")
+        self.max_pieces, count = HEADER.unpack_from(self._data, len(MAGIC))
+        table = len(MAGIC) + HEADER.size
+        data_start = table + count * SLICE.size
+        self.slices: Dict[Signature, Tuple[SliceIndex, int, int]] = {}
+        for i in range(count):
+            *signature, size, width, offset = SLICE.unpack_from(self._data, table + i * SLICE.size)
+            index = SliceIndex(tuple(signature))
+            if index.size != size:
+                raise ValueError(f"{path}: slice {signature} has {size} positions, expected {index.size}")
+            self.slices[index.signature] = (index, width, data_start + offset)
+
+    def probe(self, position: Position) -> Optional[Tuple[int, int]]:
+        """(result, plies to the end) for the side to move, None if the position is not covered"""
+        if (position.red | position.black).bit_count() > self.max_pieces:
+            return None
+        groups = position_groups(position)
+        entry = self.slices.get(tuple(len(group) for group in (groups[0], groups[2], groups[1], groups[3])))
+        if entry is None:
+            return None
+        index, width, start = entry
+        number = position.turn * index.size + index.index(*groups)
+        bit = number * width
+        chunk = int.from_bytes(self._data[start + (bit >> 3):start + (bit >> 3) + 3], "little")
+        value = (chunk >> (bit & 7)) & ((1 << width) - 1)
+        return value & 3, value >> 2
+
+    def close(self):
+        self._data.close()
+        self._file.close()
+
+
+def open_db(path: str = DEFAULT_DB_PATH) -> Optional[EndgameDB]:
+    """The database if it has been built, None otherwise"""
+    if not os.path.exists(path):
+        return None
+    try:
+        return EndgameDB(path)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not open endgame database {path}: {e}")
+        return None
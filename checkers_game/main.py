@@ -1,9 +1,12 @@
+import argparse
 import pygame
 import sys
 from checkers import Game, SQUARE_SIZE, BLACK
-from ai import minimax
+from ai_worker import AIWorker
+from endgame_db import DEFAULT_DB_PATH
 
 WIDTH, HEIGHT = 800, 800
+AI_THINK_TIME = 1.0  # Seconds per AI move; the search goes as deep as this allows
 
 def get_row_col_from_mouse(pos):
     x, y = pos
@@ -40,6 +43,14 @@ def menu_screen(win):
     return mode
 
 def main():
+    parser = argparse.ArgumentParser(description="Checkers")
+    parser.add_argument("--think-time", type=float, default=AI_THINK_TIME, help="seconds the AI may think per move")
+    parser.add_argument("--endgame-db", default=DEFAULT_DB_PATH,
+                        help="endgame database written by build_endgame_db.py, used if present")
+    args = parser.parse_args()
+
+    # Start the search process before pygame so it does not inherit the display
+    worker = AIWorker(args.think_time, endgame_db_path=args.endgame_db)
     pygame.init()
     WIN = pygame.display.set_mode((WIDTH, HEIGHT))
     pygame.display.set_caption("Checkers")
@@ -56,21 +67,30 @@ def main():
             print(f"{game.board.winner()} wins!")
             run = False
 
-        if mode == "pvai" and game.turn == BLACK:
-            value, new_board = minimax(game.board, 3, True, game)
-            game.board = new_board
-            game.change_turn()
+        if run and mode == "pvai" and game.turn == BLACK:
+            # The search runs in the worker, the window keeps drawing meanwhile
+            if not worker.busy:
+                worker.request(game.board.position)
+                pygame.display.set_caption("Checkers - AI thinking...")
+            result = worker.poll()
+            if result is not None:
+                # A move that is not legal here was searched for another position; ask again
+                game.apply_move(result.move)
+                pygame.display.set_caption("Checkers")
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 run = False
             if event.type == pygame.MOUSEBUTTONDOWN:
+                if mode == "pvai" and game.turn == BLACK:
+                    continue  # The AI's pieces are not the player's to move while it thinks
                 pos = pygame.mouse.get_pos()
                 row, col = get_row_col_from_mouse(pos)
                 game.select(row, col)
 
         game.update()
 
+    worker.close()
     pygame.quit()
     sys.exit()
 
@@ -0,0 +1,288 @@
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from bitboard import BLACK, RED, Position, row_col
+from endgame_db import DRAW, WIN, EndgameDB
+
+MAN_VALUE = 100
+KING_VALUE = 150  # The old evaluation's half a piece extra per king
+ADVANCE_VALUE = 4  # Per row a man has moved towards crowning
+BACK_ROW_VALUE = 10  # Per man still guarding its own crowning row against the opponent
+CENTER_KING_VALUE = 10  # Per king on the central squares
+
+WIN_SCORE = 100000
+WIN_THRESHOLD = WIN_SCORE - 1000
+INFINITY = 1000000
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class SearchAborted(Exception):
+    """Raised inside the search when it runs out of nodes or time"""
+
+
+class SearchResult(NamedTuple):
+    move: int
+    score: int  # from the side to move's point of view
+    depth: int
+    nodes: int
+    elapsed: float
+
+
+def evaluate(position: Position) -> int:
+    """Material from the side to move's point of view"""
+    red = position.red
+    black = position.black
+    kings = position.kings
+    score = (MAN_VALUE * (black.bit_count() - red.bit_count())
+             + (KING_VALUE - MAN_VALUE) * ((black & kings).bit_count() - (red & kings).bit_count()))
+    return score if position.turn == BLACK else -score
+
+
+def _row_masks(side: int) -> List[Tuple[int, int]]:
+    """(mask of a row, bonus for a man of the side on it) for every row"""
+    masks = []
+    for row in range(8):
+        advanced = row if side == RED else 7 - row
+        bonus = BACK_ROW_VALUE if advanced == 0 else ADVANCE_VALUE * advanced
+        masks.append((0xF << 4 * row, bonus))
+    return masks
+
+
+MAN_ROW_BONUS = (_row_masks(RED), _row_masks(BLACK))
+CENTER = sum(1 << square for square in range(32) if 2 <= row_col(square)[0] <= 5 and 2 <= row_col(square)[1] <= 5)
+
+
+def evaluate_positional(position: Position) -> int:
+    """Material plus man advancement, back row guards and central kings"""
+    kings = position.kings
+    scores = []
+    for side, pieces in ((RED, position.red), (BLACK, position.black)):
+        men = pieces & ~kings
+        score = (MAN_VALUE * men.bit_count() + KING_VALUE * (pieces & kings).bit_count()
+                 + CENTER_KING_VALUE * (pieces & kings & CENTER).bit_count())
+        for mask, bonus in MAN_ROW_BONUS[side]:
+            score += bonus * (men & mask).bit_count()
+        scores.append(score)
+    return scores[position.turn] - scores[position.turn ^ 1]
+
+
+EVALUATORS: Dict[str, Callable[[Position], int]] = {"material": evaluate, "positional": evaluate_positional}
+
+
+class Searcher:
+    """Iterative deepening alpha-beta search for checkers.
+
+    The transposition table, keyed by the position's Zobrist key, is kept
+    between searches and cleared when it reaches tt_size entries. Moves
+    are tried in the order: table move, captures by the number of pieces
+    taken, the two killer moves of the ply, then the rest. A search stops
+    at the node or time budget and returns the deepest completed depth.
+
+    Leaves are scored by evaluator, from the side to move's point of
+    view. With an endgame database, positions it covers are scored exactly
+    without searching below them, and a root it covers is answered at
+    once from the results of its moves.
+    """
+
+    def __init__(self, tt_size: int = 1 << 18, endgame_db: Optional[EndgameDB] = None,
+                 evaluator: Callable[[Position], int] = evaluate):
+        self.tt: Dict[int, Tuple[int, int, int, int]] = {}  # key -> (depth, score, bound, move)
+        self.tt_size = tt_size
+        self.killers: List[List[int]] = []
+        self.nodes = 0
+        self.node_limit: Optional[int] = None
+        self.deadline: Optional[float] = None
+        self._abortable = False
+        self._path: List[int] = []  # moves made from the root, to restore the position on abort
+        self.evaluator = evaluator
+        self.endgame_db = endgame_db
+        self.db_max_pieces = endgame_db.max_pieces if endgame_db else 0
+
+    def search(self, position: Position, max_depth: int = 64, node_limit: Optional[int] = None,
+               time_limit: Optional[float] = None) -> Optional[SearchResult]:
+        """Best move for the side to move, None if it has no moves.
+
+        The position is searched in place and restored before returning.
+        Depth 1 always completes, so any budget gives a move.
+        """
+        root_moves = position.moves()
+        if not root_moves:
+            return None
+
+        start = time.time()
+        self.nodes = 0
+        if (position.red | position.black).bit_count() <= self.db_max_pieces:
+            played = self._probe_root(position, root_moves)
+            if played is not None:
+                return SearchResult(*played, 0, len(root_moves), time.time() - start)
+
+        self.node_limit = node_limit
+        self.deadline = start + time_limit if time_limit else None
+        self.killers = [[0, 0] for _ in range(max_depth + 1)]
+        result = None
+
+        for depth in range(1, max_depth + 1):
+            self._abortable = depth > 1
+            try:
+                score, move = self._search_root(position, root_moves, depth)
+            except SearchAborted:
+                while self._path:  # Take back the moves of the interrupted line
+                    self._unmake(position)
+                break
+            result = SearchResult(move, score, depth, self.nodes, time.time() - start)
+            if abs(score) >= WIN_THRESHOLD or len(root_moves) == 1:
+                break
+
+        return result
+
+    def _probe_root(self, position: Position, root_moves: List[int]) -> Optional[Tuple[int, int]]:
+        """(move, score) of the quickest win or slowest loss, None if a move leaves the database"""
+        best = None
+        for move in root_moves:
+            position.make(move)
+            if not position.red or not position.black:
+                score = WIN_SCORE - 1
+            else:
+                probed = self.endgame_db.probe(position)
+                score = None if probed is None else -self._db_score(*probed, 1)
+            position.unmake(move)
+            if score is None:
+                return None
+            if best is None or score > best[1]:
+                best = (move, score)
+        return best
+
+    @staticmethod
+    def _db_score(result: int, plies: int, ply: int) -> int:
+        if result == DRAW:
+            return 0
+        score = WIN_SCORE - ply - plies
+        return score if result == WIN else -score
+
+    def _check_limits(self):
+        if not self._abortable:
+            return
+        if self.node_limit and self.nodes >= self.node_limit:
+            raise SearchAborted()
+        if self.deadline and self.nodes & 255 == 0 and time.time() > self.deadline:
+            raise SearchAborted()
+
+    def _search_root(self, position: Position, root_moves: List[int], depth: int) -> Tuple[int, int]:
+        entry = self.tt.get(position.key)
+        moves = self._ordered_moves(root_moves, entry[3] if entry else 0, 0)
+        alpha, beta = -INFINITY, INFINITY
+        best_move = moves[0]
+        for move in moves:
+            self._make(position, move)
+            score = -self._negamax(position, depth - 1, -beta, -alpha, 1)
+            self._unmake(position)
+            if score > alpha:
+                alpha = score
+                best_move = move
+        self._store(position.key, depth, alpha, EXACT, best_move)
+        return alpha, best_move
+
+    def _make(self, position: Position, move: int):
+        position.make(move)
+        self._path.append(move)
+
+    def _unmake(self, position: Position):
+        position.unmake(self._path.pop())
+
+    def _negamax(self, position: Position, depth: int, alpha: int, beta: int, ply: int) -> int:
+        self.nodes += 1
+        self._check_limits()
+
+        if position.reversible and position.is_repetition():
+            return 0
+
+        if (position.red | position.black).bit_count() <= self.db_max_pieces:
+            probed = self.endgame_db.probe(position)
+            if probed is not None:
+                return self._db_score(*probed, ply)
+
+        key = position.key
+        entry = self.tt.get(key)
+        tt_move = 0
+        if entry:
+            entry_depth, entry_score, bound, tt_move = entry
+            if entry_depth >= depth:
+                score = self._score_from_tt(entry_score, ply)
+                if (bound == EXACT or (bound == LOWER and score >= beta)
+                        or (bound == UPPER and score <= alpha)):
+                    return score
+
+        moves = position.moves()
+        if not moves or not position.red or not position.black:
+            return -WIN_SCORE + ply  # The side to move has lost
+        if depth <= 0:
+            return self.evaluator(position)
+
+        original_alpha = alpha
+        best_score = -INFINITY
+        best_move = 0
+        for move in self._ordered_moves(moves, tt_move, ply):
+            self._make(position, move)
+            score = -self._negamax(position, depth - 1, -beta, -alpha, ply + 1)
+            self._unmake(position)
+            if score > best_score:
+                best_score = score
+                best_move = move
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if not move >> 10 and ply < len(self.killers):
+                    killers = self.killers[ply]
+                    if killers[0] != move:
+                        killers[1] = killers[0]
+                        killers[0] = move
+                break
+
+        if best_score <= original_alpha:
+            bound = UPPER
+        elif best_score >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self._store(key, depth, self._score_to_tt(best_score, ply), bound, best_move)
+        return best_score
+
+    def _ordered_moves(self, moves: List[int], tt_move: int, ply: int) -> List[int]:
+        killers = self.killers[ply] if ply < len(self.killers) else (0, 0)
+
+        def priority(move: int) -> int:
+            if move == tt_move:
+                return 1 << 40
+            captured = move >> 10
+            if captured:
+                return (1 << 20) + captured.bit_count()
+            if move == killers[0]:
+                return 2
+            if move == killers[1]:
+                return 1
+            return 0
+
+        return sorted(moves, key=priority, reverse=True)
+
+    def _store(self, key: int, depth: int, score: int, bound: int, move: int):
+        if len(self.tt) >= self.tt_size and key not in self.tt:
+            self.tt.clear()
+        self.tt[key] = (depth, score, bound, move)
+
+    @staticmethod
+    def _score_to_tt(score: int, ply: int) -> int:
+        """Store win scores relative to the node instead of the root"""
+        if score >= WIN_THRESHOLD:
+            return score + ply
+        if score <= -WIN_THRESHOLD:
+            return score - ply
+        return score
+
+    @staticmethod
+    def _score_from_tt(score: int, ply: int) -> int:
+        if score >= WIN_THRESHOLD:
+            return score - ply
+        if score <= -WIN_THRESHOLD:
+            return score + ply
+        return score
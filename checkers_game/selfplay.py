@@ -0,0 +1,181 @@
+"""Play checkers AI configurations against each other without a window.
+
+Usage:
+    python checkers_game/selfplay.py
+    python checkers_game/selfplay.py depth=4 time=0.2,eval=positional --games 40 --workers 4
+
+Each configuration is comma separated key=value pairs: depth (deepest
+iteration), time (seconds per move), nodes (node limit per move) and
+eval (material or positional). A configuration without a depth, time
+or node limit thinks for 0.1 seconds a move. Every pair of
+configurations plays --games games over a process pool. The games
+start from seeded random openings, each opening played twice with the
+colours swapped. A game is drawn after --max-plies plies, or after
+DRAW_PLIES plies without a man move or a capture. The report gives
+each configuration's results, its search speed and its move latency
+percentiles.
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from bitboard import Position
+from search import EVALUATORS, Searcher
+
+DRAW_PLIES = 80  # Forty moves each with only king moves
+
+
+class PlayerConfig(NamedTuple):
+    label: str
+    max_depth: int = 64
+    time_limit: Optional[float] = None
+    node_limit: Optional[int] = None
+    evaluator: str = "material"
+
+
+class GameRecord(NamedTuple):
+    red: int  # index of the configuration playing Red
+    black: int
+    winner: Optional[int]  # RED, BLACK or None for a draw
+    plies: int
+    moves: List[Tuple[int, float, int]]  # (side, seconds, nodes) per engine move
+
+
+def parse_config(text: str) -> PlayerConfig:
+    values = {}
+    for item in text.split(","):
+        key, _, value = item.partition("=")
+        if key == "depth":
+            values["max_depth"] = int(value)
+        elif key == "time":
+            values["time_limit"] = float(value)
+        elif key == "nodes":
+            values["node_limit"] = int(value)
+        elif key == "eval":
+            if value not in EVALUATORS:
+                raise argparse.ArgumentTypeError(f"unknown evaluator {value!r}, expected one of {sorted(EVALUATORS)}")
+            values["evaluator"] = value
+        else:
+            raise argparse.ArgumentTypeError(f"unknown setting {key!r} in {text!r}")
+    if not {"max_depth", "time_limit", "node_limit"} & values.keys():
+        values["time_limit"] = 0.1
+    return PlayerConfig(text, **values)
+
+
+def random_openings(count: int, plies: int, seed: int) -> List[List[int]]:
+    """Move lists of random play that leave the game undecided"""
+    rng = random.Random(seed)
+    openings = []
+    while len(openings) < count:
+        position = Position()
+        moves = []
+        for _ in range(plies):
+            legal = position.moves()
+            if not legal:
+                break
+            moves.append(rng.choice(legal))
+            position.make(moves[-1])
+        if position.winner() is None:
+            openings.append(moves)
+    return openings
+
+
+def play_game(task: Tuple[int, int, PlayerConfig, PlayerConfig, List[int], int]) -> GameRecord:
+    """Runs in a pool worker; each side gets a fresh searcher so no table is shared"""
+    red_index, black_index, red, black, opening, max_plies = task
+    position = Position()
+    for move in opening:
+        position.make(move)
+    configs = (red, black)
+    searchers = tuple(Searcher(evaluator=EVALUATORS[config.evaluator]) for config in configs)
+    moves = []
+    plies = len(opening)
+    winner = position.winner()
+    while winner is None and plies < max_plies and position.reversible < DRAW_PLIES:
+        side = position.turn
+        config = configs[side]
+        start = time.perf_counter()
+        result = searchers[side].search(position, config.max_depth, config.node_limit, config.time_limit)
+        moves.append((side, time.perf_counter() - start, result.nodes))
+        position.make(result.move)
+        plies += 1
+        winner = position.winner()
+    return GameRecord(red_index, black_index, winner, plies, moves)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else float("nan")
+
+
+def report(configs: List[PlayerConfig], records: List[GameRecord], elapsed: float):
+    results: Dict[int, List[int]] = defaultdict(lambda: [0, 0, 0])  # wins, draws, losses
+    pairings: Dict[Tuple[int, int], List[int]] = defaultdict(lambda: [0, 0, 0])
+    latencies: Dict[int, List[float]] = defaultdict(list)
+    nodes: Dict[int, int] = defaultdict(int)
+    for record in records:
+        players = (record.red, record.black)
+        for side, player in enumerate(players):
+            outcome = 1 if record.winner is None else (0 if record.winner == side else 2)
+            results[player][outcome] += 1
+        pair = tuple(sorted(players))
+        outcome = 1 if record.winner is None else (0 if players[record.winner] == pair[0] else 2)
+        pairings[pair][outcome] += 1
+        for side, seconds, move_nodes in record.moves:
+            latencies[players[side]].append(seconds)
+            nodes[players[side]] += move_nodes
+
+    plies = sum(record.plies for record in records)
+    print(f"{len(records)} games, {plies / max(len(records), 1):.0f} plies on average, {elapsed:.1f}s")
+    for (first, second), (wins, draws, losses) in sorted(pairings.items()):
+        print(f"  {configs[first].label} vs {configs[second].label}: +{wins} ={draws} -{losses}")
+    print(f"{'configuration':<30} {'games':>5} {'win %':>6} {'draw %':>6} {'score %':>7} {'nodes/s':>9} "
+          f"{'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7}")
+    for index, config in enumerate(configs):
+        wins, draws, losses = results[index]
+        games = max(wins + draws + losses, 1)
+        thinking = sum(latencies[index])
+        rate = nodes[index] / thinking if thinking else 0.0
+        print(f"{config.label:<30} {wins + draws + losses:>5} {100 * wins / games:>6.1f} {100 * draws / games:>6.1f} "
+              f"{100 * (wins + draws / 2) / games:>7.1f} {rate:>9.0f} "
+              + " ".join(f"{percentile(latencies[index], p) * 1000:>7.1f}" for p in (0.5, 0.9, 0.99)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless checkers AI self-play")
+    parser.add_argument("configs", nargs="*", type=parse_config, metavar="CONFIG",
+                        default=[parse_config("depth=4"), parse_config("depth=4,eval=positional")],
+                        help="player settings such as depth=6 or time=0.2,eval=positional")
+    parser.add_argument("--games", type=int, default=20, help="games per pair of configurations")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--opening-plies", type=int, default=4, help="random plies before the engines take over")
+    parser.add_argument("--max-plies", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if len(args.configs) < 2:
+        parser.error("at least two configurations are needed")
+
+    openings = random_openings((args.games + 1) // 2, args.opening_plies, args.seed)
+    tasks = []
+    for first, second in itertools.combinations(range(len(args.configs)), 2):
+        for game in range(args.games):
+            opening = openings[game // 2]
+            red, black = (first, second) if game % 2 == 0 else (second, first)
+            tasks.append((red, black, args.configs[red], args.configs[black], opening, args.max_plies))
+
+    print(f"{len(tasks)} games on {args.workers} workers")
+    start = time.perf_counter()
+    with multiprocessing.Pool(args.workers) as pool:
+        records = list(pool.imap_unordered(play_game, tasks))
+    report(args.configs, records, time.perf_counter() - start)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Compare the maze generators' and solvers' speed.
+
+Usage:
+    python maze_benchmark.py
+    python maze_benchmark.py --sizes 101,501,1001 --repeat 3
+
+For every generator and grid size the table gives maze cells generated
+per second, the best of --repeat seeded runs. Eller's algorithm is also
+streamed for --stream-rows rows of a --stream-width wide maze without
+keeping the rows, the way arbitrarily tall mazes are produced.
+
+The solvers then cross one --solve-generator maze of each size from
+corner to corner, reporting milliseconds (best of --repeat) and the
+cells each took off its open list, the app's "Nodes Explored".
+"""
+import argparse
+import time
+
+from maze_generators import GENERATORS, eller_rows
+from maze_solvers import SOLVERS, run_solver
+
+
+def best_time(function, repeat):
+    best = float("inf")
+    for run in range(repeat):
+        start = time.perf_counter()
+        function(run)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maze generator benchmark")
+    parser.add_argument("--sizes", default="51,201,501", help="comma separated grid sizes")
+    parser.add_argument("--generators", default=",".join(GENERATORS), help="comma separated generator names")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--stream-rows", type=int, default=20000, help="rows of the streamed Eller maze, 0 to skip")
+    parser.add_argument("--stream-width", type=int, default=500, help="cells per row of the streamed maze")
+    parser.add_argument("--solvers", default=",".join(SOLVERS), help="comma separated solver names, empty to skip")
+    parser.add_argument("--solve-generator", default="Kruskal", help="generator of the mazes to solve")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    names = args.generators.split(",")
+    print("Generation, maze cells per second")
+    print(f"{'generator':<12}" + "".join(f"{f'{size}x{size}':>12}" for size in sizes))
+    for name in names:
+        generate = GENERATORS[name]
+        rates = []
+        for size in sizes:
+            cells = ((size - 1) // 2) ** 2
+            rates.append(cells / best_time(lambda run: generate(size, seed=run), args.repeat))
+        print(f"{name:<12}" + "".join(f"{rate:>12,.0f}" for rate in rates))
+
+    if args.stream_rows:
+        start = time.perf_counter()
+        for _ in eller_rows(args.stream_width, args.stream_rows, seed=0):
+            pass
+        elapsed = time.perf_counter() - start
+        print(f"Eller streamed {args.stream_width}x{args.stream_rows}: "
+              f"{args.stream_width * args.stream_rows / elapsed:,.0f} cells per second, one row in memory")
+
+    if args.solvers:
+        print(f"Solving {args.solve_generator} mazes, milliseconds / nodes explored")
+        print(f"{'solver':<18}" + "".join(f"{f'{size}x{size}':>20}" for size in sizes))
+        mazes = {size: GENERATORS[args.solve_generator](size, seed=0) for size in sizes}
+        for name in args.solvers.split(","):
+            solve = SOLVERS[name]
+            cells = []
+            for size in sizes:
+                maze, start, end = mazes[size], (1, 1), (size - 2, size - 2)
+                seconds = best_time(lambda run: run_solver(solve(maze, start, end)), args.repeat)
+                explored = run_solver(solve(maze, start, end))[1]
+                cells.append(f"{seconds * 1000:.1f} / {explored:,}")
+            print(f"{name:<18}" + "".join(f"{cell:>20}" for cell in cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+# Maze generators for Maze.py and Maze Solver.py.
+#
+# Cells sit at odd (row, col) positions of the grid and the walls between
+# them at one odd and one even coordinate, so a size x size grid holds
+# (size - 1) // 2 cells per side; with an even size the last row and
+# column stay wall. Every generator carves a perfect maze, one path
+# between any two cells, reproducible from its seed. It records carved
+# squares as flat indices in a compact array and writes them into the grid
+# at once.
+#
+# eller_rows streams a maze row by row keeping only the current row's
+# sets, so mazes of any height can be produced in constant memory.
+
+import random
+from array import array
+
+from maze_grid import PATH, WALL, make_grid, np
+
+
+def _cells_per_side(size):
+    if size < 3:
+        raise ValueError(f"a maze needs a size of at least 3, got {size}")
+    return (size - 1) // 2
+
+
+def _finish(carved, size):
+    """The grid with the carved squares, the start and the end open"""
+    grid = make_grid(size)
+    end = size - 2
+    carved.extend((size + 1, end * size + end))
+    if end % 2 == 0:
+        # With an even size the end is not a cell; join it to the cell above
+        carved.append((end - 1) * size + end)
+    if np is not None:
+        grid.reshape(-1)[np.frombuffer(carved, dtype=np.int64)] = PATH
+    else:
+        for square in carved:
+            grid[square // size][square % size] = PATH
+    return grid
+
+
+def _square(cell, cells, size):
+    """Flat grid index of a cell numbered row * cells + col"""
+    row, col = divmod(cell, cells)
+    return (2 * row + 1) * size + 2 * col + 1
+
+
+def generate_backtracker(size, seed=None):
+    """Recursive backtracking: long winding corridors, few dead ends"""
+    rng = random.Random(seed)
+    cells = _cells_per_side(size)
+    visited = bytearray(cells * cells)
+    carved = array("q", [size + 1])
+    stack = [0]
+    visited[0] = 1
+    while stack:
+        current = stack[-1]
+        row, col = divmod(current, cells)
+        neighbors = []
+        if row > 0 and not visited[current - cells]:
+            neighbors.append(current - cells)
+        if row < cells - 1 and not visited[current + cells]:
+            neighbors.append(current + cells)
+        if col > 0 and not visited[current - 1]:
+            neighbors.append(current - 1)
+        if col < cells - 1 and not visited[current + 1]:
+            neighbors.append(current + 1)
+        if neighbors:
+            next_cell = rng.choice(neighbors)
+            visited[next_cell] = 1
+            square = _square(next_cell, cells, size)
+            # The wall between two cells is halfway between their squares
+            carved.append(square)
+            carved.append((square + _square(current, cells, size)) // 2)
+            stack.append(next_cell)
+        else:
+            stack.pop()
+    return _finish(carved, size)
+
+
+def generate_kruskal(size, seed=None):
+    """Kruskal's algorithm: walls removed in random order unless they would close a loop"""
+    rng = random.Random(seed)
+    cells = _cells_per_side(size)
+    parent = list(range(cells * cells))
+    # Edge e < horizontal joins cell e // (cells - 1) to its right, the rest join a cell to the one below
+    horizontal = cells * (cells - 1)
+    edges = list(range(2 * horizontal))
+    rng.shuffle(edges)
+    carved = array("q", (_square(cell, cells, size) for cell in range(cells * cells)))
+    joins = cells * cells - 1
+    for edge in edges:
+        if edge < horizontal:
+            a = edge // (cells - 1) * cells + edge % (cells - 1)
+            b = a + 1
+        else:
+            a = edge - horizontal
+            b = a + cells
+        # Union-find with path halving
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        if a == b:
+            continue
+        parent[a] = b
+        if edge < horizontal:
+            cell = edge // (cells - 1) * cells + edge % (cells - 1)
+            carved.append(_square(cell, cells, size) + 1)
+        else:
+            carved.append(_square(edge - horizontal, cells, size) + size)
+        joins -= 1
+        if not joins:
+            break
+    return _finish(carved, size)
+
+
+def generate_wilson(size, seed=None):
+    """Wilson's algorithm: loop-erased random walks, an unbiased sample of all mazes"""
+    rng = random.Random(seed)
+    cells = _cells_per_side(size)
+    count = cells * cells
+    in_maze = bytearray(count)
+    first = rng.randrange(count)
+    in_maze[first] = 1
+    # The last step taken out of each cell of the current walk; revisiting a cell
+    # overwrites it, which erases the loop
+    step = [0] * count
+    carved = array("q", [_square(first, cells, size)])
+    order = list(range(count))
+    rng.shuffle(order)
+    for start in order:
+        if in_maze[start]:
+            continue
+        cell = start
+        while not in_maze[cell]:
+            row, col = divmod(cell, cells)
+            moves = []
+            if row > 0:
+                moves.append(-cells)
+            if row < cells - 1:
+                moves.append(cells)
+            if col > 0:
+                moves.append(-1)
+            if col < cells - 1:
+                moves.append(1)
+            step[cell] = rng.choice(moves)
+            cell += step[cell]
+        cell = start
+        while not in_maze[cell]:
+            in_maze[cell] = 1
+            square = _square(cell, cells, size)
+            cell += step[cell]
+            carved.append(square)
+            carved.append((square + _square(cell, cells, size)) // 2)
+    return _finish(carved, size)
+
+
+def eller_rows(cols, rows, seed=None, join_chance=0.5, down_chance=0.4):
+    """Eller's algorithm, yielding the 2 * rows + 1 grid rows of a cols x rows maze one at a time.
+
+    Each row is a bytearray of 2 * cols + 1 squares. Only the set each
+    cell of the current row belongs to is kept, so memory does not grow
+    with the number of rows.
+    """
+    rng = random.Random(seed)
+    width = 2 * cols + 1
+    yield bytearray([WALL]) * width
+    labels = [0] * cols
+    next_label = 1
+    for row in range(rows):
+        last = row == rows - 1
+        for col in range(cols):
+            if not labels[col]:
+                labels[col] = next_label
+                next_label += 1
+
+        # Sets merged within this row, as a union-find over their labels
+        parent = {label: label for label in labels}
+
+        def find(label):
+            while parent[label] != label:
+                parent[label] = parent[parent[label]]
+                label = parent[label]
+            return label
+
+        line = bytearray([WALL]) * width
+        for col in range(cols):
+            line[2 * col + 1] = PATH
+        # Join neighbours in different sets; the last row joins all of them
+        for col in range(cols - 1):
+            left, right = find(labels[col]), find(labels[col + 1])
+            if left != right and (last or rng.random() < join_chance):
+                line[2 * col + 2] = PATH
+                parent[right] = left
+        labels = [find(label) for label in labels]
+        yield line
+
+        if last:
+            break
+        below = bytearray([WALL]) * width
+        members = {}
+        for col, label in enumerate(labels):
+            members.setdefault(label, []).append(col)
+        next_labels = [0] * cols
+        # Every set continues down at least once so no region is cut off
+        for label, group in members.items():
+            down = [col for col in group if rng.random() < down_chance] or [rng.choice(group)]
+            for col in down:
+                below[2 * col + 1] = PATH
+                next_labels[col] = label
+        labels = next_labels
+        yield below
+    yield bytearray([WALL]) * width
+
+
+def generate_eller(size, seed=None):
+    """Eller's algorithm: one row at a time in constant memory"""
+    cells = _cells_per_side(size)
+    carved = array("q")
+    for row, line in enumerate(eller_rows(cells, cells, seed)):
+        base = row * size
+        carved.extend(base + col for col, square in enumerate(line) if square == PATH)
+    return _finish(carved, size)
+
+
+GENERATORS = {
+    "Backtracker": generate_backtracker,
+    "Kruskal": generate_kruskal,
+    "Wilson": generate_wilson,
+    "Eller": generate_eller,
+}
@@ -0,0 +1,106 @@
+# Maze grids and NumPy solvers shared by Maze.py and Maze Solver.py.
+#
+# A maze is a square grid indexed [row][col] holding WALL (1) or PATH (0).
+# With NumPy installed, grids are uint8 arrays: one byte per cell instead
+# of a Python list slot per cell, and they index like the lists of lists
+# used without it, so the per-cell solvers work on either.
+#
+# DistanceField runs a breadth-first search a whole layer at a time. The
+# frontier is an array of flat cell indices; adding the four neighbour
+# offsets to it and masking with an array of open, unvisited cells gives
+# the next layer in a handful of array operations. Cost grows with the
+# number of layers, not cells, so 2000x2000 mazes solve in a fraction of
+# a second.
+
+try:
+    import numpy as np
+except ImportError:  # Lists of lists and the per-cell solvers still work
+    np = None
+
+HAS_NUMPY = np is not None
+
+WALL, PATH = 1, 0
+
+
+def make_grid(size, fill=WALL):
+    """A size x size grid of one cell type, a uint8 array when NumPy is available"""
+    if np is None:
+        return [[fill] * size for _ in range(size)]
+    return np.full((size, size), fill, dtype=np.uint8)
+
+
+class DistanceField:
+    """Steps from a start cell to every cell it can reach, found with NumPy.
+
+    The grid is copied into a flat array with a one-cell wall border, so
+    neighbours are always at index +-1 and +-stride with no bounds
+    checks. Every reached cell records the cell it was reached from,
+    which makes the path back to the start a chain of lookups. Given an
+    end, the search stops after the layer that reaches it.
+    """
+
+    def __init__(self, maze, start, end=None):
+        grid = np.asarray(maze, dtype=np.uint8)
+        height, width = grid.shape
+        self.stride = stride = width + 2
+        padded = np.full((height + 2, stride), WALL, dtype=np.uint8)
+        padded[1:-1, 1:-1] = grid
+        free = (padded == PATH).ravel()
+        self._distance = np.full(free.shape, -1, dtype=np.int32)
+        self._parent = np.full(free.shape, -1, dtype=np.int32)
+        self.distances = self._distance.reshape(height + 2, stride)[1:-1, 1:-1]
+        self.layers = []  # flat padded indices of the cells at each distance
+
+        origin = self._flat(start)
+        if not free[origin]:
+            return
+        target = self._flat(end) if end is not None else -1
+        offsets = np.array([1, -1, stride, -stride])
+        frontier = np.array([origin])
+        free[origin] = False
+        self._distance[origin] = 0
+        step = 0
+        while len(frontier):
+            self.layers.append(frontier)
+            if target >= 0 and self._distance[target] >= 0:
+                break
+            step += 1
+            cells = (frontier[:, None] + offsets).ravel()
+            parents = np.repeat(frontier, len(offsets))
+            reached = free[cells]
+            cells, parents = cells[reached], parents[reached]
+            # Two frontier cells can share a neighbour. The parent written last
+            # wins, and only the copy that wrote it is kept.
+            self._parent[cells] = parents
+            cells = cells[self._parent[cells] == parents]
+            free[cells] = False
+            self._distance[cells] = step
+            frontier = cells
+
+    def _flat(self, cell):
+        return (cell[0] + 1) * self.stride + cell[1] + 1
+
+    def explored(self):
+        """(row, col) of every reached cell as an (n, 2) array, nearest first"""
+        if not self.layers:
+            return np.zeros((0, 2), dtype=np.int32)
+        rows, cols = np.divmod(np.concatenate(self.layers), self.stride)
+        return np.stack([rows - 1, cols - 1], axis=1).astype(np.int32)
+
+    def path_to(self, end):
+        """Cells from the start to end inclusive, empty if end was not reached"""
+        cell = self._flat(end)
+        if self._distance[cell] < 0:
+            return []
+        path = []
+        while cell >= 0:
+            row, col = divmod(int(cell), self.stride)
+            path.append((row - 1, col - 1))
+            cell = self._parent[cell]
+        return path[::-1]
+
+
+def solve_frontier_bfs(maze, start, end):
+    """(path, explored cells) like the apps' solvers, with explored as an (n, 2) array"""
+    field = DistanceField(maze, start, end)
+    return field.path_to(end), field.explored()
@@ -0,0 +1,198 @@
+# Grid-aware solvers for Maze.py, Maze Solver.py and maze_benchmark.py.
+#
+# Like the apps' own solvers, each one is a generator: it yields every
+# cell as it takes it off its open list and returns the path, empty if
+# there is none, when it finishes. The apps pull a few cells per frame to
+# animate the search while it runs; run_solver drains one at full speed.
+#
+# JPS and bidirectional A* work on a flat copy of the maze with a
+# one-cell wall border, like DistanceField in maze_grid.py: a cell is a
+# single int, its neighbours are at +-1 and +-stride, and the open lists,
+# costs, parents and closed sets are arrays indexed by it instead of
+# dicts of (row, col) tuples.
+
+import heapq
+from array import array
+
+from maze_grid import HAS_NUMPY, PATH, np, solve_frontier_bfs
+
+
+def _flatten(maze):
+    """(open cells as a padded flat bytearray, row stride)"""
+    size = len(maze)
+    stride = size + 2
+    free = bytearray(stride * stride)
+    if np is not None:
+        padded = np.zeros((stride, stride), dtype=np.uint8)
+        padded[1:-1, 1:-1] = np.asarray(maze) == PATH
+        free[:] = padded.tobytes()
+    else:
+        for row in range(size):
+            base = (row + 1) * stride + 1
+            free[base:base + size] = bytes(cell == PATH for cell in maze[row])
+    return free, stride
+
+
+def _cell(index, stride):
+    row, col = divmod(index, stride)
+    return (row - 1, col - 1)
+
+
+def _manhattan(a, b, stride):
+    ar, ac = divmod(a, stride)
+    br, bc = divmod(b, stride)
+    return abs(ar - br) + abs(ac - bc)
+
+
+def solve_jump_point(maze, start, end):
+    """Jump Point Search: A* over the junctions of the maze instead of every cell.
+
+    From a jump point the search runs straight in each direction until it
+    hits a wall (a dead end, pruned), the goal, or a cell with an open
+    side, which becomes the next jump point. Cells in between can only be
+    passed straight through, so they never enter the open list. On a
+    four-connected grid this is the whole of the symmetry JPS removes;
+    in a maze it turns every corridor into a single step.
+    """
+    free, stride = _flatten(maze)
+    origin = (start[0] + 1) * stride + start[1] + 1
+    target = (end[0] + 1) * stride + end[1] + 1
+    if not free[origin] or not free[target]:
+        return []
+
+    cost = array("i", [-1]) * len(free)
+    parent = array("i", [-1]) * len(free)
+    closed = bytearray(len(free))
+    cost[origin] = 0
+    open_list = [(_manhattan(origin, target, stride), origin)]
+    sides = {1: (stride, -stride), -1: (stride, -stride), stride: (1, -1), -stride: (1, -1)}
+
+    while open_list:
+        current = heapq.heappop(open_list)[1]
+        if closed[current]:
+            continue
+        closed[current] = 1
+        yield _cell(current, stride)
+        if current == target:
+            break
+        for step, (left, right) in sides.items():
+            cell = current + step
+            distance = 1
+            while free[cell] and cell != target and not free[cell + left] and not free[cell + right]:
+                cell += step
+                distance += 1
+            if not free[cell] or closed[cell]:
+                continue
+            new_cost = cost[current] + distance
+            if cost[cell] < 0 or new_cost < cost[cell]:
+                cost[cell] = new_cost
+                parent[cell] = current
+                heapq.heappush(open_list, (new_cost + _manhattan(cell, target, stride), cell))
+
+    if not closed[target]:
+        return []
+    # Fill in the straight runs between consecutive jump points
+    path = [_cell(target, stride)]
+    cell = target
+    while cell != origin:
+        previous = parent[cell]
+        step = stride if abs(cell - previous) >= stride else 1
+        step = step if cell > previous else -step
+        while cell != previous:
+            cell -= step
+            path.append(_cell(cell, stride))
+    return path[::-1]
+
+
+def solve_bidirectional_astar(maze, start, end):
+    """A* from both ends at once, expanding whichever side has the smaller open list.
+
+    Each side keeps its own costs, parents and closed set. Whenever a
+    cell is reached by both, start -> cell -> end is a candidate path;
+    the best one is final once either open list's lowest f is no smaller,
+    as every path not found yet costs at least that much.
+    """
+    free, stride = _flatten(maze)
+    origin = (start[0] + 1) * stride + start[1] + 1
+    target = (end[0] + 1) * stride + end[1] + 1
+    if not free[origin] or not free[target]:
+        return []
+
+    size = len(free)
+    cost = (array("i", [-1]) * size, array("i", [-1]) * size)
+    parent = (array("i", [-1]) * size, array("i", [-1]) * size)
+    closed = (bytearray(size), bytearray(size))
+    goals = (target, origin)
+    cost[0][origin] = 0
+    cost[1][target] = 0
+    open_lists = ([(_manhattan(origin, target, stride), origin)], [(_manhattan(target, origin, stride), target)])
+    offsets = (1, -1, stride, -stride)
+    best, meeting = -1, -1
+
+    while open_lists[0] and open_lists[1]:
+        if best >= 0 and max(open_lists[0][0][0], open_lists[1][0][0]) >= best:
+            break
+        side = 0 if len(open_lists[0]) <= len(open_lists[1]) else 1
+        current = heapq.heappop(open_lists[side])[1]
+        if closed[side][current]:
+            continue
+        closed[side][current] = 1
+        yield _cell(current, stride)
+        own_cost, own_parent, goal = cost[side], parent[side], goals[side]
+        other_cost = cost[1 - side]
+        for offset in offsets:
+            neighbor = current + offset
+            if not free[neighbor] or closed[side][neighbor]:
+                continue
+            new_cost = own_cost[current] + 1
+            if own_cost[neighbor] >= 0 and new_cost >= own_cost[neighbor]:
+                continue
+            own_cost[neighbor] = new_cost
+            own_parent[neighbor] = current
+            heapq.heappush(open_lists[side], (new_cost + _manhattan(neighbor, goal, stride), neighbor))
+            if other_cost[neighbor] >= 0 and (best < 0 or new_cost + other_cost[neighbor] < best):
+                best, meeting = new_cost + other_cost[neighbor], neighbor
+        if other_cost[current] >= 0 and (best < 0 or own_cost[current] + other_cost[current] < best):
+            best, meeting = own_cost[current] + other_cost[current], current
+
+    if meeting < 0:
+        return []
+    path = []
+    cell = meeting
+    while cell >= 0:
+        path.append(_cell(cell, stride))
+        cell = parent[0][cell]
+    path.reverse()
+    cell = parent[1][meeting]
+    while cell >= 0:
+        path.append(_cell(cell, stride))
+        cell = parent[1][cell]
+    return path
+
+
+def solve_numpy_bfs(maze, start, end):
+    """Breadth-first search a whole frontier at a time with NumPy; its cells follow once it is done"""
+    path, explored = solve_frontier_bfs(maze, start, end)
+    for first in range(0, len(explored), 4096):
+        for row, col in explored[first:first + 4096].tolist():
+            yield (row, col)
+    return path
+
+
+def run_solver(solver):
+    """Drain a solver generator, returns (path, number of cells explored)"""
+    explored = 0
+    while True:
+        try:
+            next(solver)
+        except StopIteration as finished:
+            return finished.value, explored
+        explored += 1
+
+
+SOLVERS = {
+    "JPS": solve_jump_point,
+    "Bidirectional A*": solve_bidirectional_astar,
+}
+if HAS_NUMPY:
+    SOLVERS["NumPy BFS"] = solve_numpy_bfs
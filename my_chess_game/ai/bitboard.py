@@ -0,0 +1,381 @@
+from typing import List, Optional
+
+import chess
+import chess.polyglot
+
+# Moves are ints: from | to << 6 | promotion << 12 | flag << 15
+FLAG_NONE = 0
+FLAG_EN_PASSANT = 1
+FLAG_CASTLE = 2
+FLAG_DOUBLE_PUSH = 3
+
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(1, 7)
+PROMOTIONS = (QUEEN, KNIGHT, ROOK, BISHOP)
+
+KNIGHT_ATTACKS = chess.BB_KNIGHT_ATTACKS
+KING_ATTACKS = chess.BB_KING_ATTACKS
+PAWN_ATTACKS = chess.BB_PAWN_ATTACKS  # indexed [color][square]
+DIAG_MASKS, DIAG_ATTACKS = chess.BB_DIAG_MASKS, chess.BB_DIAG_ATTACKS
+RANK_MASKS, RANK_ATTACKS = chess.BB_RANK_MASKS, chess.BB_RANK_ATTACKS
+FILE_MASKS, FILE_ATTACKS = chess.BB_FILE_MASKS, chess.BB_FILE_ATTACKS
+
+# Castling rights kept when a move touches a square
+CASTLE_MASK = [15] * 64
+CASTLE_MASK[chess.E1] = 15 & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)
+CASTLE_MASK[chess.H1] = 15 & ~WHITE_KINGSIDE
+CASTLE_MASK[chess.A1] = 15 & ~WHITE_QUEENSIDE
+CASTLE_MASK[chess.E8] = 15 & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)
+CASTLE_MASK[chess.H8] = 15 & ~BLACK_KINGSIDE
+CASTLE_MASK[chess.A8] = 15 & ~BLACK_QUEENSIDE
+
+# Polyglot keys, so Position.key equals chess.polyglot.zobrist_hash
+_RANDOM = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+PIECE_KEYS = [[[_RANDOM[64 * ((pt - 1) * 2 + color) + sq] if pt else 0 for sq in range(64)]
+               for pt in range(7)] for color in range(2)]
+CASTLE_KEYS = [0] * 16
+for _rights in range(16):
+    for _bit in range(4):
+        if _rights & (1 << _bit):
+            CASTLE_KEYS[_rights] ^= _RANDOM[768 + _bit]
+EP_KEYS = [_RANDOM[772 + file] for file in range(8)]
+TURN_KEY = _RANDOM[780]
+
+
+def encode_move(from_square: int, to_square: int, promotion: int = 0, flag: int = FLAG_NONE) -> int:
+    return from_square | (to_square << 6) | (promotion << 12) | (flag << 15)
+
+
+class Position:
+    """Lean board for the search: bitboards as ints plus a mailbox.
+
+    make/unmake keep a compact undo tuple per move and update the
+    Zobrist key incrementally. Moves are generated pseudo-legally and
+    checked for legality only when they are made.
+    """
+
+    __slots__ = ("bb", "occ", "mailbox", "turn", "castling", "ep", "halfmove",
+                 "fullmove", "key", "history", "keys")
+
+    def __init__(self, board: Optional[chess.Board] = None):
+        board = board or chess.Board()
+        self.bb = [[0] * 7, [0] * 7]  # [color][piece type], color 1 is White
+        self.occ = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        self.mailbox = [0] * 64  # color << 3 | piece type, 0 when empty
+        for square, piece in board.piece_map().items():
+            color = int(piece.color)
+            self.bb[color][piece.piece_type] |= 1 << square
+            self.mailbox[square] = (color << 3) | piece.piece_type
+        self.turn = int(board.turn)
+        self.castling = ((WHITE_KINGSIDE if board.castling_rights & chess.BB_H1 else 0)
+                         | (WHITE_QUEENSIDE if board.castling_rights & chess.BB_A1 else 0)
+                         | (BLACK_KINGSIDE if board.castling_rights & chess.BB_H8 else 0)
+                         | (BLACK_QUEENSIDE if board.castling_rights & chess.BB_A8 else 0))
+        self.ep = board.ep_square
+        self.halfmove = board.halfmove_clock
+        self.fullmove = board.fullmove_number
+        self.key = chess.polyglot.zobrist_hash(board)
+        self.history = []
+
+        # Keys of earlier game positions that still count for repetitions
+        self.keys = []
+        previous = board.copy()
+        for _ in range(min(board.halfmove_clock, len(board.move_stack))):
+            previous.pop()
+            self.keys.append(chess.polyglot.zobrist_hash(previous))
+        self.keys.reverse()
+
+    def to_board(self) -> chess.Board:
+        board = chess.Board(None)
+        for square, code in enumerate(self.mailbox):
+            if code:
+                board.set_piece_at(square, chess.Piece(code & 7, bool(code >> 3)))
+        board.turn = bool(self.turn)
+        board.castling_rights = ((chess.BB_H1 if self.castling & WHITE_KINGSIDE else 0)
+                                 | (chess.BB_A1 if self.castling & WHITE_QUEENSIDE else 0)
+                                 | (chess.BB_H8 if self.castling & BLACK_KINGSIDE else 0)
+                                 | (chess.BB_A8 if self.castling & BLACK_QUEENSIDE else 0))
+        board.ep_square = self.ep
+        board.halfmove_clock = self.halfmove
+        board.fullmove_number = self.fullmove
+        return board
+
+    @staticmethod
+    def to_move(move: int) -> chess.Move:
+        return chess.Move(move & 63, (move >> 6) & 63, ((move >> 12) & 7) or None)
+
+    def from_move(self, move: chess.Move) -> Optional[int]:
+        """The internal move matching a chess.Move, if it is pseudo-legal here"""
+        for m in self.pseudo_moves():
+            if m & 0x7fff == move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12):
+                return m
+        return None
+
+    def _ep_key(self) -> int:
+        """En passant only counts for the key when a pawn could capture"""
+        if self.ep is None:
+            return 0
+        if self.bb[self.turn][PAWN] & PAWN_ATTACKS[self.turn ^ 1][self.ep]:
+            return EP_KEYS[self.ep & 7]
+        return 0
+
+    def is_attacked(self, square: int, by: int) -> bool:
+        bb = self.bb[by]
+        if KNIGHT_ATTACKS[square] & bb[KNIGHT] or KING_ATTACKS[square] & bb[KING]:
+            return True
+        if PAWN_ATTACKS[by ^ 1][square] & bb[PAWN]:
+            return True
+        occupied = self.occ[0] | self.occ[1]
+        diagonal = bb[BISHOP] | bb[QUEEN]
+        if diagonal and DIAG_ATTACKS[square][DIAG_MASKS[square] & occupied] & diagonal:
+            return True
+        straight = bb[ROOK] | bb[QUEEN]
+        if straight and (RANK_ATTACKS[square][RANK_MASKS[square] & occupied]
+                         | FILE_ATTACKS[square][FILE_MASKS[square] & occupied]) & straight:
+            return True
+        return False
+
+    def in_check(self) -> bool:
+        king = self.bb[self.turn][KING]
+        return bool(king) and self.is_attacked(king.bit_length() - 1, self.turn ^ 1)
+
+    def is_capture(self, move: int) -> bool:
+        return bool(self.mailbox[(move >> 6) & 63]) or (move >> 15) == FLAG_EN_PASSANT
+
+    def is_repetition(self) -> bool:
+        """The position already occurred since the last irreversible move"""
+        keys = self.keys
+        for i in range(len(keys) - 2, max(-1, len(keys) - 1 - self.halfmove), -2):
+            if keys[i] == self.key:
+                return True
+        return False
+
+    def pseudo_moves(self, captures_only: bool = False) -> List[int]:
+        us = self.turn
+        them = us ^ 1
+        bb = self.bb[us]
+        own = self.occ[us]
+        enemy = self.occ[them]
+        occupied = own | enemy
+        targets = enemy if captures_only else ~own
+        moves = []
+        append = moves.append
+
+        # Pieces first and from the top of the board, the order python-chess uses
+        for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN, KING):
+            pieces = bb[piece_type]
+            while pieces:
+                sq = pieces.bit_length() - 1
+                pieces ^= 1 << sq
+                if piece_type == KNIGHT:
+                    attacks = KNIGHT_ATTACKS[sq]
+                elif piece_type == KING:
+                    attacks = KING_ATTACKS[sq]
+                else:
+                    attacks = 0
+                    if piece_type != ROOK:
+                        attacks = DIAG_ATTACKS[sq][DIAG_MASKS[sq] & occupied]
+                    if piece_type != BISHOP:
+                        attacks |= (RANK_ATTACKS[sq][RANK_MASKS[sq] & occupied]
+                                    | FILE_ATTACKS[sq][FILE_MASKS[sq] & occupied])
+                attacks &= targets
+                while attacks:
+                    to_bb = attacks & -attacks
+                    attacks ^= to_bb
+                    append(sq | ((to_bb.bit_length() - 1) << 6))
+
+        if not captures_only:
+            self._castling_moves(append, occupied)
+
+        # Pawns
+        pawns = bb[PAWN]
+        forward = 8 if us else -8
+        last_rank = chess.BB_RANK_8 if us else chess.BB_RANK_1
+        start_rank = chess.BB_RANK_2 if us else chess.BB_RANK_7
+        ep_bb = (1 << self.ep) if self.ep is not None else 0
+        while pawns:
+            sq = pawns.bit_length() - 1
+            low = 1 << sq
+            pawns ^= low
+            attacks = PAWN_ATTACKS[us][sq]
+            caps = attacks & enemy
+            while caps:
+                cap = caps & -caps
+                caps ^= cap
+                to = cap.bit_length() - 1
+                if cap & last_rank:
+                    for promotion in PROMOTIONS:
+                        append(sq | (to << 6) | (promotion << 12))
+                else:
+                    append(sq | (to << 6))
+            if attacks & ep_bb:
+                append(sq | (self.ep << 6) | (FLAG_EN_PASSANT << 15))
+            to = sq + forward
+            if not (occupied >> to) & 1:
+                if (1 << to) & last_rank:
+                    for promotion in PROMOTIONS:
+                        append(sq | (to << 6) | (promotion << 12))
+                elif not captures_only:
+                    append(sq | (to << 6))
+                    if low & start_rank and not (occupied >> (to + forward)) & 1:
+                        append(sq | ((to + forward) << 6) | (FLAG_DOUBLE_PUSH << 15))
+        return moves
+
+    def _castling_moves(self, append, occupied: int):
+        if self.turn:
+            rights, king, kingside, queenside = self.castling & 3, chess.E1, WHITE_KINGSIDE, WHITE_QUEENSIDE
+        else:
+            rights, king, kingside, queenside = self.castling & 12, chess.E8, BLACK_KINGSIDE, BLACK_QUEENSIDE
+        if not rights or self.mailbox[king] != ((self.turn << 3) | KING):
+            return
+        them = self.turn ^ 1
+        if self.is_attacked(king, them):
+            return
+        if (rights & kingside and not occupied & ((1 << (king + 1)) | (1 << (king + 2)))
+                and not self.is_attacked(king + 1, them)):
+            append(king | ((king + 2) << 6) | (FLAG_CASTLE << 15))
+        if (rights & queenside
+                and not occupied & ((1 << (king - 1)) | (1 << (king - 2)) | (1 << (king - 3)))
+                and not self.is_attacked(king - 1, them)):
+            append(king | ((king - 2) << 6) | (FLAG_CASTLE << 15))
+
+    def make(self, move: int) -> bool:
+        """Make a pseudo-legal move; undo it and return False if it was illegal"""
+        self.push(move)
+        king = self.bb[self.turn ^ 1][KING]
+        if king and self.is_attacked(king.bit_length() - 1, self.turn):
+            self.pop()
+            return False
+        return True
+
+    def legal_moves(self, captures_only: bool = False) -> List[int]:
+        legal = []
+        for move in self.pseudo_moves(captures_only):
+            if self.make(move):
+                self.pop()
+                legal.append(move)
+        return legal
+
+    def push(self, move: int):
+        from_sq = move & 63
+        to = (move >> 6) & 63
+        promotion = (move >> 12) & 7
+        flag = move >> 15
+        us = self.turn
+        them = us ^ 1
+        bb_us = self.bb[us]
+        mailbox = self.mailbox
+        piece = mailbox[from_sq]
+        piece_type = piece & 7
+        captured = mailbox[to]
+
+        self.history.append((move, captured, self.castling, self.ep, self.halfmove, self.key))
+        self.keys.append(self.key)
+        key = self.key ^ self._ep_key()
+
+        if flag == FLAG_EN_PASSANT:
+            cap_sq = to - 8 if us else to + 8
+            self.bb[them][PAWN] ^= 1 << cap_sq
+            self.occ[them] ^= 1 << cap_sq
+            mailbox[cap_sq] = 0
+            key ^= PIECE_KEYS[them][PAWN][cap_sq]
+        elif captured:
+            self.bb[them][captured & 7] ^= 1 << to
+            self.occ[them] ^= 1 << to
+            key ^= PIECE_KEYS[them][captured & 7][to]
+
+        move_bb = (1 << from_sq) | (1 << to)
+        bb_us[piece_type] ^= move_bb
+        self.occ[us] ^= move_bb
+        mailbox[to] = piece
+        mailbox[from_sq] = 0
+        key ^= PIECE_KEYS[us][piece_type][from_sq] ^ PIECE_KEYS[us][piece_type][to]
+
+        if promotion:
+            bb_us[PAWN] ^= 1 << to
+            bb_us[promotion] |= 1 << to
+            mailbox[to] = (us << 3) | promotion
+            key ^= PIECE_KEYS[us][PAWN][to] ^ PIECE_KEYS[us][promotion][to]
+        elif flag == FLAG_CASTLE:
+            rook_from, rook_to = (to + 1, to - 1) if to > from_sq else (to - 2, to + 1)
+            rook_bb = (1 << rook_from) | (1 << rook_to)
+            bb_us[ROOK] ^= rook_bb
+            self.occ[us] ^= rook_bb
+            mailbox[rook_to] = mailbox[rook_from]
+            mailbox[rook_from] = 0
+            key ^= PIECE_KEYS[us][ROOK][rook_from] ^ PIECE_KEYS[us][ROOK][rook_to]
+
+        castling = self.castling & CASTLE_MASK[from_sq] & CASTLE_MASK[to]
+        key ^= CASTLE_KEYS[self.castling] ^ CASTLE_KEYS[castling]
+        self.castling = castling
+        self.ep = (from_sq + to) // 2 if flag == FLAG_DOUBLE_PUSH else None
+        self.halfmove = 0 if piece_type == PAWN or captured else self.halfmove + 1
+        if not us:
+            self.fullmove += 1
+        self.turn = them
+        self.key = key ^ TURN_KEY ^ self._ep_key()
+
+    def pop(self):
+        move, captured, castling, ep, halfmove, key = self.history.pop()
+        self.keys.pop()
+        from_sq = move & 63
+        to = (move >> 6) & 63
+        promotion = (move >> 12) & 7
+        flag = move >> 15
+        them = self.turn
+        us = them ^ 1
+        bb_us = self.bb[us]
+        mailbox = self.mailbox
+        move_bb = (1 << from_sq) | (1 << to)
+
+        if promotion:
+            bb_us[promotion] ^= 1 << to
+            bb_us[PAWN] |= 1 << from_sq
+            mailbox[from_sq] = (us << 3) | PAWN
+        else:
+            piece = mailbox[to]
+            bb_us[piece & 7] ^= move_bb
+            mailbox[from_sq] = piece
+        self.occ[us] ^= move_bb
+        mailbox[to] = 0
+
+        if flag == FLAG_EN_PASSANT:
+            cap_sq = to - 8 if us else to + 8
+            self.bb[them][PAWN] |= 1 << cap_sq
+            self.occ[them] |= 1 << cap_sq
+            mailbox[cap_sq] = (them << 3) | PAWN
+        elif captured:
+            self.bb[them][captured & 7] |= 1 << to
+            self.occ[them] |= 1 << to
+            mailbox[to] = captured
+        elif flag == FLAG_CASTLE:
+            rook_from, rook_to = (to + 1, to - 1) if to > from_sq else (to - 2, to + 1)
+            rook_bb = (1 << rook_from) | (1 << rook_to)
+            bb_us[ROOK] ^= rook_bb
+            self.occ[us] ^= rook_bb
+            mailbox[rook_from] = mailbox[rook_to]
+            mailbox[rook_to] = 0
+
+        self.castling = castling
+        self.ep = ep
+        self.halfmove = halfmove
+        if not us:
+            self.fullmove -= 1
+        self.turn = us
+        self.key = key
+
+
+def perft(position: Position, depth: int) -> int:
+    """Count leaf nodes of the legal move tree"""
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in position.pseudo_moves():
+        if position.make(move):
+            nodes += perft(position, depth - 1) if depth > 1 else 1
+            position.pop()
+    return nodes
@@ -0,0 +1,215 @@
+import heapq
+import itertools
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Deque, List, NamedTuple, Optional, Tuple
+
+import chess
+
+from ai.search import Searcher
+
+# (request id, deadline as time.time(), starting fen, uci moves, node limit, max depth)
+MoveRequest = Tuple[int, float, str, List[str], Optional[int], int]
+
+_searcher: Optional[Searcher] = None
+
+
+class MoveResult(NamedTuple):
+    move: Optional[str]  # uci, None when the position has no legal moves
+    score: int  # centipawns from the side to move's point of view
+    depth: int
+    nodes: int
+    queued: float  # seconds waiting for a worker
+    latency: float  # seconds from submit to result
+
+
+class PoolMetrics(NamedTuple):
+    queue_depth: int
+    max_queue_depth: int
+    in_flight: int
+    completed: int
+    late: int  # results that arrived after their deadline
+    p50: float
+    p90: float
+    p99: float
+
+
+def _init_worker(tt_size: int):
+    global _searcher
+    _searcher = Searcher(tt_size)
+
+
+def search_batch(requests: List[MoveRequest]) -> List[Tuple[int, Optional[str], int, int, int]]:
+    """Search a batch in one worker; the table stays warm across requests and batches"""
+    results = []
+    for request_id, deadline, fen, moves, node_limit, max_depth in requests:
+        board = chess.Board(fen)
+        for uci in moves:
+            board.push_uci(uci)
+        # Depth 1 always completes, so even an expired request gets a legal move
+        info = _searcher.search(board, max_depth, node_limit=node_limit,
+                                time_limit=max(deadline - time.time(), 0.001))
+        if info is None:
+            results.append((request_id, None, 0, 0, 0))
+        else:
+            line = info.lines[0]
+            results.append((request_id, line.moves[0].uci(), line.score, info.depth, info.nodes))
+    return results
+
+
+class EnginePool:
+    """Schedules AI move requests from many games onto a fixed process pool.
+
+    Requests wait in a queue ordered by deadline and are handed to a
+    worker only when one is free, so the deadline clock of a queued
+    request keeps running and the queue depth is the real backlog. When
+    the queue is longer than the pool, a worker takes several requests
+    at once to save round trips. Each worker keeps one Searcher, and with
+    it one transposition table, for its whole life.
+
+    A worker that dies, killed or out of memory, breaks the process pool:
+    the requests it had in flight fail with BrokenProcessPool and a fresh
+    pool takes over the queue.
+    """
+
+    def __init__(self, workers: Optional[int] = None, tt_size: int = 1 << 18, max_depth: int = 64,
+                 batch_size: int = 4, history: int = 10000):
+        self.workers = workers or multiprocessing.cpu_count()
+        self.max_depth = max_depth
+        self.batch_size = batch_size
+        self._tt_size = tt_size
+        self._pool = self._new_pool()
+        # Reentrant as a finished batch's callback can run inside _dispatch
+        self._lock = threading.RLock()
+        self._queue: List[Tuple[float, int]] = []  # heap of (deadline, request id)
+        self._requests = {}  # request id -> [MoveRequest, Future, submit time, start time]
+        self._ids = itertools.count()
+        self._busy = 0
+        self._in_flight = 0
+        self._latencies: Deque[float] = deque(maxlen=history)
+        self._completed = 0
+        self._late = 0
+        self._max_queue_depth = 0
+        self._closed = False
+
+    def submit(self, board: chess.Board, time_limit: float, node_limit: Optional[int] = None,
+               max_depth: Optional[int] = None) -> "Future[MoveResult]":
+        """Queue a search of the position, the future resolves to a MoveResult"""
+        future: "Future[MoveResult]" = Future()
+        root = board.root()
+        request_id = next(self._ids)
+        request = (request_id, time.time() + time_limit, root.fen(), [m.uci() for m in board.move_stack],
+                   node_limit, max_depth or self.max_depth)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("engine pool is closed")
+            self._requests[request_id] = [request, future, time.perf_counter(), None]
+            heapq.heappush(self._queue, (request[1], request_id))
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+            self._dispatch()
+        return future
+
+    def metrics(self) -> PoolMetrics:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            queue_depth = len(self._queue)
+            max_depth = self._max_queue_depth
+            in_flight, completed, late = self._in_flight, self._completed, self._late
+
+        def percentile(fraction: float) -> float:
+            return latencies[min(len(latencies) - 1, int(fraction * len(latencies)))] if latencies else 0.0
+
+        return PoolMetrics(queue_depth, max_depth, in_flight, completed, late,
+                           percentile(0.5), percentile(0.9), percentile(0.99))
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            pending = [self._requests.pop(request_id)[1] for _, request_id in self._queue]
+            self._queue.clear()
+        for future in pending:
+            future.cancel()
+        self._pool.shutdown(cancel_futures=True)
+
+    def __enter__(self) -> "EnginePool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(self.workers, initializer=_init_worker, initargs=(self._tt_size,))
+
+    def _dispatch(self):
+        """Hand queued requests to idle workers, called with the lock held"""
+        while self._queue and self._busy < self.workers:
+            idle = self.workers - self._busy
+            size = max(1, min(self.batch_size, len(self._queue) // idle))
+            batch = []
+            while self._queue and len(batch) < size:
+                request, future, _, _ = self._requests[heapq.heappop(self._queue)[1]]
+                if future.cancelled():  # The caller gave up waiting
+                    del self._requests[request[0]]
+                else:
+                    batch.append(request)
+            if not batch:
+                continue
+            self._busy += 1
+            self._in_flight += len(batch)
+            now = time.perf_counter()
+            for request in batch:
+                self._requests[request[0]][3] = now
+            pool = self._pool
+            try:
+                work = pool.submit(search_batch, batch)
+            except BrokenProcessPool as e:
+                self._fail(batch, e, pool)
+                continue
+            work.add_done_callback(lambda work, batch=batch, pool=pool: self._collect(work, batch, pool))
+
+    def _collect(self, work: Future, batch: List[MoveRequest], pool: ProcessPoolExecutor):
+        """Runs on the pool's management thread when a batch is done"""
+        error = CancelledError() if work.cancelled() else work.exception()
+        if error is None:
+            self._finish(work.result())
+        else:
+            self._fail(batch, error, pool)
+
+    def _finish(self, results: List[Tuple[int, Optional[str], int, int, int]]):
+        now = time.perf_counter()
+        wall = time.time()
+        resolved = []
+        with self._lock:
+            self._busy -= 1
+            for request_id, move, score, depth, nodes in results:
+                request, future, submitted, started = self._requests.pop(request_id)
+                latency = now - submitted
+                self._in_flight -= 1
+                self._completed += 1
+                self._late += wall > request[1]
+                self._latencies.append(latency)
+                resolved.append((future, MoveResult(move, score, depth, nodes, started - submitted, latency)))
+            if not self._closed:
+                self._dispatch()
+        for future, result in resolved:
+            if future.set_running_or_notify_cancel():
+                future.set_result(result)
+
+    def _fail(self, batch: List[MoveRequest], error: BaseException, pool: ProcessPoolExecutor):
+        with self._lock:
+            self._busy -= 1
+            futures = [self._requests.pop(request[0])[1] for request in batch]
+            self._in_flight -= len(batch)
+            if isinstance(error, BrokenProcessPool) and pool is self._pool and not self._closed:
+                # Every batch on the broken pool fails like this one; replace it once
+                pool.shutdown(wait=False)
+                self._pool = self._new_pool()
+            if not self._closed:
+                self._dispatch()
+        for future in futures:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(error)
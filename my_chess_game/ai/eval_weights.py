@@ -0,0 +1,85 @@
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional
+
+import chess
+
+# Tables are indexed like FastIntermediateChessAI reads them: by square for
+# White and by the mirrored square for Black.
+DEFAULT_PIECE_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 320,
+    chess.BISHOP: 330,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 20000
+}
+
+DEFAULT_PAWN_TABLE = [
+    0,  0,  0,  0,  0,  0,  0,  0,
+    50, 50, 50, 50, 50, 50, 50, 50,
+    10, 10, 20, 30, 30, 20, 10, 10,
+    5,  5, 10, 25, 25, 10,  5,  5,
+    0,  0,  0, 20, 20,  0,  0,  0,
+    5, -5,-10,  0,  0,-10, -5,  5,
+    5, 10, 10,-20,-20, 10, 10,  5,
+    0,  0,  0,  0,  0,  0,  0,  0
+]
+
+DEFAULT_KNIGHT_TABLE = [
+    -50,-40,-30,-30,-30,-30,-40,-50,
+    -40,-20,  0,  0,  0,  0,-20,-40,
+    -30,  0, 10, 15, 15, 10,  0,-30,
+    -30,  5, 15, 20, 20, 15,  5,-30,
+    -30,  0, 15, 20, 20, 15,  0,-30,
+    -30,  5, 10, 15, 15, 10,  5,-30,
+    -40,-20,  0,  5,  5,  0,-20,-40,
+    -50,-40,-30,-30,-30,-30,-40,-50
+]
+
+
+class EvalWeights(NamedTuple):
+    piece_values: Dict[chess.PieceType, int]
+    tables: Dict[chess.PieceType, List[int]]  # 64 entries for every piece type
+
+
+def default_weights() -> EvalWeights:
+    """The hand-picked evaluation, pieces without a table get a flat one"""
+    tables = {piece_type: [0] * 64 for piece_type in chess.PIECE_TYPES}
+    tables[chess.PAWN] = list(DEFAULT_PAWN_TABLE)
+    tables[chess.KNIGHT] = list(DEFAULT_KNIGHT_TABLE)
+    return EvalWeights(dict(DEFAULT_PIECE_VALUES), tables)
+
+
+def load_weights(path: str) -> Optional[EvalWeights]:
+    """Read weights written by tune_eval.py, None if there is no such file"""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    weights = default_weights()
+    for symbol, value in data.get("piece_values", {}).items():
+        weights.piece_values[chess.PIECE_SYMBOLS.index(symbol)] = int(value)
+    for symbol, table in data.get("tables", {}).items():
+        if len(table) != 64:
+            raise ValueError(f"{path}: table for '{symbol}' has {len(table)} entries, expected 64")
+        weights.tables[chess.PIECE_SYMBOLS.index(symbol)] = [int(v) for v in table]
+    return weights
+
+
+def save_weights(weights: EvalWeights, path: str, **metadata):
+    """Write weights as JSON rounded to whole centipawns, tables laid out rank by rank"""
+    lines = [f"  {json.dumps(key)}: {json.dumps(value)}," for key, value in metadata.items()]
+    piece_values = {chess.piece_symbol(pt): int(round(v)) for pt, v in weights.piece_values.items()}
+    lines.append(f'  "piece_values": {json.dumps(piece_values)},')
+    tables = []
+    for piece_type, table in weights.tables.items():
+        values = [int(round(v)) for v in table]
+        ranks = ",\n".join("    " + ", ".join(f"{v:4}" for v in values[i:i + 8]) for i in range(0, 64, 8))
+        tables.append(f'  "{chess.piece_symbol(piece_type)}": [\n{ranks}\n  ]')
+    lines.append('  "tables": {\n' + ",\n".join(tables) + "\n  }")
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("{\n" + "\n".join(lines) + "\n}\n")
+    os.replace(tmp_path, path)
@@ -0,0 +1,152 @@
+import time
+from typing import List, NamedTuple, Optional
+
+import chess
+
+INFINITY = 10 ** 9
+
+
+class MateResult(NamedTuple):
+    mate_in: int  # moves for the attacking side
+    moves: List[chess.Move]
+
+
+class _Node:
+    __slots__ = ("move", "parent", "children", "attacker", "depth", "pn", "dn")
+
+    def __init__(self, move: Optional[chess.Move], parent: Optional["_Node"], attacker: bool, depth: int):
+        self.move = move
+        self.parent = parent
+        self.children: Optional[List["_Node"]] = None
+        self.attacker = attacker  # True when the mating side is to move (OR node)
+        self.depth = depth
+        self.pn = 1
+        self.dn = 1
+
+
+class MateSearch:
+    """Proof-number search for forced mates made of checks.
+
+    The attacker only considers checking moves and the defender all
+    replies, which keeps the tree narrow. The search proves or disproves
+    a mate within max_plies and stops at the node or time budget.
+    """
+
+    def __init__(self, node_budget: int = 20000, max_plies: int = 15):
+        self.node_budget = node_budget
+        self.max_plies = max_plies
+        self.nodes = 0
+
+    def find_mate(self, board: chess.Board, time_limit: Optional[float] = None,
+                  node_budget: Optional[int] = None) -> Optional[MateResult]:
+        """Return a proven mate for the side to move, or None.
+
+        node_budget overrides the searcher's own for this call; nodes holds
+        the count used afterwards.
+        """
+        if node_budget is None:
+            node_budget = self.node_budget
+        board = board.copy()
+        deadline = time.time() + time_limit if time_limit else None
+        root = _Node(None, None, True, 0)
+        self._evaluate(root, board)
+        self.nodes = 1
+
+        while root.pn and root.dn and self.nodes < node_budget:
+            if deadline and time.time() > deadline:
+                break
+
+            # Walk down to the most proving node
+            node = root
+            while node.children:
+                if node.attacker:
+                    node = min(node.children, key=lambda c: c.pn)
+                else:
+                    node = min(node.children, key=lambda c: c.dn)
+                board.push(node.move)
+
+            self._expand(node, board)
+
+            # Back up proof and disproof numbers to the root
+            while node is not None:
+                self._update(node)
+                if node.parent is not None:
+                    board.pop()
+                node = node.parent
+
+        if root.pn != 0:
+            return None
+        moves = self._mate_line(root)
+        return MateResult((len(moves) + 1) // 2, moves)
+
+    def _expand(self, node: _Node, board: chess.Board):
+        if node.attacker:
+            moves = [m for m in board.legal_moves if board.gives_check(m)]
+        else:
+            moves = list(board.legal_moves)
+
+        node.children = []
+        for move in moves:
+            board.push(move)
+            child = _Node(move, node, not node.attacker, node.depth + 1)
+            self._evaluate(child, board)
+            board.pop()
+            node.children.append(child)
+            self.nodes += 1
+
+    def _evaluate(self, node: _Node, board: chess.Board):
+        """Initial proof and disproof numbers for a new node"""
+        if node.attacker:
+            if node.depth >= self.max_plies or board.is_repetition(2):
+                node.pn, node.dn = INFINITY, 0
+                return
+            checks = sum(1 for m in board.legal_moves if board.gives_check(m))
+            if checks == 0:
+                node.pn, node.dn = INFINITY, 0
+            else:
+                node.pn, node.dn = 1, checks
+        else:
+            replies = board.legal_moves.count()
+            if replies == 0:
+                # Checkmate proves the node, stalemate disproves it
+                node.pn, node.dn = (0, INFINITY) if board.is_check() else (INFINITY, 0)
+            else:
+                node.pn, node.dn = replies, 1
+
+    def _update(self, node: _Node):
+        if not node.children:
+            return  # Unexpanded leaf or solved node, its numbers are final
+        if node.attacker:
+            node.pn = min(c.pn for c in node.children)
+            node.dn = min(INFINITY, sum(c.dn for c in node.children))
+        else:
+            node.pn = min(INFINITY, sum(c.pn for c in node.children))
+            node.dn = min(c.dn for c in node.children)
+        if node.dn == 0:
+            node.children = []  # Disproven subtrees are never needed again
+
+    def _mate_line(self, root: _Node) -> List[chess.Move]:
+        """Shortest proven line for the attacker against the longest defence"""
+        depths = {}
+
+        def proof_depth(node: _Node) -> int:
+            if not node.children:
+                return 0
+            if node.attacker:
+                best = min(proof_depth(c) for c in node.children if c.pn == 0)
+            else:
+                best = max(proof_depth(c) for c in node.children)
+            depths[id(node)] = best + 1
+            return best + 1
+
+        proof_depth(root)
+        line = []
+        node = root
+        while node.children:
+            if node.attacker:
+                candidates = [c for c in node.children if c.pn == 0]
+                node = min(candidates, key=lambda c: depths.get(id(c), 0))
+            else:
+                node = max(node.children, key=lambda c: depths.get(id(c), 0))
+            line.append(node.move)
+        return line
@@ -0,0 +1,175 @@
+import atexit
+import math
+import multiprocessing
+import random
+import time
+from typing import List, Optional, Tuple
+
+import chess
+
+from ai.search import Searcher
+
+_pool = None
+_leaf_searcher: Optional[Searcher] = None
+
+
+def _get_pool(workers: int):
+    """Worker processes shared by every MCTS player in this process"""
+    global _pool
+    if _pool is None:
+        _pool = multiprocessing.Pool(workers)
+        atexit.register(_pool.terminate)
+    return _pool
+
+
+def evaluate_leaves(fens: List[str]) -> List[float]:
+    """Expected score in [0, 1] for the side to move in each position"""
+    global _leaf_searcher
+    if _leaf_searcher is None:
+        _leaf_searcher = Searcher(tt_size=1 << 16)
+    values = []
+    for fen in fens:
+        score = _leaf_searcher.quiet_score(chess.Board(fen))
+        values.append(1 / (1 + 10 ** (-score / 400)))
+    return values
+
+
+class _Node:
+    __slots__ = ("move", "parent", "children", "visits", "value", "virtual_loss", "terminal")
+
+    def __init__(self, move: Optional[chess.Move], parent: Optional["_Node"]):
+        self.move = move
+        self.parent = parent
+        self.children: Optional[List["_Node"]] = None
+        self.visits = 0
+        self.value = 0.0  # Sum of results for the player who made self.move
+        self.virtual_loss = 0
+        self.terminal: Optional[float] = None  # Result for the side to move if the game is over
+
+
+class MCTSChessAI:
+    """Monte-Carlo tree search player, a drop-in for FastIntermediateChessAI.
+
+    Each iteration selects a batch of leaves with UCT. Virtual losses on
+    the selected paths steer the rest of the batch to other leaves. The
+    batch is evaluated across the worker processes with the static
+    evaluator and backed up before the next batch is selected.
+    """
+
+    def __init__(self, workers: Optional[int] = None, batch_size: int = 32,
+                 exploration: float = 1.4, seed: Optional[int] = None):
+        self.workers = workers or max(1, multiprocessing.cpu_count() - 1)
+        self.batch_size = batch_size
+        self.exploration = exploration
+        self.random = random.Random(seed)
+        self.playouts = 0
+
+    def get_best_move(self, board: chess.Board, max_time: Optional[float] = 1.0,
+                      max_playouts: Optional[int] = None) -> Optional[chess.Move]:
+        """Search until the time or playout budget is spent, return the most visited move.
+
+        Without a time limit the playout budget alone decides, so the move
+        only depends on the position and the seed.
+        """
+        if not any(board.legal_moves):
+            return None
+
+        board = board.copy()
+        root = _Node(None, None)
+        deadline = time.time() + max_time if max_time is not None else None
+        self.playouts = 0
+
+        while True:
+            leaves = self._select_batch(root, board)
+            if leaves:
+                values = self._evaluate([fen for _, fen in leaves])
+                for (node, _), value in zip(leaves, values):
+                    self._undo_virtual_loss(node)
+                    self._backup(node, value)
+            self.playouts += len(leaves)
+            if ((deadline is not None and time.time() >= deadline)
+                    or (max_playouts is not None and self.playouts >= max_playouts)):
+                break
+
+        best = max(root.children, key=lambda c: c.visits)
+        return best.move
+
+    def _evaluate(self, fens: List[str]) -> List[float]:
+        if self.workers == 1 or len(fens) < self.workers:
+            return evaluate_leaves(fens)
+        chunk = math.ceil(len(fens) / self.workers)
+        chunks = [fens[i:i + chunk] for i in range(0, len(fens), chunk)]
+        return [v for values in _get_pool(self.workers).map(evaluate_leaves, chunks) for v in values]
+
+    def _select_batch(self, root: _Node, board: chess.Board) -> List[Tuple[_Node, str]]:
+        leaves = []
+        for _ in range(self.batch_size):
+            node = root
+            depth = 0
+            while node.children and node.terminal is None:
+                node = self._select_child(node)
+                board.push(node.move)
+                depth += 1
+
+            if node.children is None:
+                self._expand(node, board)
+            if node.terminal is not None:
+                # Game over, no evaluation needed
+                self._backup(node, node.terminal)
+                self.playouts += 1
+            elif node.virtual_loss:
+                # Another playout in this batch already waits on this leaf
+                for _ in range(depth):
+                    board.pop()
+                break
+            else:
+                leaves.append((node, board.fen()))
+                self._add_virtual_loss(node)
+
+            for _ in range(depth):
+                board.pop()
+        return leaves
+
+    def _expand(self, node: _Node, board: chess.Board):
+        outcome = board.outcome()
+        if outcome is not None:
+            node.children = []
+            node.terminal = 0.5 if outcome.winner is None else (1.0 if outcome.winner == board.turn else 0.0)
+            return
+        moves = list(board.legal_moves)
+        self.random.shuffle(moves)
+        # Try captures and promotions first among the unvisited moves
+        moves.sort(key=lambda m: board.is_capture(m) or m.promotion is not None, reverse=True)
+        node.children = [_Node(move, node) for move in moves]
+
+    def _select_child(self, node: _Node) -> _Node:
+        parent_visits = node.visits + node.virtual_loss
+        log_parent = math.log(max(parent_visits, 1))
+        best, best_score = None, -1.0
+        for child in node.children:
+            n = child.visits + child.virtual_loss
+            if n == 0:
+                return child
+            # Virtual losses count as visits that scored nothing
+            score = child.value / n + self.exploration * math.sqrt(log_parent / n)
+            if score > best_score:
+                best, best_score = child, score
+        return best
+
+    def _add_virtual_loss(self, node: _Node):
+        while node is not None:
+            node.virtual_loss += 1
+            node = node.parent
+
+    def _undo_virtual_loss(self, node: _Node):
+        while node is not None:
+            node.virtual_loss -= 1
+            node = node.parent
+
+    def _backup(self, node: _Node, value: float):
+        """value is the result for the side to move at node"""
+        while node is not None:
+            node.visits += 1
+            value = 1.0 - value  # Switch to the player who moved into node
+            node.value += value
+            node = node.parent
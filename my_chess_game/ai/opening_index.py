@@ -0,0 +1,201 @@
+import glob
+import heapq
+import mmap
+import os
+import struct
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import chess
+import chess.pgn
+import chess.polyglot
+
+# One record per (position, move): zobrist key, packed move, white wins, draws, black wins.
+# Records in a segment are sorted by (key, move) so lookups are a binary search.
+RECORD = struct.Struct("<QHxxIII")
+
+RESULTS = {"1-0": 0, "1/2-1/2": 1, "0-1": 2}
+
+
+class MoveStats(NamedTuple):
+    move: chess.Move
+    white: int
+    draws: int
+    black: int
+
+    @property
+    def games(self) -> int:
+        return self.white + self.draws + self.black
+
+    def score_for(self, color: chess.Color) -> float:
+        """Expected score (wins + half the draws) for one side"""
+        wins = self.white if color == chess.WHITE else self.black
+        return (wins + self.draws / 2) / self.games
+
+
+def pack_move(move: chess.Move) -> int:
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def unpack_move(packed: int) -> chess.Move:
+    return chess.Move(packed & 63, (packed >> 6) & 63, (packed >> 12) or None)
+
+
+class OpeningIndex:
+    """Read-only view over the memory-mapped segments of an index directory.
+
+    Each lookup binary-searches every segment, so only the pages that
+    are touched are read from disk.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._segments: List[Tuple[mmap.mmap, int]] = []
+        for segment in sorted(glob.glob(os.path.join(path, "*.idx"))):
+            with open(segment, "rb") as f:
+                if os.fstat(f.fileno()).st_size == 0:
+                    continue
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._segments.append((data, len(data) // RECORD.size))
+
+    def __bool__(self) -> bool:
+        return bool(self._segments)
+
+    def lookup(self, board: chess.Board) -> List[MoveStats]:
+        """Move statistics for a position, most played first"""
+        key = chess.polyglot.zobrist_hash(board)
+        totals: Dict[int, List[int]] = {}
+        for data, count in self._segments:
+            i = self._lower_bound(data, count, key)
+            while i < count:
+                record_key, packed, white, draws, black = RECORD.unpack_from(data, i * RECORD.size)
+                if record_key != key:
+                    break
+                counts = totals.setdefault(packed, [0, 0, 0])
+                counts[0] += white
+                counts[1] += draws
+                counts[2] += black
+                i += 1
+
+        stats = []
+        for packed, (white, draws, black) in totals.items():
+            move = unpack_move(packed)
+            if board.is_legal(move):  # Guards against hash collisions
+                stats.append(MoveStats(move, white, draws, black))
+        stats.sort(key=lambda s: s.games, reverse=True)
+        return stats
+
+    def close(self):
+        for data, _ in self._segments:
+            data.close()
+        self._segments = []
+
+    @staticmethod
+    def _lower_bound(data: mmap.mmap, count: int, key: int) -> int:
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if struct.unpack_from("<Q", data, mid * RECORD.size)[0] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+
+def _game_positions(game: chess.pgn.Game, max_plies: int) -> Iterator[Tuple[int, int]]:
+    board = game.board()
+    for ply, move in enumerate(game.mainline_moves()):
+        if ply >= max_plies:
+            break
+        yield chess.polyglot.zobrist_hash(board), pack_move(move)
+        board.push(move)
+
+
+def _write_segment(path: str, records: Iterable[Tuple[int, int, int, int, int]]) -> int:
+    """Write sorted records to a new segment file, return the record count"""
+    tmp_path = path + ".tmp"
+    count = 0
+    with open(tmp_path, "wb") as f:
+        for record in records:
+            f.write(RECORD.pack(*record))
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+def _next_segment_path(path: str) -> str:
+    existing = glob.glob(os.path.join(path, "*.idx"))
+    numbers = [int(os.path.basename(p)[:-4]) for p in existing if os.path.basename(p)[:-4].isdigit()]
+    return os.path.join(path, f"{max(numbers, default=0) + 1:06d}.idx")
+
+
+def append_games(pgn_paths: Iterable[str], path: str, max_plies: int = 30,
+                 flush_entries: int = 1000000) -> int:
+    """Stream PGN files into new segments of the index, return games indexed.
+
+    Counts are accumulated in memory and flushed to a new sorted segment
+    every flush_entries distinct (position, move) pairs, which bounds
+    memory regardless of the database size.
+    """
+    os.makedirs(path, exist_ok=True)
+    pending: Dict[Tuple[int, int], List[int]] = {}
+    games = 0
+
+    def flush():
+        if pending:
+            records = ((key, move, *counts) for (key, move), counts in sorted(pending.items()))
+            _write_segment(_next_segment_path(path), records)
+            pending.clear()
+
+    for pgn_path in pgn_paths:
+        with open(pgn_path, encoding="utf-8", errors="replace") as pgn:
+            while True:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                result = RESULTS.get(game.headers.get("Result"))
+                if result is None:
+                    continue
+                for entry in _game_positions(game, max_plies):
+                    counts = pending.get(entry)
+                    if counts is None:
+                        counts = pending[entry] = [0, 0, 0]
+                    counts[result] += 1
+                games += 1
+                if len(pending) >= flush_entries:
+                    flush()
+    flush()
+    return games
+
+
+def compact(path: str):
+    """Merge all segments into one, streaming so memory stays constant"""
+    segments = sorted(glob.glob(os.path.join(path, "*.idx")))
+    if len(segments) < 2:
+        return
+
+    def read_segment(segment: str) -> Iterator[Tuple[int, int, int, int, int]]:
+        with open(segment, "rb") as f:
+            while True:
+                chunk = f.read(RECORD.size * 4096)
+                if not chunk:
+                    break
+                yield from RECORD.iter_unpack(chunk)
+
+    def merged() -> Iterator[Tuple[int, int, int, int, int]]:
+        current: Optional[List[int]] = None
+        for key, move, white, draws, black in heapq.merge(*(read_segment(s) for s in segments)):
+            if current and current[0] == key and current[1] == move:
+                current[2] += white
+                current[3] += draws
+                current[4] += black
+            else:
+                if current:
+                    yield tuple(current)
+                current = [key, move, white, draws, black]
+        if current:
+            yield tuple(current)
+
+    target = _next_segment_path(path)
+    _write_segment(target, merged())
+    for segment in segments:
+        os.remove(segment)
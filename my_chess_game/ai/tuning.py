@@ -0,0 +1,209 @@
+import re
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import chess
+import chess.pgn
+import numpy as np
+
+from ai.eval_weights import EvalWeights
+
+MAX_PIECES = 32
+NUM_FEATURES = 6 * 64
+
+# One row per position. Each piece is a feature index, (piece type - 1) * 64 plus
+# the square as FastIntermediateChessAI indexes its tables (mirrored for Black),
+# with sign +1 for White, -1 for Black and 0 for padding. result is White's score.
+ROW = np.dtype([("index", "<i2", MAX_PIECES), ("sign", "i1", MAX_PIECES), ("result", "<f4")])
+
+RESULTS = {"1-0": 1.0, "1/2-1/2": 0.5, "0-1": 0.0}
+_EPD_RESULT = re.compile(r'"?(1-0|0-1|1/2-1/2)"?|\[(1\.0|0\.5|0\.0)\]')
+
+Sample = Tuple[str, float]  # (board part of the FEN, result for White)
+
+
+class FitResult(NamedTuple):
+    weights: EvalWeights
+    k: float  # logistic scale, win probability is 1 / (1 + exp(-k * centipawns))
+    loss: float
+    epochs: int
+
+
+def placement_features(placement: str) -> List[Tuple[int, int]]:
+    """(feature index, sign) per piece, parsed straight from the FEN board field"""
+    features = []
+    rank, file = 7, 0
+    for ch in placement:
+        if ch == "/":
+            rank -= 1
+            file = 0
+        elif ch.isdigit():
+            file += int(ch)
+        else:
+            square = rank * 8 + file
+            offset = (chess.PIECE_SYMBOLS.index(ch.lower()) - 1) * 64
+            if ch.isupper():
+                features.append((offset + square, 1))
+            else:
+                features.append((offset + chess.square_mirror(square), -1))
+            file += 1
+    return features
+
+
+def read_epd(path: str) -> Iterator[Sample]:
+    """Positions labelled with a game result, as c9 "1-0"; or [1.0] style annotations"""
+    with open(path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            fields = line.split(maxsplit=4)
+            if len(fields) < 5:
+                continue
+            match = _EPD_RESULT.search(fields[4])
+            if not match:
+                continue
+            result = RESULTS[match.group(1)] if match.group(1) else float(match.group(2))
+            yield fields[0], result
+
+
+def read_pgn(path: str, skip_plies: int = 8) -> Iterator[Sample]:
+    """Quiet positions from finished games, skipping the opening and checks or captures"""
+    with open(path, encoding="utf-8", errors="replace") as pgn:
+        while True:
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                break
+            result = RESULTS.get(game.headers.get("Result"))
+            if result is None:
+                continue
+            board = game.board()
+            for ply, move in enumerate(game.mainline_moves()):
+                if ply >= skip_plies and not board.is_check() and not board.is_capture(move):
+                    yield board.board_fen(), result
+                board.push(move)
+
+
+def read_positions(paths: Iterable[str], skip_plies: int = 8) -> Iterator[Sample]:
+    for path in paths:
+        if path.lower().endswith(".pgn"):
+            yield from read_pgn(path, skip_plies)
+        else:
+            yield from read_epd(path)
+
+
+def extract_features(samples: Iterable[Sample], out_path: str, chunk_size: int = 100000) -> int:
+    """Write feature rows to a flat file for np.memmap, return the row count"""
+    count = 0
+    with open(out_path, "wb") as out:
+        chunk = np.zeros(chunk_size, dtype=ROW)
+        filled = 0
+        for placement, result in samples:
+            features = placement_features(placement)[:MAX_PIECES]
+            row = chunk[filled]
+            row["index"][:len(features)] = [index for index, _ in features]
+            row["sign"][:len(features)] = [sign for _, sign in features]
+            row["result"] = result
+            filled += 1
+            if filled == chunk_size:
+                chunk.tofile(out)
+                count += filled
+                chunk = np.zeros(chunk_size, dtype=ROW)
+                filled = 0
+        chunk[:filled].tofile(out)
+        count += filled
+    return count
+
+
+def open_dataset(path: str) -> np.memmap:
+    return np.memmap(path, dtype=ROW, mode="r")
+
+
+def _batch(data: np.ndarray, start: int, end: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    rows = np.asarray(data[start:end])
+    return rows["index"].astype(np.intp), rows["sign"].astype(np.float32), rows["result"]
+
+
+def _scores(params: np.ndarray, index: np.ndarray, sign: np.ndarray) -> np.ndarray:
+    """Centipawns for White, params is the PST followed by six material values"""
+    table = params[:NUM_FEATURES] + np.repeat(params[NUM_FEATURES:], 64)
+    return (table[index] * sign).sum(axis=1)
+
+
+def _loss(scores: np.ndarray, results: np.ndarray, k: float) -> float:
+    p = np.clip(1 / (1 + np.exp(-k * scores)), 1e-7, 1 - 1e-7)
+    return float(-np.mean(results * np.log(p) + (1 - results) * np.log(1 - p)))
+
+
+def _to_params(weights: EvalWeights) -> np.ndarray:
+    params = np.zeros(NUM_FEATURES + 6)
+    for piece_type in chess.PIECE_TYPES:
+        params[(piece_type - 1) * 64:piece_type * 64] = weights.tables[piece_type]
+        params[NUM_FEATURES + piece_type - 1] = weights.piece_values[piece_type]
+    return params
+
+
+def _from_params(params: np.ndarray, initial: EvalWeights) -> EvalWeights:
+    piece_values = dict(initial.piece_values)
+    tables = {}
+    for piece_type in chess.PIECE_TYPES:
+        tables[piece_type] = params[(piece_type - 1) * 64:piece_type * 64].tolist()
+        if piece_type != chess.KING:  # Both sides always have a king, its value cannot be fit
+            piece_values[piece_type] = float(params[NUM_FEATURES + piece_type - 1])
+    return EvalWeights(piece_values, tables)
+
+
+def fit_k(data: np.ndarray, weights: EvalWeights, sample_size: int = 200000) -> float:
+    """Logistic scale that best maps the current evaluation to results"""
+    index, sign, results = _batch(data, 0, min(len(data), sample_size))
+    scores = _scores(_to_params(weights), index, sign)
+    candidates = np.geomspace(1e-4, 0.05, 60)
+    losses = [_loss(scores, results, k) for k in candidates]
+    return float(candidates[int(np.argmin(losses))])
+
+
+def fit(data: np.ndarray, initial: EvalWeights, epochs: int = 20, batch_size: int = 1 << 16,
+        learning_rate: float = 1.0, l2: float = 1e-6, k: Optional[float] = None, seed: int = 0,
+        on_epoch: Optional[Callable[[int, float], None]] = None) -> FitResult:
+    """Fit material and piece-square values with logistic loss.
+
+    Mini-batches are contiguous slices of the memory-mapped rows, visited
+    in a shuffled order each epoch, and updated with Adam. The small L2
+    term on the tables keeps them from drifting against the material
+    values, which they could otherwise trade off freely.
+    """
+    if k is None:
+        k = fit_k(data, initial)
+    params = _to_params(initial)
+    frozen = np.zeros_like(params, dtype=bool)
+    frozen[NUM_FEATURES + chess.KING - 1] = True
+    m = np.zeros_like(params)
+    v = np.zeros_like(params)
+    beta1, beta2 = 0.9, 0.999
+    step = 0
+    rng = np.random.default_rng(seed)
+    starts = np.arange(0, len(data), batch_size)
+    loss = float("nan")
+
+    for epoch in range(1, epochs + 1):
+        total_loss = 0.0
+        for start in rng.permutation(starts):
+            index, sign, results = _batch(data, start, start + batch_size)
+            scores = _scores(params, index, sign)
+            p = 1 / (1 + np.exp(-k * scores))
+            total_loss += _loss(scores, results, k) * len(results)
+
+            # d(loss)/d(score) per position, scattered onto the features it uses
+            delta = k * (p - results) / len(results)
+            grad = np.zeros_like(params)
+            grad[:NUM_FEATURES] = np.bincount(index.ravel(), weights=(sign * delta[:, None]).ravel(),
+                                              minlength=NUM_FEATURES)
+            grad[NUM_FEATURES:] = grad[:NUM_FEATURES].reshape(6, 64).sum(axis=1)
+            grad[:NUM_FEATURES] += l2 * params[:NUM_FEATURES]
+            grad[frozen] = 0
+
+            step += 1
+            m = beta1 * m + (1 - beta1) * grad
+            v = beta2 * v + (1 - beta2) * grad * grad
+            params -= learning_rate * (m / (1 - beta1 ** step)) / (np.sqrt(v / (1 - beta2 ** step)) + 1e-12)
+        loss = total_loss / len(data)
+        if on_epoch:
+            on_epoch(epoch, loss)
+
+    return FitResult(_from_params(params, initial), k, loss, epochs)
@@ -0,0 +1,90 @@
+"""Measure AI move throughput of the engine pool against its worker count.
+
+Usage:
+    python ai_pool_benchmark.py
+    python ai_pool_benchmark.py --workers 1,2,4,8 --games 64 --nodes 5000
+
+Simulates many games played against the server's AI: each game submits
+a position, waits for the reply and then submits its next position, so
+the pool always has --games requests outstanding. Positions come from
+seeded random games so every run searches the same work. For each
+worker count the table shows moves per second, reply latency
+percentiles and the deepest the request queue got.
+"""
+import argparse
+import multiprocessing
+import random
+import threading
+import time
+from typing import List
+
+import chess
+
+from ai.engine_pool import EnginePool
+
+
+def sample_positions(count: int, seed: int) -> List[chess.Board]:
+    """Middlegame-ish positions from random play, with their move stacks"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board = chess.Board()
+        for _ in range(rng.randint(6, 40)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        if not board.is_game_over():
+            positions.append(board)
+    return positions
+
+
+def run(workers: int, positions: List[chess.Board], games: int, moves_per_game: int, time_limit: float,
+        nodes: int, batch_size: int):
+    with EnginePool(workers, batch_size=batch_size) as pool:
+        done = threading.Semaphore(0)
+        remaining = [moves_per_game] * games
+
+        def play(game: int):
+            # Each reply triggers the game's next request, like a player answering instantly
+            if remaining[game] == 0:
+                done.release()
+                return
+            remaining[game] -= 1
+            board = positions[(game * moves_per_game + remaining[game]) % len(positions)]
+            pool.submit(board, time_limit, node_limit=nodes).add_done_callback(lambda _: play(game))
+
+        start = time.perf_counter()
+        for game in range(games):
+            play(game)
+        for _ in range(games):
+            done.acquire()
+        elapsed = time.perf_counter() - start
+        return games * moves_per_game / elapsed, pool.metrics()
+
+
+def main():
+    cpus = multiprocessing.cpu_count()
+    default_workers = ",".join(str(w) for w in (1, 2, 4, 8, 16) if w <= cpus) or "1"
+    parser = argparse.ArgumentParser(description="Engine pool throughput against worker count")
+    parser.add_argument("--workers", default=default_workers, help="comma separated worker counts")
+    parser.add_argument("--games", type=int, default=32, help="simulated games, each with one request outstanding")
+    parser.add_argument("--moves", type=int, default=8, help="requests per game")
+    parser.add_argument("--nodes", type=int, default=3000, help="node limit per request")
+    parser.add_argument("--time-limit", type=float, default=5.0, help="deadline per request in seconds")
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    positions = sample_positions(args.games * args.moves, args.seed)
+    print(f"{args.games} games x {args.moves} moves, {args.nodes} nodes per move, {cpus} CPUs")
+    print(f"{'workers':>7} {'moves/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'max queue':>9} {'late':>5}")
+    for workers in (int(w) for w in args.workers.split(",")):
+        rate, metrics = run(workers, positions, args.games, args.moves, args.time_limit, args.nodes,
+                            args.batch_size)
+        print(f"{workers:>7} {rate:>8.1f} {metrics.p50 * 1000:>8.0f} {metrics.p90 * 1000:>8.0f} "
+              f"{metrics.p99 * 1000:>8.0f} {metrics.max_queue_depth:>9} {metrics.late:>5}")
+
+
+if __name__ == "__main__":
+    main()
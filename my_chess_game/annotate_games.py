@@ -0,0 +1,198 @@
+"""Annotate PGN archives offline with the in-house search.
+
+Usage:
+    python annotate_games.py games.pgn -o annotated.pgn --depth 4
+    python annotate_games.py games.pgn -o annotated.jsonl --format jsonl --nodes 20000 --workers 8
+
+Games are streamed from the input file and analysed in a process pool.
+Only a bounded number of games is in flight at any time, so memory use
+does not depend on the size of the archive. Results are written in
+input order as they complete.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import deque
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import chess
+import chess.pgn
+
+from ai.search import Searcher, MATE_SCORE, MATE_THRESHOLD
+
+# Centipawns lost by a move before it gets each mark
+BLUNDER = 300
+MISTAKE = 150
+INACCURACY = 60
+
+CLASSIFICATIONS = [
+    (BLUNDER, "blunder", "??", chess.pgn.NAG_BLUNDER),
+    (MISTAKE, "mistake", "?", chess.pgn.NAG_MISTAKE),
+    (INACCURACY, "inaccuracy", "?!", chess.pgn.NAG_DUBIOUS_MOVE),
+]
+
+GameTask = Tuple[Dict[str, str], str, List[str]]  # (headers, starting fen, uci moves)
+
+_searcher: Optional[Searcher] = None
+_limits: Tuple[int, Optional[int]] = (4, None)
+
+
+def _init_worker(depth: int, nodes: Optional[int]):
+    global _searcher, _limits
+    _searcher = Searcher(tt_size=1 << 18)
+    _limits = (depth, nodes)
+
+
+def read_games(path: str, max_games: Optional[int] = None) -> Iterator[GameTask]:
+    """Stream games from a PGN file as compact picklable tasks"""
+    with open(path, encoding="utf-8", errors="replace") as pgn:
+        count = 0
+        while max_games is None or count < max_games:
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                break
+            moves = [move.uci() for move in game.mainline_moves()]
+            yield dict(game.headers), game.board().fen(), moves
+            count += 1
+
+
+def _clamp(score: int) -> int:
+    """Limit mate scores so centipawn losses stay meaningful"""
+    return max(-2000, min(2000, score))
+
+
+def _eval_text(score: int) -> str:
+    """PGN %eval value from White's point of view"""
+    if score >= MATE_THRESHOLD:
+        return f"#{(MATE_SCORE - score + 1) // 2}"
+    if score <= -MATE_THRESHOLD:
+        return f"#-{(MATE_SCORE + score + 1) // 2}"
+    return f"{score / 100:.2f}"
+
+
+def _evaluate_position(board: chess.Board, depth: Optional[int] = None) -> Tuple[int, Optional[chess.Move], int]:
+    """Score from the side to move's view, the engine's best move and the depth reached.
+
+    Without a depth the worker's depth or node limit applies.
+    """
+    if board.is_checkmate():
+        return -MATE_SCORE, None, 0
+    if board.is_game_over():
+        return 0, None, 0
+    nodes = None
+    if depth is None:
+        depth, nodes = _limits
+        if nodes is not None:
+            depth = 64
+    if depth <= 0:
+        return _searcher.quiet_score(board), None, 0
+    info = _searcher.search(board, max_depth=depth, node_limit=nodes)
+    return info.lines[0].score, info.lines[0].moves[0], info.depth
+
+
+def annotate_game(task: GameTask) -> Dict:
+    """Evaluate every position of a game and classify each move"""
+    headers, fen, uci_moves = task
+    board = chess.Board(fen)
+    annotations = []
+    moves = []
+    for ply, uci in enumerate(uci_moves):
+        move = chess.Move.from_uci(uci)
+        if not board.is_legal(move):
+            break
+        best_score, best, depth = _evaluate_position(board)
+        san = board.san(move)
+        best_san = board.san(best) if best else None
+        mover = board.turn
+        board.push(move)
+        # The played move searched one ply less deep from the position after it, so
+        # it is scored to the same depth from the parent as the best move and an
+        # odd/even depth swing does not count as a loss
+        score_after = -_evaluate_position(board, depth - 1)[0]
+        loss = max(0, _clamp(best_score) - _clamp(score_after))
+        if move == best:
+            loss = 0  # Transposition table effects are not the player's fault
+        label = next((c for c in CLASSIFICATIONS if loss >= c[0]), None)
+        white_score = score_after if mover == chess.WHITE else -score_after
+        annotations.append({
+            "ply": ply + 1,
+            "move": san,
+            "eval": board.result() if board.is_checkmate() else _eval_text(white_score),
+            "best": best_san,
+            "loss": loss,
+            "class": label[1] if label else None,
+        })
+        moves.append(move)
+
+    return {"headers": headers, "fen": fen, "moves": annotations, "uci": [m.uci() for m in moves]}
+
+
+def to_pgn(result: Dict) -> str:
+    game = chess.pgn.Game()
+    for name, value in result["headers"].items():
+        game.headers[name] = value
+    if result["fen"] != chess.STARTING_FEN:
+        game.setup(chess.Board(result["fen"]))
+
+    node = game
+    labels = {c[1]: c for c in CLASSIFICATIONS}
+    for uci, note in zip(result["uci"], result["moves"]):
+        node = node.add_variation(chess.Move.from_uci(uci))
+        comment = f"[%eval {note['eval']}]"
+        if note["class"]:
+            node.nags.add(labels[note["class"]][3])
+            comment += f" {note['class'].capitalize()}. Best was {note['best']}."
+        node.comment = comment
+    return str(game) + "\n\n"
+
+
+def to_json_line(result: Dict) -> str:
+    summary = {"white": {}, "black": {}}
+    for note in result["moves"]:
+        if note["class"]:
+            side = summary["white" if note["ply"] % 2 == 1 else "black"]
+            side[note["class"]] = side.get(note["class"], 0) + 1
+    record = {"headers": result["headers"], "moves": result["moves"], "summary": summary}
+    return json.dumps(record) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Annotate PGN games with engine evaluations")
+    parser.add_argument("input", help="PGN file to annotate")
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument("--format", choices=["pgn", "jsonl"], default="pgn")
+    parser.add_argument("--depth", type=int, default=4, help="search depth per position")
+    parser.add_argument("--nodes", type=int, help="node limit per position instead of a fixed depth")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-games", type=int)
+    args = parser.parse_args()
+
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    write = to_pgn if args.format == "pgn" else to_json_line
+    max_in_flight = args.workers * 4
+    start = time.time()
+    done = 0
+
+    with multiprocessing.Pool(args.workers, _init_worker, (args.depth, args.nodes)) as pool:
+        pending = deque()
+        for task in read_games(args.input, args.max_games):
+            pending.append(pool.apply_async(annotate_game, (task,)))
+            # Keep a bounded window of games in flight, written in input order
+            while len(pending) >= max_in_flight or (pending and pending[0].ready()):
+                out.write(write(pending.popleft().get()))
+                done += 1
+        while pending:
+            out.write(write(pending.popleft().get()))
+            done += 1
+
+    if out is not sys.stdout:
+        out.close()
+    elapsed = time.time() - start
+    print(f"Annotated {done} games in {elapsed:.1f}s ({done / max(elapsed, 1e-9):.2f} games/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
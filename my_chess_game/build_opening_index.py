@@ -0,0 +1,37 @@
+"""Build or extend the opening explorer index from local PGN files.
+
+Usage:
+    python build_opening_index.py games1.pgn games2.pgn
+    python build_opening_index.py more_games.pgn --compact
+
+Each run appends a new segment to the index directory; --compact
+merges all segments into one afterwards.
+"""
+import argparse
+import os
+import time
+
+from ai.opening_index import append_games, compact
+
+DEFAULT_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_index")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Index PGN games for the opening explorer")
+    parser.add_argument("pgn", nargs="*", help="PGN files to add")
+    parser.add_argument("--index", default=DEFAULT_INDEX_DIR, help="index directory")
+    parser.add_argument("--max-plies", type=int, default=30, help="plies per game to index")
+    parser.add_argument("--compact", action="store_true", help="merge segments into one")
+    args = parser.parse_args()
+
+    start = time.time()
+    if args.pgn:
+        games = append_games(args.pgn, args.index, args.max_plies)
+        print(f"Indexed {games} games in {time.time() - start:.1f}s")
+    if args.compact:
+        compact(args.index)
+        print(f"Compacted index in {args.index}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Host networked human-vs-human games for the pygame chess GUI.
+
+Usage:
+    python chess_server.py
+    python chess_server.py --host 0.0.0.0 --port 8765 --archive
+    python chess_server.py --ai-workers 4 --ai-time 0.5
+
+Players connect with  python gui/pygame_gui.py --connect HOST:PORT  and
+are paired with whoever is waiting, or join a specific game with --game.
+One asyncio event loop serves every connection; see net/protocol.py for
+the message format. With --ai-workers, players can also start games
+against the engine (pygame_gui.py --vs-ai); its moves are searched in a
+pool of worker processes shared by all those games.
+"""
+import argparse
+import asyncio
+
+from ai.engine_pool import EnginePool
+from ai.game_archive import DEFAULT_ARCHIVE_PATH, GameArchive
+from net.protocol import DEFAULT_HOST, DEFAULT_PORT
+from net.server import GameServer
+
+
+async def serve(server: GameServer, host: str, port: int, stats_interval: float):
+    tcp_server = await server.start(host, port)
+    addresses = ", ".join(f"{s.getsockname()[0]}:{s.getsockname()[1]}" for s in tcp_server.sockets)
+    print(f"Chess server listening on {addresses}")
+    try:
+        while True:
+            await asyncio.sleep(stats_interval)
+            stats = server.stats()
+            line = (f"games {stats['games']} (active {stats['active']}, waiting {stats['waiting']})  "
+                    f"connections {stats['connections']}  moves {stats['moves']}")
+            if "engine_queue" in stats:
+                line += (f"  engine queue {stats['engine_queue']}  "
+                         f"p50 {stats['engine_p50'] * 1000:.0f}ms  p99 {stats['engine_p99'] * 1000:.0f}ms")
+            print(line)
+    finally:
+        await server.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-game chess server")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="address to listen on")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--archive", nargs="?", const=DEFAULT_ARCHIVE_PATH,
+                        help="save finished games to this archive (default path if no file is given)")
+    parser.add_argument("--idle-timeout", type=float, default=3600.0,
+                        help="seconds before a game with nobody seated is dropped")
+    parser.add_argument("--ai-workers", type=int, default=0, help="engine processes for AI games (0: no AI)")
+    parser.add_argument("--ai-time", type=float, default=1.0, help="seconds the engine may take per move")
+    parser.add_argument("--ai-nodes", type=int, help="node limit per engine move")
+    parser.add_argument("--stats-interval", type=float, default=60.0, help="seconds between status lines")
+    args = parser.parse_args()
+
+    archive = GameArchive(args.archive) if args.archive else None
+    engine_pool = EnginePool(args.ai_workers) if args.ai_workers > 0 else None
+    server = GameServer(archive=archive, idle_timeout=args.idle_timeout, engine_pool=engine_pool,
+                        engine_time=args.ai_time, engine_nodes=args.ai_nodes)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.stats_interval))
+    except KeyboardInterrupt:
+        print("Server stopped")
+    finally:
+        if engine_pool:
+            engine_pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Export or summarise the archive of games played in the chess GUIs.
+
+Usage:
+    python export_games.py --stats
+    python export_games.py -o games.pgn
+    python export_games.py -o recent.pgn --start 5000 --workers 4
+
+Statistics only read the archive's index. Export splits the games into
+ranges by game number and decodes them in a process pool, writing the
+PGN in archive order. The archive is opened read-only, so a game that a
+GUI or the server is saving meanwhile is left alone.
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from typing import Tuple
+
+from ai.game_archive import DEFAULT_ARCHIVE_PATH, GameArchive, to_pgn
+
+CHUNK_GAMES = 500
+
+
+def export_range(task: Tuple[str, int, int]) -> str:
+    path, start, stop = task
+    return "".join(to_pgn(game) for game in GameArchive(path, read_only=True).games(start, stop))
+
+
+def print_stats(archive: GameArchive):
+    results = Counter()
+    plies = 0
+    first = last = None
+    for entry in archive.entries():
+        results[entry.result] += 1
+        plies += entry.plies
+        first = entry.timestamp if first is None else min(first, entry.timestamp)
+        last = entry.timestamp if last is None else max(last, entry.timestamp)
+
+    games = sum(results.values())
+    print(f"Games: {games} in {archive.path} ({os.path.getsize(archive.path):,} bytes)")
+    if not games:
+        return
+    print(f"White wins: {results['1-0']}  Draws: {results['1/2-1/2']}  "
+          f"Black wins: {results['0-1']}  Unfinished: {results['*']}")
+    print(f"Average length: {plies / games:.1f} plies")
+    print(f"Played from {time.strftime('%Y-%m-%d', time.localtime(first))} "
+          f"to {time.strftime('%Y-%m-%d', time.localtime(last))}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or summarise the game archive")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE_PATH, help="archive file")
+    parser.add_argument("-o", "--output", help="PGN output file (default: stdout)")
+    parser.add_argument("--stats", action="store_true", help="print statistics instead of exporting")
+    parser.add_argument("--start", type=int, default=0, help="first game number to export")
+    parser.add_argument("--stop", type=int, help="export up to this game number")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if not os.path.exists(args.archive):
+        parser.error(f"{args.archive} does not exist")
+    archive = GameArchive(args.archive, read_only=True)
+    if args.stats:
+        print_stats(archive)
+        return
+
+    stop = min(len(archive), args.stop if args.stop is not None else len(archive))
+    tasks = [(args.archive, start, min(start + CHUNK_GAMES, stop)) for start in range(args.start, stop, CHUNK_GAMES)]
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start_time = time.time()
+
+    if args.workers > 1 and len(tasks) > 1:
+        with multiprocessing.Pool(args.workers) as pool:
+            for text in pool.imap(export_range, tasks):
+                out.write(text)
+    else:
+        for task in tasks:
+            out.write(export_range(task))
+
+    if out is not sys.stdout:
+        out.close()
+    games = max(0, stop - args.start)
+    elapsed = time.time() - start_time
+    print(f"Exported {games} games in {elapsed:.1f}s ({games / max(elapsed, 1e-9):.0f} games/s)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
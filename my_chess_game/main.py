@@ -5,9 +5,16 @@ import chess
 import time
 import threading
 import random
-from typing import Optional, Tuple
+import atexit
+from typing import List, NamedTuple, Optional, Tuple
 from collections import defaultdict
 from pygame.locals import *
+from ai.analysis_cache import EXACT, LOWER, AnalysisCache
+from ai.eval_weights import EvalWeights, default_weights, load_weights
+from ai.game_archive import GameArchive
+from ai.opening_index import MoveStats, OpeningIndex
+from ai.mate_search import MateSearch
+from ai.mcts import MCTSChessAI
 
 # Initialize pygame
 pygame.init()
@@ -50,41 +57,89 @@ BOARD_X = (WINDOW_WIDTH - BOARD_SIZE - INFO_PANEL_WIDTH) // 2
 BOARD_Y = (WINDOW_HEIGHT - BOARD_SIZE) // 2
 INFO_PANEL_X = BOARD_X + BOARD_SIZE
 
+# Persist AI search results between sessions (~/.pygame_chess_analysis.sqlite)
+USE_ANALYSIS_CACHE = True
+_analysis_cache = None
+
+def get_analysis_cache() -> Optional[AnalysisCache]:
+    """Open the shared analysis cache on first use"""
+    global _analysis_cache
+    if USE_ANALYSIS_CACHE and _analysis_cache is None:
+        _analysis_cache = AnalysisCache()
+        atexit.register(_analysis_cache.close)
+    return _analysis_cache
+
+# Append every played game to ~/.pygame_chess_games.pca, export with export_games.py
+USE_GAME_ARCHIVE = True
+_game_archive = None
+
+def get_game_archive() -> Optional[GameArchive]:
+    """Open the game archive on first use"""
+    global _game_archive
+    if USE_GAME_ARCHIVE and _game_archive is None:
+        try:
+            _game_archive = GameArchive()
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not open game archive: {e}")
+    return _game_archive
+
+# Opening explorer built with build_opening_index.py, also used as the AI's book
+OPENING_INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_index")
+BOOK_MIN_GAMES = 5
+_opening_index = None
+
+def get_opening_index() -> OpeningIndex:
+    """Open the opening index on first use (empty if none was built)"""
+    global _opening_index
+    if _opening_index is None:
+        _opening_index = OpeningIndex(OPENING_INDEX_DIR)
+    return _opening_index
+
+# Evaluation weights fitted by tune_eval.py, the hand-picked ones until it is run
+EVAL_WEIGHTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "eval_weights.json")
+_eval_weights = None
+
+def get_eval_weights() -> EvalWeights:
+    """Load the evaluation weights on first use"""
+    global _eval_weights
+    if _eval_weights is None:
+        _eval_weights = load_weights(EVAL_WEIGHTS_PATH) or default_weights()
+    return _eval_weights
+
+# AI strength per difficulty, as search budgets rather than thinking time so a
+# level plays the same move on any machine; book moves also need the same opening
+# index (see get_best_move). For MCTS the node budget counts playouts.
+# At the ~4000 nodes/s the minimax AI reaches on a laptop, Medium and Hard take
+# about 0.5s and 1.5s, like the thinking times they replace.
+class AILevel(NamedTuple):
+    name: str
+    nodes: int
+    depth: int
+
+AI_LEVELS = {
+    1: AILevel("Easy", 0, 0),  # Random legal move
+    2: AILevel("Medium", 2000, 3),
+    3: AILevel("Hard", 6000, 5),
+    4: AILevel("MCTS", 3000, 0),
+}
+
+# Optional wall-clock cap on an AI move in seconds. It bounds latency on slow
+# machines, but moves cut short by it are no longer reproducible.
+AI_MAX_TIME = None
+
 class FastIntermediateChessAI:
     """Fast intermediate chess AI that avoids repetition and responds quickly"""
     
-    def __init__(self):
-        self.piece_values = {
-            chess.PAWN: 100,
-            chess.KNIGHT: 320,
-            chess.BISHOP: 330,
-            chess.ROOK: 500,
-            chess.QUEEN: 900,
-            chess.KING: 20000
-        }
+    MAX_DEPTH = 5
+    ROOT_MOVES = 15  # Moves searched at the root, best first by the quick ordering
+    
+    def __init__(self, analysis_cache: Optional[AnalysisCache] = None,
+                 opening_index: Optional[OpeningIndex] = None, seed: Optional[int] = None):
+        weights = get_eval_weights()
+        self.piece_values = weights.piece_values
         
-        # Position tables for piece-square evaluation
-        self.pawn_table = [
-            0,  0,  0,  0,  0,  0,  0,  0,
-            50, 50, 50, 50, 50, 50, 50, 50,
-            10, 10, 20, 30, 30, 20, 10, 10,
-            5,  5, 10, 25, 25, 10,  5,  5,
-            0,  0,  0, 20, 20,  0,  0,  0,
-            5, -5,-10,  0,  0,-10, -5,  5,
-            5, 10, 10,-20,-20, 10, 10,  5,
-            0,  0,  0,  0,  0,  0,  0,  0
-        ]
-        
-        self.knight_table = [
-            -50,-40,-30,-30,-30,-30,-40,-50,
-            -40,-20,  0,  0,  0,  0,-20,-40,
-            -30,  0, 10, 15, 15, 10,  0,-30,
-            -30,  5, 15, 20, 20, 15,  5,-30,
-            -30,  0, 15, 20, 20, 15,  0,-30,
-            -30,  5, 10, 15, 15, 10,  5,-30,
-            -40,-20,  0,  5,  5,  0,-20,-40,
-            -50,-40,-30,-30,-30,-30,-40,-50
-        ]
+        # Position tables for piece-square evaluation, one per piece type
+        self.piece_square_tables = weights.tables
         
         # Track move history to avoid repetition
         self.move_history = defaultdict(int)
@@ -95,9 +150,40 @@ class FastIntermediateChessAI:
         self.transposition_table = {}
         self.max_table_size = 10000
         
-    def get_best_move(self, board: chess.Board, max_time: float = 1.0) -> chess.Move:
-        """Get best move with time limit and repetition avoidance"""
+        # Results from previous sessions, keyed by Zobrist hash
+        self.analysis_cache = analysis_cache
+        self.opening_index = opening_index
+        
+        # Proof-number search for forced mates in sharp positions
+        self.mate_search = MateSearch(node_budget=20000)
+        
+        # Seeded so equal-scoring moves and book choices are reproducible
+        self.rng = random.Random(seed)
+        
+        # Search budget, nodes counts positions visited by _minimax
+        self.nodes = 0
+        self.node_limit = None
+        self.budget_exhausted = False
+        
+    def get_best_move(self, board: chess.Board, max_time: Optional[float] = 1.0,
+                      node_limit: Optional[int] = None, max_depth: Optional[int] = None) -> chess.Move:
+        """Get best move within the node, depth and time limits, avoiding repetition.
+        
+        With a node limit and no time limit the result only depends on the
+        position, the game so far, the seed and, while the game is in the
+        book, the opening index. Unlike the analysis cache, which grows with
+        every game played, the index only changes when it is rebuilt, but
+        it is built from this machine's games, so book moves are the same
+        on two machines only when they have the same index.
+        """
         start_time = time.time()
+        max_depth = max_depth or self.MAX_DEPTH
+        self.nodes = 0
+        self.node_limit = node_limit
+        self.budget_exhausted = False
+        
+        def out_of_time(fraction: float) -> bool:
+            return max_time is not None and time.time() - start_time > max_time * fraction
         
         # Update position history
         position_key = self._get_position_key(board)
@@ -114,6 +200,19 @@ class FastIntermediateChessAI:
         legal_moves = list(board.legal_moves)
         if not legal_moves:
             return None
+        
+        book_move = self._book_move(board)
+        if book_move and not self._would_repeat_position(board, book_move):
+            return book_move
+        
+        # Look for a forced mate first, alpha-beta below misses long ones. It gets
+        # a quarter of the node budget and its nodes count towards it.
+        if self._looks_tactical(board, legal_moves):
+            mate = self.mate_search.find_mate(board, time_limit=max_time * 0.3 if max_time else None,
+                                              node_budget=node_limit // 4 if node_limit else None)
+            self.nodes += self.mate_search.nodes
+            if mate:
+                return mate.moves[0]
             
         # Quick move ordering for better alpha-beta pruning
         move_scores = []
@@ -132,43 +231,111 @@ class FastIntermediateChessAI:
         # Iterative deepening with time control
         best_move = ordered_moves[0]
         best_score = -float('inf')
-        
-        for depth in range(1, 6):  # Max depth 5 for speed
-            if time.time() - start_time > max_time * 0.8:  # Leave 20% time buffer
+        completed_depth = 0
+        
+        # Resume from a previous session's search of this position. Node-budgeted
+        # searches skip this, the result would depend on this machine's history.
+        # An entry from a root cut to ROOT_MOVES is only a lower bound, its move is
+        # searched first but the iterations are not skipped.
+        use_cache = self.analysis_cache and node_limit is None
+        cached_move = self.analysis_cache.get_move(board, 1, exact=False) if use_cache else None
+        if cached_move and not self._would_repeat_position(board, cached_move):
+            cached_depth, cached_score, _, bound = self.analysis_cache.probe(board)
+            if bound == EXACT:
+                if cached_depth >= max_depth:
+                    return cached_move
+                completed_depth, best_score = cached_depth, cached_score
+            best_move = cached_move
+            ordered_moves.remove(cached_move)
+            ordered_moves.insert(0, cached_move)
+        
+        for depth in range(completed_depth + 1, max_depth + 1):
+            if out_of_time(0.8) or self.budget_exhausted:  # Leave 20% time buffer
                 break
                 
             try:
                 current_best = None
                 current_score = -float('inf')
+                tied_moves = []
+                completed = True
                 
-                for move in ordered_moves[:15]:  # Limit move evaluation for speed
-                    if time.time() - start_time > max_time * 0.9:
+                for move in ordered_moves[:self.ROOT_MOVES]:  # Limit move evaluation for speed
+                    if out_of_time(0.9):
+                        completed = False
                         break
                         
                     board.push(move)
                     score = -self._minimax(board, depth - 1, -float('inf'), float('inf'), False)
                     board.pop()
+                    if self.budget_exhausted:
+                        # This move's search was cut short, its score is unreliable
+                        completed = False
+                        break
                     
                     if score > current_score:
                         current_score = score
                         current_best = move
+                        tied_moves = [move]
+                    elif score == current_score:
+                        tied_moves.append(move)
+                
+                if len(tied_moves) > 1:
+                    current_best = self.rng.choice(tied_moves)
                 
-                if current_best and current_score > best_score:
+                # Scores of different depths do not compare; the last completed
+                # iteration decides, a partial one only beats the ordering guess
+                if completed:
+                    completed_depth = depth
                     best_move = current_best
                     best_score = current_score
+                elif current_best and not completed_depth:
+                    best_move = current_best
                     
             except:
                 break
         
+        if self.analysis_cache and completed_depth:
+            bound = EXACT if len(ordered_moves) <= self.ROOT_MOVES else LOWER
+            self.analysis_cache.store(board, completed_depth, best_score, best_move, bound)
+        
         # Clean transposition table if it gets too large
         if len(self.transposition_table) > self.max_table_size:
             self.transposition_table.clear()
             
         return best_move
     
+    def _book_move(self, board: chess.Board) -> Optional[chess.Move]:
+        """Pick a well-scoring opening move, weighted by how often it was played"""
+        if not self.opening_index:
+            return None
+        candidates = [s for s in self.opening_index.lookup(board)
+                      if s.games >= BOOK_MIN_GAMES and s.score_for(board.turn) >= 0.4]
+        if not candidates:
+            return None
+        weights = [s.games * s.score_for(board.turn) for s in candidates]
+        return self.rng.choices(candidates, weights)[0].move
+    
+    def _looks_tactical(self, board: chess.Board, legal_moves) -> bool:
+        """Checks are available and the enemy king has at most two flight squares"""
+        enemy_king = board.king(not board.turn)
+        if enemy_king is None or not any(board.gives_check(move) for move in legal_moves):
+            return False
+        flight_squares = 0
+        for square in chess.SquareSet(chess.BB_KING_ATTACKS[enemy_king]):
+            if board.color_at(square) != (not board.turn) and not board.is_attacked_by(board.turn, square):
+                flight_squares += 1
+        return flight_squares <= 2
+    
     def _minimax(self, board: chess.Board, depth: int, alpha: float, beta: float, maximizing: bool) -> float:
         """Minimax with alpha-beta pruning and transposition table"""
         
+        # Past the node budget the search unwinds with a placeholder score;
+        # get_best_move discards the move whose search was cut short
+        self.nodes += 1
+        if self.node_limit and self.nodes > self.node_limit:
+            self.budget_exhausted = True
+            return 0
+        
         # Check transposition table
         position_key = self._get_position_key(board)
         if position_key in self.transposition_table:
@@ -202,7 +369,8 @@ class FastIntermediateChessAI:
                 if beta <= alpha:
                     break  # Alpha-beta pruning
             
-            self.transposition_table[position_key] = (depth, max_eval)
+            if not self.budget_exhausted:  # Cut-short results must not be reused
+                self.transposition_table[position_key] = (depth, max_eval)
             return max_eval
         else:
             min_eval = float('inf')
@@ -215,7 +383,8 @@ class FastIntermediateChessAI:
                 if beta <= alpha:
                     break  # Alpha-beta pruning
             
-            self.transposition_table[position_key] = (depth, min_eval)
+            if not self.budget_exhausted:  # Cut-short results must not be reused
+                self.transposition_table[position_key] = (depth, min_eval)
             return min_eval
     
     def _quick_move_score(self, board: chess.Board, move: chess.Move) -> float:
@@ -276,13 +445,8 @@ class FastIntermediateChessAI:
                 piece_value = self.piece_values[piece.piece_type]
                 
                 # Positional bonus
-                positional_bonus = 0
-                if piece.piece_type == chess.PAWN:
-                    idx = square if piece.color == chess.WHITE else chess.square_mirror(square)
-                    positional_bonus = self.pawn_table[idx]
-                elif piece.piece_type == chess.KNIGHT:
-                    idx = square if piece.color == chess.WHITE else chess.square_mirror(square)
-                    positional_bonus = self.knight_table[idx]
+                idx = square if piece.color == chess.WHITE else chess.square_mirror(square)
+                positional_bonus = self.piece_square_tables[piece.piece_type][idx]
                 
                 total_value = piece_value + positional_bonus
                 score += total_value if piece.color == chess.WHITE else -total_value
@@ -320,23 +484,29 @@ class FastIntermediateChessAI:
 class ChessGame:
     """Base chess game class"""
     
-    def __init__(self, ai_mode=False, difficulty=2):
+    def __init__(self, ai_mode=False, difficulty=2, seed: Optional[int] = None):
         self.board = chess.Board()
         self.ai_mode = ai_mode
-        self.ai = FastIntermediateChessAI() if ai_mode else None
+        # The same seed and moves replay the same game, print it to reproduce one
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        self.rng = random.Random(self.seed)
+        self.ai = FastIntermediateChessAI(get_analysis_cache(), get_opening_index(), self.seed) if ai_mode else None
         self.ai_color = chess.BLACK if ai_mode else None
         self.human_color = chess.WHITE if ai_mode else None
         self.last_move = None
         self.game_over = False
         self.move_times = []
+        self.move_nodes = []
         self.difficulty = difficulty
+        self.mcts_ai = None  # Created on first use, it starts worker processes
         self.ai_thinking = False
         self.current_player = chess.WHITE  # For human vs human
+        self.game_saved = False
     
     def set_difficulty(self, difficulty: int):
-        """Change AI difficulty level (1-3)"""
+        """Change AI difficulty level (1-3, or 4 for the MCTS engine)"""
         self.difficulty = difficulty
-        print(f"AI difficulty set to {['Easy', 'Medium', 'Hard'][difficulty-1]}")
+        print(f"AI difficulty set to {AI_LEVELS[difficulty].name}")
     
     def make_move(self, move: chess.Move) -> bool:
         """Make a move (works for both AI and human modes)"""
@@ -357,25 +527,33 @@ class ChessGame:
             return True
         return False
     
-    def make_ai_move(self, max_time: float = 1.5) -> Optional[chess.Move]:
-        """Have the AI make its move with time limit"""
+    def make_ai_move(self, max_time: Optional[float] = None) -> Optional[chess.Move]:
+        """Have the AI make its move within the difficulty's search budget.
+        
+        max_time optionally caps the thinking time as well.
+        """
         if not self.ai_mode or self.game_over or self.board.turn != self.ai_color:
             return None
         
         self.ai_thinking = True
         start_time = time.time()
-        
-        # Adjust thinking time based on difficulty
-        thinking_times = {1: 0.1, 2: 0.5, 3: max_time}
-        actual_time = thinking_times.get(self.difficulty, max_time)
+        level = AI_LEVELS.get(self.difficulty, AI_LEVELS[2])
         
         if self.difficulty == 1:
             # Easy - random moves
             legal_moves = list(self.board.legal_moves)
-            move = random.choice(legal_moves) if legal_moves else None
+            move = self.rng.choice(legal_moves) if legal_moves else None
+            nodes = 0
+        elif self.difficulty == 4:
+            # Monte-Carlo tree search engine
+            if self.mcts_ai is None:
+                self.mcts_ai = MCTSChessAI(seed=self.seed)
+            move = self.mcts_ai.get_best_move(self.board, max_time, max_playouts=level.nodes)
+            nodes = self.mcts_ai.playouts
         else:
             # Medium/Hard - use AI
-            move = self.ai.get_best_move(self.board, actual_time)
+            move = self.ai.get_best_move(self.board, max_time, node_limit=level.nodes, max_depth=level.depth)
+            nodes = self.ai.nodes
         
         move_time = time.time() - start_time
         
@@ -383,6 +561,7 @@ class ChessGame:
             self.board.push(move)
             self.last_move = move
             self.move_times.append(move_time)
+            self.move_nodes.append(nodes)
             self._check_game_over()
             
         self.ai_thinking = False
@@ -391,6 +570,27 @@ class ChessGame:
     def _check_game_over(self):
         """Check if the game is over"""
         self.game_over = self.board.is_game_over()
+        if self.game_over:
+            self.save_game()
+    
+    def save_game(self):
+        """Append the game to the game archive, once per game"""
+        archive = get_game_archive()
+        if archive is None or self.game_saved or not self.board.move_stack:
+            return
+        if self.ai_mode:
+            ai_name = f"AI ({AI_LEVELS.get(self.difficulty, AI_LEVELS[2]).name})"
+            headers = {"Event": "Pygame Chess vs AI", "Seed": str(self.seed),
+                       "White": "Human" if self.human_color == chess.WHITE else ai_name,
+                       "Black": "Human" if self.human_color == chess.BLACK else ai_name}
+        else:
+            headers = {"Event": "Pygame Chess", "White": "Human", "Black": "Human"}
+        try:
+            number = archive.append(self.board, headers)
+            self.game_saved = True
+            print(f"Game saved as #{number + 1} in {archive.path}")
+        except OSError as e:
+            print(f"Warning: Could not save game: {e}")
     
     def get_game_state(self) -> str:
         """Get current game state description"""
@@ -419,14 +619,24 @@ class ChessGame:
         """Get average AI move time"""
         return sum(self.move_times) / len(self.move_times) if self.move_times else 0
     
+    def get_nodes_per_second(self) -> float:
+        """Measured AI search speed, the latency of a level is its budget over this"""
+        total_time = sum(self.move_times)
+        return sum(self.move_nodes) / total_time if total_time else 0
+    
     def reset(self):
         """Reset the game state"""
+        self.save_game()  # Keep unfinished games too
+        self.game_saved = False
         self.board.reset()
+        self.rng = random.Random(self.seed)
         if self.ai_mode:
-            self.ai = FastIntermediateChessAI()  # Reset AI state
+            self.ai = FastIntermediateChessAI(get_analysis_cache(), get_opening_index(), self.seed)  # Reset AI state
+        self.mcts_ai = None
         self.last_move = None
         self.game_over = False
         self.move_times = []
+        self.move_nodes = []
         self.ai_thinking = False
         self.current_player = chess.WHITE
 
@@ -550,6 +760,7 @@ class GameUI:
         self.font_large = pygame.font.Font(None, 36)
         self.font_medium = pygame.font.Font(None, 24)
         self.font_small = pygame.font.Font(None, 18)
+        self._book_cache: Tuple[Optional[str], List[MoveStats]] = (None, [])  # (fen, top book moves)
         
         # Set up window
         self.screen = pygame.display.set_mode((WINDOW_WIDTH, WINDOW_HEIGHT))
@@ -678,8 +889,7 @@ class GameUI:
         
         if self.game.ai_mode:
             # Difficulty level
-            diff_names = {1: "Easy", 2: "Medium", 3: "Hard"}
-            diff_text = f"AI Level: {diff_names.get(self.game.difficulty, 'Medium')}"
+            diff_text = f"AI Level: {AI_LEVELS.get(self.game.difficulty, AI_LEVELS[2]).name}"
             diff_surface = self.font_small.render(diff_text, True, TEXT_SECONDARY)
             self.screen.blit(diff_surface, (INFO_PANEL_X + 20, y_offset))
             y_offset += 30
@@ -689,6 +899,10 @@ class GameUI:
                 avg_time = f"AI time: {self.game.get_average_move_time():.2f}s"
                 time_surface = self.font_small.render(avg_time, True, TEXT_SECONDARY)
                 self.screen.blit(time_surface, (INFO_PANEL_X + 20, y_offset))
+                y_offset += 20
+                speed = f"AI speed: {self.game.get_nodes_per_second():,.0f} nodes/s"
+                speed_surface = self.font_small.render(speed, True, TEXT_SECONDARY)
+                self.screen.blit(speed_surface, (INFO_PANEL_X + 20, y_offset))
                 y_offset += 40
         
         # Move count
@@ -697,13 +911,32 @@ class GameUI:
         self.screen.blit(move_surface, (INFO_PANEL_X + 20, y_offset))
         y_offset += 40
         
+        # Opening explorer statistics for the current position
+        fen = self.game.board.fen()
+        if self._book_cache[0] != fen:
+            index = get_opening_index()
+            self._book_cache = (fen, index.lookup(self.game.board)[:3] if index else [])
+        book = self._book_cache[1]
+        if book:
+            book_surface = self.font_small.render("Book: games  W / D / B", True, ACCENT_COLOR)
+            self.screen.blit(book_surface, (INFO_PANEL_X + 20, y_offset))
+            y_offset += 20
+            for entry in book:
+                line = (f"{self.game.board.san(entry.move)}  {entry.games}  "
+                        f"{100 * entry.white // entry.games}/{100 * entry.draws // entry.games}/"
+                        f"{100 * entry.black // entry.games}%")
+                line_surface = self.font_small.render(line, True, TEXT_SECONDARY)
+                self.screen.blit(line_surface, (INFO_PANEL_X + 30, y_offset))
+                y_offset += 18
+            y_offset += 20
+        
         # Controls help
         controls = []
         if self.game.ai_mode:
             controls = [
                 "Controls:",
                 "Click - Select/move",
-                "1/2/3 - AI difficulty",
+                "1/2/3/4 - AI difficulty",
                 "R - Reset game",
                 "F - Flip board",
                 "M - Main menu",
@@ -939,10 +1172,10 @@ def run_chess_game(ai_mode=False):
         clock = pygame.time.Clock()
         
         mode_text = "Chess vs AI" if ai_mode else "Chess vs Human"
-        print(f"{mode_text} started!")
+        print(f"{mode_text} started!" + (f" (seed {game.seed})" if ai_mode else ""))
         print("Controls:")
         if ai_mode:
-            print("1/2/3: Change AI difficulty (Easy/Medium/Hard)")
+            print("1/2/3/4: Change AI difficulty (Easy/Medium/Hard/MCTS)")
         print("R: Reset game")
         print("F: Flip board")
         print("M: Return to main menu")
@@ -967,6 +1200,8 @@ def run_chess_game(ai_mode=False):
                         game.set_difficulty(2)
                     elif ai_mode and event.key == K_3:
                         game.set_difficulty(3)
+                    elif ai_mode and event.key == K_4:
+                        game.set_difficulty(4)
                     elif event.key == K_r:
                         # Wait for AI thread to finish before resetting
                         if ai_move_thread and ai_move_thread.is_alive():
@@ -982,6 +1217,7 @@ def run_chess_game(ai_mode=False):
                         # Return to main menu
                         if ai_move_thread and ai_move_thread.is_alive():
                             ai_move_thread.join()
+                        game.save_game()
                         run_selection_screen()
                         return
                     elif event.key == K_ESCAPE:
@@ -994,7 +1230,7 @@ def run_chess_game(ai_mode=False):
                 (ai_move_thread is None or not ai_move_thread.is_alive())):
                 
                 def ai_move_worker():
-                    move = game.make_ai_move(max_time=1.5)
+                    move = game.make_ai_move(max_time=AI_MAX_TIME)
                     if move:
                         print(f"AI played: {move}")
                 
@@ -1009,6 +1245,7 @@ def run_chess_game(ai_mode=False):
         # Wait for AI thread to finish before quitting
         if ai_move_thread and ai_move_thread.is_alive():
             ai_move_thread.join()
+        game.save_game()
         
     except Exception as e:
         print(f"Error: {e}")
@@ -0,0 +1,78 @@
+import queue
+import socket
+import threading
+from typing import List, Tuple
+
+from net.protocol import DEFAULT_PORT, MAX_LINE, Message, decode, encode
+
+
+class NetworkClient:
+    """Blocking socket connection for the pygame GUIs.
+
+    A daemon thread reads lines from the server into a queue, so the game
+    loop only calls poll() once per frame and never waits on the network.
+    """
+
+    def __init__(self, host: str, port: int = DEFAULT_PORT, timeout: float = 5.0):
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.settimeout(None)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.messages: "queue.Queue[Message]" = queue.Queue()
+        self.connected = True
+        self._send_lock = threading.Lock()
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+
+    def _read_loop(self):
+        stream = self.sock.makefile("rb")
+        try:
+            while True:
+                line = stream.readline(MAX_LINE)
+                if not line:
+                    break
+                try:
+                    self.messages.put(decode(line))
+                except ValueError:
+                    continue
+        except OSError:
+            pass
+        finally:
+            self.connected = False
+            self.messages.put({"type": "disconnected"})
+
+    def send(self, message: Message) -> bool:
+        if not self.connected:
+            return False
+        try:
+            with self._send_lock:
+                self.sock.sendall(encode(message))
+            return True
+        except OSError:
+            self.connected = False
+            return False
+
+    def poll(self) -> List[Message]:
+        """Messages received since the last call, without blocking"""
+        messages = []
+        while True:
+            try:
+                messages.append(self.messages.get_nowait())
+            except queue.Empty:
+                return messages
+
+    def close(self):
+        self.connected = False
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+def parse_address(address: str, default_port: int = DEFAULT_PORT) -> Tuple[str, int]:
+    """Split "host:port", or a bare host name, into (host, port)"""
+    host, _, port = address.rpartition(":")
+    if not host:
+        return address, default_port
+    return host, int(port)
+
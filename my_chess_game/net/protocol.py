@@ -0,0 +1,44 @@
+import json
+from typing import Any, Dict
+
+# Messages are JSON objects, one per line, with a "type" field:
+#
+# client -> server
+#   {"type": "create"}                       new game, the creator plays White
+#   {"type": "create", "opponent": "ai"}     new game against the server's engine, which plays Black
+#   {"type": "join", "game": id}             take the free seat of a game
+#   {"type": "join"}                         join any game waiting for an opponent, or create one
+#   {"type": "rejoin", "token": token}       return to a seat after reconnecting
+#   {"type": "watch", "game": id}            follow a game without playing
+#   {"type": "move", "game": id, "move": "e2e4"}
+#   {"type": "resign", "game": id}
+#   {"type": "sync", "game": id}             ask for the full game state again
+#   {"type": "ping"}
+#
+# server -> client
+#   {"type": "joined", "game": id, "color": "white" | "black", "token": token}
+#   {"type": "state", "game": id, "start": fen, "fen": fen, "moves": [uci, ...], "result": result,
+#    "white": seated, "black": seated}
+#   {"type": "move", "game": id, "move": uci, "ply": n, "fen": fen, "result": result}
+#   {"type": "seat", "game": id, "color": "white" | "black", "seated": bool}
+#   {"type": "result", "game": id, "result": "1-0", "reason": "resignation"}
+#   {"type": "error", "message": text}
+#   {"type": "pong"}
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_LINE = 64 * 1024
+
+Message = Dict[str, Any]
+
+
+def encode(message: Message) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def decode(line: bytes) -> Message:
+    """Parse one line, raising ValueError for anything but a JSON object with a type"""
+    message = json.loads(line)
+    if not isinstance(message, dict) or not isinstance(message.get("type"), str):
+        raise ValueError("message must be a JSON object with a type")
+    return message
@@ -0,0 +1,377 @@
+import asyncio
+import itertools
+import secrets
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+import chess
+
+from ai.engine_pool import EnginePool
+from ai.game_archive import GameArchive
+from net.protocol import MAX_LINE, Message, decode, encode
+
+# A client whose unsent data grows past this is too slow and gets dropped,
+# so one stalled reader cannot hold up the broadcasts to everyone else.
+MAX_WRITE_BUFFER = 256 * 1024
+
+# Seconds past its time limit before an engine reply counts as lost, to
+# cover time waiting for a free worker when the pool is busy
+ENGINE_GRACE = 10.0
+
+COLOR_NAMES = {chess.WHITE: "white", chess.BLACK: "black"}
+
+
+class Connection:
+    __slots__ = ("writer", "seats", "watching")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.seats: Set[Tuple[str, chess.Color]] = set()
+        self.watching: Set[str] = set()
+
+    def send(self, message: Message):
+        """Queue a message without waiting for the socket"""
+        transport = self.writer.transport
+        if transport.is_closing():
+            return
+        self.writer.write(encode(message))
+        if transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+            transport.abort()
+
+
+class EngineSeat:
+    """Stands in for the connection of a seat played by the engine pool"""
+
+    def send(self, message: Message):
+        pass
+
+
+ENGINE = EngineSeat()
+
+
+class ServerGame:
+    """A game kept as its starting FEN, the current FEN and the moves played"""
+
+    __slots__ = ("id", "start", "fen", "moves", "players", "tokens", "watchers", "result", "updated")
+
+    def __init__(self, game_id: str, start: str = chess.STARTING_FEN):
+        self.id = game_id
+        self.start = start
+        self.fen = start
+        self.moves: List[str] = []
+        self.players: Dict[chess.Color, Optional[Connection]] = {chess.WHITE: None, chess.BLACK: None}
+        self.tokens: Dict[chess.Color, Optional[str]] = {chess.WHITE: None, chess.BLACK: None}
+        self.watchers: Set[Connection] = set()
+        self.result: Optional[str] = None
+        self.updated = time.monotonic()
+
+    def state(self) -> Message:
+        return {"type": "state", "game": self.id, "start": self.start, "fen": self.fen, "moves": self.moves,
+                "result": self.result, "white": self.players[chess.WHITE] is not None,
+                "black": self.players[chess.BLACK] is not None}
+
+    def connections(self) -> List[Connection]:
+        return [c for c in self.players.values() if c is not None] + list(self.watchers)
+
+    def broadcast(self, message: Message):
+        for connection in self.connections():
+            connection.send(message)
+
+    def full_board(self) -> chess.Board:
+        """Board with the move stack, only needed when a game is archived"""
+        board = chess.Board(self.start)
+        for uci in self.moves:
+            board.push_uci(uci)
+        return board
+
+
+class GameServer:
+    """Hosts many concurrent games over TCP with newline-delimited JSON.
+
+    Each connection has one reader task; games themselves are plain
+    objects, so idle games cost only their FEN and move list. Moves are
+    validated against a board rebuilt from the current FEN and then
+    broadcast to the players and watchers of the game.
+    """
+
+    def __init__(self, archive: Optional[GameArchive] = None, idle_timeout: float = 3600.0,
+                 finished_timeout: float = 300.0, engine_pool: Optional[EnginePool] = None,
+                 engine_time: float = 1.0, engine_nodes: Optional[int] = None):
+        self.games: Dict[str, ServerGame] = {}
+        self.waiting: "OrderedDict[str, None]" = OrderedDict()  # Games with one free seat, oldest first
+        self.seat_tokens: Dict[str, Tuple[str, chess.Color]] = {}
+        self.archive = archive
+        self.idle_timeout = idle_timeout
+        self.finished_timeout = finished_timeout
+        self.engine_pool = engine_pool
+        self.engine_time = engine_time
+        self.engine_nodes = engine_nodes
+        self.connections = 0
+        self.moves_played = 0
+        self._ids = itertools.count(1)
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._reaper: Optional[asyncio.Task] = None
+        self._engine_tasks: Set[asyncio.Task] = set()  # Held so they are not collected mid-search
+        self._handlers = {
+            "create": self._create, "join": self._join, "rejoin": self._rejoin, "watch": self._watch,
+            "move": self._move, "resign": self._resign, "sync": self._sync, "ping": self._ping,
+        }
+
+    async def start(self, host: str, port: int) -> asyncio.AbstractServer:
+        self._server = await asyncio.start_server(self._handle_client, host, port, limit=MAX_LINE)
+        self._reaper = asyncio.get_running_loop().create_task(self._reap_games())
+        return self._server
+
+    async def close(self):
+        if self._reaper:
+            self._reaper.cancel()
+        for task in list(self._engine_tasks):
+            task.cancel()
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def stats(self) -> Dict[str, float]:
+        active = sum(1 for g in self.games.values() if g.result is None and g.moves)
+        stats = {"games": len(self.games), "active": active, "waiting": len(self.waiting),
+                 "connections": self.connections, "moves": self.moves_played}
+        if self.engine_pool:
+            metrics = self.engine_pool.metrics()
+            stats.update(engine_queue=metrics.queue_depth, engine_p50=metrics.p50, engine_p99=metrics.p99)
+        return stats
+
+    async def _handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        connection = Connection(writer)
+        self.connections += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, ConnectionError):  # Line too long or connection reset
+                    break
+                if not line:
+                    break
+                try:
+                    message = decode(line)
+                except ValueError:
+                    connection.send({"type": "error", "message": "malformed message"})
+                    continue
+                handler = self._handlers.get(message["type"])
+                if handler is None:
+                    connection.send({"type": "error", "message": f"unknown message type {message['type']!r}"})
+                else:
+                    try:
+                        handler(connection, message)
+                    except (TypeError, ValueError, KeyError):
+                        # A field of the wrong type; the connection itself is fine
+                        connection.send({"type": "error", "message": f"invalid {message['type']} message"})
+        finally:
+            self.connections -= 1
+            self._disconnect(connection)
+            writer.close()
+
+    def _disconnect(self, connection: Connection):
+        for game_id, color in connection.seats:
+            game = self.games.get(game_id)
+            if game and game.players[color] is connection:
+                game.players[color] = None
+                game.updated = time.monotonic()
+                game.broadcast({"type": "seat", "game": game_id, "color": COLOR_NAMES[color], "seated": False})
+        for game_id in connection.watching:
+            game = self.games.get(game_id)
+            if game:
+                game.watchers.discard(connection)
+
+    def _game(self, connection: Connection, message: Message) -> Optional[ServerGame]:
+        game_id = message.get("game")
+        game = self.games.get(game_id) if isinstance(game_id, str) else None
+        if game is None:
+            connection.send({"type": "error", "message": "no such game"})
+        return game
+
+    def _seat(self, connection: Connection, game: ServerGame, color: chess.Color):
+        token = secrets.token_urlsafe(12)
+        game.players[color] = connection
+        game.tokens[color] = token
+        game.updated = time.monotonic()
+        self.seat_tokens[token] = (game.id, color)
+        connection.seats.add((game.id, color))
+        if any(c is None for c in game.players.values()) and game.result is None:
+            self.waiting[game.id] = None
+        else:
+            self.waiting.pop(game.id, None)
+        connection.send({"type": "joined", "game": game.id, "color": COLOR_NAMES[color], "token": token})
+        game.broadcast({"type": "seat", "game": game.id, "color": COLOR_NAMES[color], "seated": True})
+        connection.send(game.state())
+
+    def _create(self, connection: Connection, message: Message):
+        against_engine = message.get("opponent") == "ai"
+        if against_engine and self.engine_pool is None:
+            connection.send({"type": "error", "message": "this server has no AI opponents"})
+            return
+        game = ServerGame(format(next(self._ids), "x"))
+        self.games[game.id] = game
+        if against_engine:
+            game.players[chess.BLACK] = ENGINE
+        self._seat(connection, game, chess.WHITE)
+
+    def _join(self, connection: Connection, message: Message):
+        if "game" not in message:
+            # Match with the longest waiting game, dropping reaped and finished
+            # ones met on the way, or wait for an opponent
+            for game_id in list(self.waiting):
+                game = self.games.get(game_id)
+                if game is not None and game.result is None:
+                    break
+                del self.waiting[game_id]
+            else:
+                self._create(connection, message)
+                return
+        else:
+            game = self._game(connection, message)
+            if game is None:
+                return
+        if connection in game.players.values():
+            connection.send({"type": "error", "message": "you already play this game"})
+            return
+        free = [color for color, player in game.players.items() if player is None and game.tokens[color] is None]
+        if not free:
+            connection.send({"type": "error", "message": "game is full"})
+            return
+        self._seat(connection, game, free[0])
+
+    def _rejoin(self, connection: Connection, message: Message):
+        token = message.get("token")
+        seat = self.seat_tokens.get(token) if isinstance(token, str) else None
+        game = self.games.get(seat[0]) if seat else None
+        if game is None:
+            connection.send({"type": "error", "message": "unknown token"})
+            return
+        if game.players[not seat[1]] is connection:
+            connection.send({"type": "error", "message": "you already play this game"})
+            return
+        game.players[seat[1]] = connection
+        game.updated = time.monotonic()
+        connection.seats.add(seat)
+        connection.send({"type": "joined", "game": game.id, "color": COLOR_NAMES[seat[1]], "token": token})
+        game.broadcast({"type": "seat", "game": game.id, "color": COLOR_NAMES[seat[1]], "seated": True})
+        connection.send(game.state())
+
+    def _watch(self, connection: Connection, message: Message):
+        game = self._game(connection, message)
+        if game:
+            game.watchers.add(connection)
+            connection.watching.add(game.id)
+            connection.send(game.state())
+
+    def _move(self, connection: Connection, message: Message):
+        game = self._game(connection, message)
+        if game is None:
+            return
+        if game.result is not None:
+            connection.send({"type": "error", "message": "game is over"})
+            return
+        board = chess.Board(game.fen)
+        if game.players[board.turn] is not connection:
+            connection.send({"type": "error", "message": "not your turn"})
+            return
+        uci = message.get("move")
+        try:
+            move = chess.Move.from_uci(uci) if isinstance(uci, str) else None
+        except ValueError:
+            move = None
+        if move is None or not board.is_legal(move):
+            connection.send({"type": "error", "message": f"illegal move {message.get('move')!r}"})
+            connection.send(game.state())
+            return
+
+        self._play(game, board, move)
+
+    def _play(self, game: ServerGame, board: chess.Board, move: chess.Move):
+        board.push(move)
+        game.fen = board.fen()
+        game.moves.append(move.uci())
+        game.updated = time.monotonic()
+        self.moves_played += 1
+        outcome = board.outcome()
+        if outcome:
+            self._finish(game, outcome.result(), outcome.termination.name.lower(), announce=False)
+        game.broadcast({"type": "move", "game": game.id, "move": move.uci(), "ply": len(game.moves),
+                        "fen": game.fen, "result": game.result})
+        if game.result is None and game.players[board.turn] is ENGINE:
+            task = asyncio.get_running_loop().create_task(self._engine_move(game))
+            self._engine_tasks.add(task)
+            task.add_done_callback(self._engine_tasks.discard)
+
+    async def _engine_move(self, game: ServerGame):
+        """Ask the engine pool for a reply without blocking the event loop"""
+        ply = len(game.moves)
+        result = None
+        for attempt in range(2):  # One retry, for example after a worker crash
+            try:
+                # The full move stack lets the search see repetitions
+                future = self.engine_pool.submit(game.full_board(), self.engine_time, self.engine_nodes)
+                # The search ends at its deadline; far past it the worker is stuck or gone
+                result = await asyncio.wait_for(asyncio.wrap_future(future), self.engine_time + ENGINE_GRACE)
+                break
+            except asyncio.TimeoutError:
+                print(f"Warning: Engine search timed out in game {game.id}")
+            except Exception as e:
+                print(f"Warning: Engine search failed in game {game.id}: {e}")
+        if self.games.get(game.id) is not game or game.result is not None or len(game.moves) != ply:
+            return  # Resigned, reaped or otherwise moved on meanwhile
+        board = chess.Board(game.fen)
+        if result is None or result.move is None:
+            # The engine forfeits rather than leave its opponent waiting forever
+            self._finish(game, "0-1" if board.turn == chess.WHITE else "1-0", "engine failure")
+            return
+        self._play(game, board, chess.Move.from_uci(result.move))
+
+    def _resign(self, connection: Connection, message: Message):
+        game = self._game(connection, message)
+        if game is None or game.result is not None:
+            return
+        color = next((c for c, player in game.players.items() if player is connection), None)
+        if color is None:
+            connection.send({"type": "error", "message": "you are not playing this game"})
+            return
+        self._finish(game, "0-1" if color == chess.WHITE else "1-0", "resignation")
+
+    def _sync(self, connection: Connection, message: Message):
+        game = self._game(connection, message)
+        if game:
+            connection.send(game.state())
+
+    def _ping(self, connection: Connection, message: Message):
+        connection.send({"type": "pong"})
+
+    def _finish(self, game: ServerGame, result: str, reason: str, announce: bool = True):
+        game.result = result
+        game.updated = time.monotonic()
+        self.waiting.pop(game.id, None)
+        if announce:
+            game.broadcast({"type": "result", "game": game.id, "result": result, "reason": reason})
+        if self.archive is not None and game.moves:
+            try:
+                self.archive.append(game.full_board(), {"Event": "Pygame Chess online", "Round": game.id}, result)
+            except OSError as e:
+                print(f"Warning: Could not archive game {game.id}: {e}")
+
+    def _remove(self, game: ServerGame):
+        del self.games[game.id]
+        self.waiting.pop(game.id, None)
+        for token in game.tokens.values():
+            self.seat_tokens.pop(token, None)
+
+    async def _reap_games(self):
+        """Drop finished games after a while and games nobody has touched for a long time"""
+        while True:
+            await asyncio.sleep(min(60.0, self.finished_timeout))
+            now = time.monotonic()
+            for game in list(self.games.values()):
+                nobody_seated = not any(isinstance(p, Connection) for p in game.players.values())
+                if game.result is not None and now - game.updated > self.finished_timeout:
+                    self._remove(game)
+                elif nobody_seated and now - game.updated > self.idle_timeout:
+                    self._remove(game)
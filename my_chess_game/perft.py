@@ -0,0 +1,109 @@
+"""Validate and benchmark the bitboard move generator used by the search.
+
+Usage:
+    python perft.py                      # run the standard perft suite
+    python perft.py --depth 4 --compare  # also time python-chess on the same positions
+    python perft.py --fen "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1" --depth 5 --divide
+
+Node counts are checked against the published perft results, so any
+bug in move generation, make/unmake or castling and en passant rights
+shows up as a mismatch before it can affect the AI.
+"""
+import argparse
+import sys
+import time
+from typing import List, Tuple
+
+import chess
+
+from ai.bitboard import Position, perft
+
+# (name, fen, node counts for depth 1, 2, ...)
+PERFT_SUITE: List[Tuple[str, str, List[int]]] = [
+    ("start", chess.STARTING_FEN, [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    ("promotions", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("talkchess", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+]
+
+
+def board_perft(board: chess.Board, depth: int) -> int:
+    """Reference count with python-chess, making every move like the search does"""
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in board.legal_moves:
+        board.push(move)
+        nodes += board_perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+def divide(fen: str, depth: int):
+    """Per-move counts, for finding which move a mismatch comes from"""
+    position = Position(chess.Board(fen))
+    board = chess.Board(fen)
+    for move in position.legal_moves():
+        position.push(move)
+        nodes = perft(position, depth - 1)
+        position.pop()
+        uci = Position.to_move(move)
+        board.push(uci)
+        expected = board_perft(board, depth - 1)
+        board.pop()
+        print(f"{uci.uci():6} {nodes:>10}" + ("" if nodes == expected else f"  expected {expected}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft validation for the bitboard move generator")
+    parser.add_argument("--depth", type=int, default=3, help="deepest depth to run per position")
+    parser.add_argument("--fen", help="run a single position instead of the suite")
+    parser.add_argument("--divide", action="store_true", help="print node counts per root move (with --fen)")
+    parser.add_argument("--compare", action="store_true", help="time python-chess on the same positions")
+    args = parser.parse_args()
+
+    if args.fen:
+        if args.divide:
+            divide(args.fen, args.depth)
+            return
+        suite = [("fen", args.fen, [board_perft(chess.Board(args.fen), args.depth)])]
+        depth_of = lambda counts: args.depth
+    else:
+        suite = PERFT_SUITE
+        depth_of = lambda counts: min(args.depth, len(counts))
+
+    failures = 0
+    total_nodes = total_time = reference_time = 0.0
+    for name, fen, counts in suite:
+        depth = depth_of(counts)
+        expected = counts[-1] if args.fen else counts[depth - 1]
+
+        start = time.perf_counter()
+        nodes = perft(Position(chess.Board(fen)), depth)
+        elapsed = time.perf_counter() - start
+        total_nodes += nodes
+        total_time += elapsed
+
+        status = "ok" if nodes == expected else f"FAIL (expected {expected})"
+        failures += nodes != expected
+        line = f"{name:12} depth {depth}  {nodes:>10} nodes  {nodes / max(elapsed, 1e-9):>10,.0f} nodes/s  {status}"
+        if args.compare:
+            start = time.perf_counter()
+            board_perft(chess.Board(fen), depth)
+            reference = time.perf_counter() - start
+            reference_time += reference
+            line += f"  python-chess {nodes / max(reference, 1e-9):>10,.0f} nodes/s"
+        print(line)
+
+    summary = f"Total: {total_nodes:.0f} nodes in {total_time:.2f}s ({total_nodes / max(total_time, 1e-9):,.0f} nodes/s)"
+    if args.compare:
+        summary += f", python-chess {total_nodes / max(reference_time, 1e-9):,.0f} nodes/s"
+    print(summary)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
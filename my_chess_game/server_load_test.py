@@ -0,0 +1,132 @@
+"""Load-test the chess server with simulated players.
+
+Usage:
+    python server_load_test.py --players 200 --duration 30
+    python server_load_test.py --local --players 1000 --think 0.5
+
+Every simulated player opens its own connection, joins the matchmaking
+queue and plays random legal moves after a short think time, starting
+a new game when one ends. The report gives the move round trip (send to
+the server's broadcast arriving back) as percentiles, and moves per
+second across all games. --local runs the server in the same process.
+"""
+import argparse
+import asyncio
+import random
+import time
+from typing import List
+
+import chess
+
+from net.protocol import DEFAULT_HOST, DEFAULT_PORT, MAX_LINE, decode, encode
+from net.server import GameServer
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.games = 0
+        self.errors = 0
+
+
+async def player(host: str, port: int, think: float, deadline: float, stats: Stats, rng: random.Random):
+    reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+    writer.write(encode({"type": "join"}))
+    color = board = game = None
+    sent_at = None
+    try:
+        while time.perf_counter() < deadline:
+            try:
+                line = await asyncio.wait_for(reader.readline(), deadline - time.perf_counter())
+            except asyncio.TimeoutError:
+                break
+            if not line:
+                break
+            message = decode(line)
+            kind = message["type"]
+            if kind == "joined":
+                game, color = message["game"], chess.WHITE if message["color"] == "white" else chess.BLACK
+            elif kind == "state" and message["game"] == game:
+                board = chess.Board(message["fen"])
+            elif kind == "move" and message["game"] == game:
+                if sent_at is not None and board.turn == color:
+                    stats.latencies.append(time.perf_counter() - sent_at)
+                    sent_at = None
+                board = chess.Board(message["fen"])
+                if message["result"] is not None:
+                    stats.games += 1
+                    writer.write(encode({"type": "join"}))
+                    board = None
+                    continue
+            elif kind == "error":
+                stats.errors += 1
+                continue
+            elif kind != "seat":
+                continue
+
+            if board is not None and board.turn == color and sent_at is None:
+                await asyncio.sleep(think * rng.random() * 2)
+                move = rng.choice(list(board.legal_moves))
+                sent_at = time.perf_counter()
+                writer.write(encode({"type": "move", "game": game, "move": move.uci()}))
+    finally:
+        writer.close()
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else float("nan")
+
+
+async def run(args) -> Stats:
+    host, port = args.host, args.port
+    server = None
+    if args.local:
+        server = GameServer()
+        tcp_server = await server.start("127.0.0.1", 0)
+        host, port = "127.0.0.1", tcp_server.sockets[0].getsockname()[1]
+
+    stats = Stats()
+    deadline = time.perf_counter() + args.duration
+    rng = random.Random(args.seed)
+    tasks = []
+    for i in range(args.players):
+        tasks.append(asyncio.ensure_future(
+            player(host, port, args.think, deadline, stats, random.Random(rng.random()))))
+        if i % 50 == 49:
+            await asyncio.sleep(0)  # Let the server accept connections while more are opened
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        print(f"{len(failures)} players failed, first error: {failures[0]!r}")
+    if server is not None:
+        print(f"Server: {server.stats()}")
+        await server.close()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the chess server")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--local", action="store_true", help="start a server in this process")
+    parser.add_argument("--players", type=int, default=100, help="simulated players (two per game)")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds to play")
+    parser.add_argument("--think", type=float, default=0.2, help="average seconds before each move")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    stats = asyncio.run(run(args))
+    elapsed = time.perf_counter() - start
+    moves = len(stats.latencies)
+    print(f"{args.players} players, {moves} moves in {elapsed:.1f}s ({moves / elapsed:.0f} moves/s), "
+          f"{stats.games} games finished, {stats.errors} errors")
+    if moves:
+        print("Move round trip: " + "  ".join(f"p{int(p * 100)} {percentile(stats.latencies, p) * 1000:.1f}ms"
+                                             for p in (0.5, 0.9, 0.99)) +
+              f"  max {max(stats.latencies) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Tune the AI's piece values and piece-square tables on labelled positions.
+
+Usage:
+    python tune_eval.py quiet-labeled.epd
+    python tune_eval.py games1.pgn games2.pgn --epochs 30
+    python tune_eval.py --reuse --epochs 50       # refit on the last extracted features
+
+Positions are read from EPD files with a result annotation (c9 "1-0";
+or [1.0]) or sampled from finished PGN games. Their features are
+written once to a memory-mapped file, then the weights are fitted with
+mini-batch logistic regression and saved where main.py loads them.
+"""
+import argparse
+import os
+import time
+
+import chess
+
+from ai.eval_weights import default_weights, load_weights, save_weights
+from ai.tuning import extract_features, fit, open_dataset, read_positions
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_WEIGHTS_PATH = os.path.join(HERE, "eval_weights.json")
+DEFAULT_FEATURES_PATH = os.path.join(HERE, "eval_features.bin")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fit evaluation weights to game results")
+    parser.add_argument("inputs", nargs="*", help="EPD or PGN files")
+    parser.add_argument("--features", default=DEFAULT_FEATURES_PATH, help="memory-mapped feature file")
+    parser.add_argument("--reuse", action="store_true", help="skip extraction, fit the existing feature file")
+    parser.add_argument("-o", "--output", default=DEFAULT_WEIGHTS_PATH, help="weights file for the engine")
+    parser.add_argument("--defaults", action="store_true", help="start from the hand-picked weights")
+    parser.add_argument("--epochs", type=int, default=20)
+    parser.add_argument("--batch-size", type=int, default=1 << 16)
+    parser.add_argument("--lr", type=float, default=1.0, help="Adam step size in centipawns")
+    parser.add_argument("--l2", type=float, default=1e-6, help="regularisation of the tables")
+    parser.add_argument("--skip-plies", type=int, default=8, help="opening plies skipped in PGN games")
+    args = parser.parse_args()
+
+    if not args.reuse:
+        if not args.inputs:
+            parser.error("no input files (use --reuse to fit the existing features)")
+        start = time.time()
+        count = extract_features(read_positions(args.inputs, args.skip_plies), args.features)
+        print(f"Extracted {count} positions in {time.time() - start:.1f}s")
+
+    data = open_dataset(args.features)
+    if not len(data):
+        parser.error(f"{args.features} holds no positions")
+    initial = (None if args.defaults else load_weights(args.output)) or default_weights()
+
+    start = time.time()
+
+    def report(epoch: int, loss: float):
+        print(f"epoch {epoch:3}  loss {loss:.5f}  {time.time() - start:.1f}s")
+
+    result = fit(data, initial, epochs=args.epochs, batch_size=args.batch_size,
+                 learning_rate=args.lr, l2=args.l2, on_epoch=report)
+    save_weights(result.weights, args.output, k=result.k, loss=result.loss, positions=len(data))
+    values = ", ".join(f"{chess.piece_symbol(pt).upper()} {round(result.weights.piece_values[pt])}"
+                       for pt in (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN))
+    print(f"Saved weights to {args.output} (k={result.k:.5f}): {values}")
+
+
+if __name__ == "__main__":
+    main()